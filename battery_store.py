@@ -0,0 +1,159 @@
+"""Append-only battery history log.
+
+Each reading is a fixed 10-byte little-endian record (timestamp as float64,
+capacity as uint8, status code as uint8) appended to a binary log, so a new
+entry never rewrites existing data.  The log is mirrored in compact in-memory
+arrays for range queries; records older than the retention window are dropped
+by a periodic compaction that rewrites the file atomically.
+"""
+import bisect
+import json
+import os
+import struct
+import threading
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+RECORD = struct.Struct('<dBB')
+
+# Status strings as reported by /sys/class/power_supply/*/status
+STATUSES = ('Unknown', 'Charging', 'Discharging', 'Not charging', 'Full')
+_STATUS_CODES = {s.lower(): i for i, s in enumerate(STATUSES)}
+
+
+def _entry(ts, capacity, status_code):
+    return {
+        'timestamp': datetime.fromtimestamp(ts).isoformat(),
+        'capacity': capacity,
+        'status': STATUSES[status_code] if status_code < len(STATUSES) else 'Unknown',
+    }
+
+
+class BatteryStore:
+    """Battery readings persisted as an append-only fixed-record log."""
+
+    def __init__(self, path, retention_days=180, compact_interval=86400):
+        self.path = Path(path)
+        self.retention = retention_days * 86400
+        self.compact_interval = compact_interval
+        self.times = array('d')
+        self.capacities = array('B')
+        self.statuses = array('B')
+        self.version = 0  # bumped on every change
+        self._last_compaction = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.times)
+
+    # ---- persistence ----
+
+    def load(self, legacy_json=None):
+        """Read the log from disk; import legacy JSON history if there is no log yet."""
+        with self._lock:
+            self.times, self.capacities, self.statuses = array('d'), array('B'), array('B')
+            if self.path.exists():
+                data = self.path.read_bytes()
+                usable = len(data) - len(data) % RECORD.size
+                if usable != len(data):
+                    # A write torn by a crash: cut it off, or every later append is misaligned
+                    os.truncate(self.path, usable)
+                for ts, capacity, status in RECORD.iter_unpack(data[:usable]):
+                    self._append_memory(ts, capacity, status)
+            elif legacy_json is not None and Path(legacy_json).exists():
+                with open(legacy_json, 'r') as f:
+                    for e in json.load(f):
+                        try:
+                            ts = datetime.fromisoformat(e['timestamp']).timestamp()
+                            self._append_memory(ts, int(e['capacity']), self._status_code(e.get('status', '')))
+                        except (KeyError, TypeError, ValueError):
+                            continue
+                self._rewrite()
+            self.version += 1
+        return len(self)
+
+    def _rewrite(self):
+        """Atomically replace the log with the in-memory records."""
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            for i in range(len(self.times)):
+                f.write(RECORD.pack(self.times[i], self.capacities[i], self.statuses[i]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def compact(self, now=None):
+        """Drop records older than the retention window and rewrite the log."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._last_compaction = now
+            cut = bisect.bisect_left(self.times, now - self.retention)
+            if cut == 0:
+                return 0
+            del self.times[:cut], self.capacities[:cut], self.statuses[:cut]
+            self._rewrite()
+            self.version += 1
+            return cut
+
+    # ---- writes ----
+
+    @staticmethod
+    def _status_code(status):
+        return _STATUS_CODES.get(str(status).strip().lower(), 0)
+
+    def _append_memory(self, ts, capacity, status_code):
+        self.times.append(ts)
+        self.capacities.append(max(0, min(255, capacity)))
+        self.statuses.append(status_code)
+
+    def append(self, capacity, status, ts=None):
+        """Record one reading; returns it as an API entry dict."""
+        ts = time.time() if ts is None else ts
+        code = self._status_code(status)
+        with self._lock:
+            self._append_memory(ts, capacity, code)
+            with open(self.path, 'ab') as f:
+                f.write(RECORD.pack(ts, self.capacities[-1], code))
+            self.version += 1
+            due = ts - self._last_compaction > self.compact_interval
+        if due:
+            self.compact(ts)
+        return _entry(ts, self.capacities[-1], code)
+
+    # ---- queries ----
+
+    def tail(self, n):
+        """The newest n entries, oldest first."""
+        with self._lock:
+            start = max(0, len(self.times) - n)
+            return [_entry(self.times[i], self.capacities[i], self.statuses[i])
+                    for i in range(start, len(self.times))]
+
+    def query(self, start=None, end=None, step=None):
+        """Entries in [start, end]; with step (seconds), one averaged point per bucket.
+
+        A downsampled point carries the bucket start time, the mean capacity
+        and the status of the last reading in the bucket.
+        """
+        with self._lock:
+            lo = bisect.bisect_left(self.times, start) if start is not None else 0
+            hi = bisect.bisect_right(self.times, end) if end is not None else len(self.times)
+            if not step:
+                return [_entry(self.times[i], self.capacities[i], self.statuses[i]) for i in range(lo, hi)]
+
+            points = []
+            bucket, total, count, status = None, 0, 0, 0
+            for i in range(lo, hi):
+                b = self.times[i] - self.times[i] % step
+                if b != bucket:
+                    if count:
+                        points.append(_entry(bucket, round(total / count), status))
+                    bucket, total, count = b, 0, 0
+                total += self.capacities[i]
+                count += 1
+                status = self.statuses[i]
+            if count:
+                points.append(_entry(bucket, round(total / count), status))
+            return points
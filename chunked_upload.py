@@ -0,0 +1,236 @@
+"""Resumable chunked uploads into file storage.
+
+An upload is created with its target folder, file name and total size; the
+client then PUTs the bytes in chunks, each tagged with the offset it
+starts at, and finally asks for it to be finalised.  Each chunk is streamed
+straight into a part file (created sparse at the full size) while a
+SHA-256 of the bytes received so far is kept up to date, so nothing is
+buffered in memory or in temp files.
+
+Progress is recorded in a small JSON file next to the part file, so after
+a dropped connection or a server restart the client asks for the current
+offset and carries on from there.  Chunks must continue the received
+prefix (an offset at or before it; bytes already received are skipped),
+which keeps the running hash valid.  After a restart the hash is rebuilt
+from the part file on the next chunk.  Finalising checks the size (and
+the client's SHA-256, if given) and renames the part file into place.
+"""
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+
+from persister import atomic_write
+
+READ_BLOCK = 256 * 1024
+
+
+class UploadError(Exception):
+    """A request the upload can't accept; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset  # current offset, for conflicts
+
+
+class _Upload:
+    def __init__(self, meta):
+        self.meta = meta
+        self.hasher = None  # sha256 of meta['offset'] bytes; None until (re)built
+        self.lock = threading.Lock()
+
+
+class UploadManager:
+    """Part files and progress records for in-flight uploads, kept in `parts_dir`."""
+
+    def __init__(self, parts_dir, max_size, expire_seconds=7 * 86400):
+        self.parts_dir = Path(parts_dir)
+        self.max_size = max_size
+        self.expire_seconds = expire_seconds
+        self.parts_dir.mkdir(exist_ok=True)
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def _part(self, upload_id):
+        return self.parts_dir / f'{upload_id}.part'
+
+    def _meta_file(self, upload_id):
+        return self.parts_dir / f'{upload_id}.json'
+
+    def _save(self, upload):
+        upload.meta['updated'] = time.time()
+        atomic_write(self._meta_file(upload.meta['id']), json.dumps(upload.meta).encode())
+
+    def _get(self, upload_id):
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            if upload is not None:
+                return upload
+            if not (len(upload_id) == 32 and all(c in '0123456789abcdef' for c in upload_id)):
+                raise UploadError('Unknown upload', 404)
+            try:
+                with open(self._meta_file(upload_id), 'r') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                raise UploadError('Unknown upload', 404)
+            if not self._part(upload_id).exists():
+                raise UploadError('Unknown upload', 404)
+            upload = self._uploads[upload_id] = _Upload(meta)
+            return upload
+
+    @staticmethod
+    def status(upload):
+        meta = upload.meta
+        return {'id': meta['id'], 'path': meta['folder'], 'filename': meta['filename'],
+                'size': meta['size'], 'offset': meta['offset'],
+                'complete': meta['offset'] == meta['size']}
+
+    # ---- protocol ----
+
+    def create(self, folder, filename, size, sha256=None):
+        """Start an upload of `size` bytes to folder/filename; returns its status."""
+        if not isinstance(size, int) or size < 0:
+            raise UploadError('size must be a non-negative integer')
+        if size > self.max_size:
+            raise UploadError(f'File too large (limit {self.max_size} bytes)', 413)
+        self.expire()
+        upload_id = secrets.token_hex(16)
+        meta = {'id': upload_id, 'folder': folder, 'filename': filename, 'size': size,
+                'sha256': sha256, 'offset': 0, 'created': time.time()}
+        upload = _Upload(meta)
+        upload.hasher = hashlib.sha256()
+        # Record first: a crash before the part file exists leaves only a
+        # record, which expire() finds and removes
+        self._save(upload)
+        with open(self._part(upload_id), 'wb') as f:
+            f.truncate(size)  # sparse: no blocks allocated until written
+        with self._lock:
+            self._uploads[upload_id] = upload
+        return self.status(upload)
+
+    def get_status(self, upload_id):
+        return self.status(self._get(upload_id))
+
+    def write(self, upload_id, offset, stream, length):
+        """Stream `length` bytes from `stream` into the upload at `offset`.
+
+        Returns the new status.  Bytes before the current offset (a chunk
+        re-sent after a lost response) are skipped; a gap after it is a
+        conflict, reported with the offset to resume from.
+        """
+        upload = self._get(upload_id)
+        if not upload.lock.acquire(blocking=False):
+            raise UploadError('Another chunk of this upload is in progress', 409,
+                              upload.meta['offset'])
+        try:
+            meta = upload.meta
+            current = meta['offset']
+            if offset > current:
+                raise UploadError('Chunk does not continue the upload', 409, current)
+            if offset < 0 or offset + length > meta['size']:
+                raise UploadError('Chunk extends past the declared size', 400, current)
+            if upload.hasher is None:
+                upload.hasher = self._rehash(upload_id, current)
+            skip = current - offset
+            fd = os.open(self._part(upload_id), os.O_WRONLY)
+            try:
+                remaining = length
+                while remaining:
+                    block = stream.read(min(READ_BLOCK, remaining))
+                    if not block:
+                        break  # client went away: keep what arrived
+                    remaining -= len(block)
+                    if skip:
+                        dropped = min(skip, len(block))
+                        block, skip = block[dropped:], skip - dropped
+                        if not block:
+                            continue
+                    os.pwrite(fd, block, meta['offset'])
+                    upload.hasher.update(block)
+                    meta['offset'] += len(block)
+            finally:
+                # Data first, then the offset that vouches for it
+                os.fsync(fd)
+                os.close(fd)
+                self._save(upload)
+            return self.status(upload)
+        finally:
+            upload.lock.release()
+
+    def _rehash(self, upload_id, length):
+        hasher = hashlib.sha256()
+        with open(self._part(upload_id), 'rb') as f:
+            while length > 0:
+                block = f.read(min(READ_BLOCK, length))
+                if not block:
+                    break
+                hasher.update(block)
+                length -= len(block)
+        return hasher
+
+    def finish(self, upload_id, dest_for, sha256=None):
+        """Move a complete upload into place; returns (destination path, sha256 hex).
+
+        `dest_for(folder, filename)` picks the final path (e.g. avoiding
+        existing names); it is called with the values given at create().
+        """
+        upload = self._get(upload_id)
+        if not upload.lock.acquire(blocking=False):
+            raise UploadError('A chunk of this upload is in progress', 409, upload.meta['offset'])
+        try:
+            meta = upload.meta
+            if meta['offset'] != meta['size']:
+                raise UploadError('Upload is incomplete', 409, meta['offset'])
+            if upload.hasher is None:
+                upload.hasher = self._rehash(upload_id, meta['offset'])
+            digest = upload.hasher.hexdigest()
+            expected = (sha256 or meta.get('sha256') or '').lower()
+            if expected and expected != digest:
+                raise UploadError('SHA-256 mismatch', 422)
+            dest = dest_for(meta['folder'], meta['filename'])
+            os.replace(self._part(upload_id), dest)
+            self._forget(upload_id)
+            return dest, digest
+        finally:
+            upload.lock.release()
+
+    def abort(self, upload_id):
+        self._get(upload_id)
+        self._forget(upload_id)
+        try:
+            self._part(upload_id).unlink()
+        except OSError:
+            pass
+
+    def _forget(self, upload_id):
+        with self._lock:
+            self._uploads.pop(upload_id, None)
+        try:
+            self._meta_file(upload_id).unlink()
+        except OSError:
+            pass
+
+    def expire(self):
+        """Delete uploads untouched for longer than expire_seconds, and part
+        files as old as that with no record (left by a crash during abort)."""
+        cutoff = time.time() - self.expire_seconds
+        for meta_file in self.parts_dir.glob('*.json'):
+            try:
+                if meta_file.stat().st_mtime < cutoff:
+                    upload_id = meta_file.stem
+                    with self._lock:
+                        self._uploads.pop(upload_id, None)
+                    meta_file.unlink()
+                    self._part(upload_id).unlink(missing_ok=True)
+            except OSError:
+                pass
+        for part in self.parts_dir.glob('*.part'):
+            try:
+                if not self._meta_file(part.stem).exists() and part.stat().st_mtime < cutoff:
+                    part.unlink()
+            except OSError:
+                pass
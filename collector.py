@@ -0,0 +1,191 @@
+"""Subprocess-free system collection layer.
+
+Reads battery, backlight and thermal data straight from sysfs instead of
+shelling out to ``cat``/``uptime``/``uname``/``ip``.  Sysfs globs are
+resolved once at construction and static host facts (kernel, OS, hostname)
+are read once, so a status poll is just a handful of small file reads.
+
+The sysfs root and os-release path are configurable so the collector can be
+pointed at a fake tree.
+"""
+import os
+import re
+import socket
+import time
+from pathlib import Path
+
+import psutil
+
+PREFERRED_BATTERY = 'qcom-battery'
+
+
+def _natural_key(path: Path):
+    """Sort thermal_zone10 after thermal_zone2."""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', path.name)]
+
+
+def _read(path) -> str:
+    """Read a small sysfs attribute, returning '' if it is missing or unreadable."""
+    if path is None:
+        return ''
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def format_uptime(seconds: float) -> str:
+    """Format seconds the way `uptime -p` does (e.g. 'up 2 days, 3 hours, 5 minutes')."""
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 1440)
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    if days:
+        parts.append(f"{days} day{'s' if days != 1 else ''}")
+    if hours:
+        parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
+    if minutes or not parts:
+        parts.append(f"{minutes} minute{'s' if minutes != 1 else ''}")
+    return 'up ' + ', '.join(parts)
+
+
+def _cpu_busy_total(times):
+    """(busy, total) CPU seconds from a psutil.cpu_times() reading, counted the
+    way psutil.cpu_percent() does (guest time is already part of user time)."""
+    total = sum(times) - getattr(times, 'guest', 0) - getattr(times, 'guest_nice', 0)
+    return total - times.idle - getattr(times, 'iowait', 0), total
+
+
+class SystemCollector:
+    """Reads host metrics from sysfs/procfs without spawning subprocesses."""
+
+    def __init__(self, sysfs_root='/sys', os_release='/etc/os-release'):
+        self.sysfs_root = Path(sysfs_root)
+        self.os_release = Path(os_release)
+        self.rescan()
+        # Static facts: read once at startup
+        self.hostname = socket.gethostname()
+        self.kernel = os.uname().release
+        self.os_name = self._read_os_name()
+        self.boot_time = psutil.boot_time()
+        # CPU usage baseline, private to this collector
+        self._cpu_times = psutil.cpu_times()
+        self._cpu_at = time.monotonic()
+        self._cpu_usage = 0.0
+
+    # ---- setup ----
+
+    def rescan(self):
+        """Resolve the sysfs device paths (battery, backlight, thermal zone)."""
+        self.battery_dir = self._find_battery()
+        self.backlight_dir = self._first_dir('class/backlight')
+        self.thermal_path = self._find_thermal()
+
+    def _first_dir(self, rel):
+        base = self.sysfs_root / rel
+        try:
+            dirs = sorted(p for p in base.iterdir() if p.is_dir())
+        except OSError:
+            return None
+        return dirs[0] if dirs else None
+
+    def _find_battery(self):
+        base = self.sysfs_root / 'class' / 'power_supply'
+        preferred = base / PREFERRED_BATTERY
+        if (preferred / 'capacity').exists():
+            return preferred
+        try:
+            supplies = sorted(base.iterdir())
+        except OSError:
+            return None
+        for supply in supplies:
+            if _read(supply / 'type') == 'Battery' and (supply / 'capacity').exists():
+                return supply
+        return None
+
+    def _find_thermal(self):
+        base = self.sysfs_root / 'class' / 'thermal'
+        zones = sorted(base.glob('thermal_zone*'), key=_natural_key)
+        for zone in zones:
+            if _read(zone / 'temp').lstrip('-').isdigit():
+                return zone / 'temp'
+        return None
+
+    def _read_os_name(self):
+        try:
+            with open(self.os_release, 'r') as f:
+                for line in f:
+                    if line.startswith('PRETTY_NAME='):
+                        return line.split('=', 1)[1].strip().strip('"')
+        except OSError:
+            pass
+        return 'N/A'
+
+    # ---- readings ----
+
+    def battery(self):
+        """Return {'capacity': str, 'status': str} as reported by the kernel."""
+        if self.battery_dir is None:
+            return {'capacity': 'N/A', 'status': 'N/A'}
+        return {
+            'capacity': _read(self.battery_dir / 'capacity') or 'N/A',
+            'status': _read(self.battery_dir / 'status') or 'N/A',
+        }
+
+    @property
+    def brightness_path(self):
+        return self.backlight_dir / 'brightness' if self.backlight_dir else None
+
+    def max_brightness(self) -> int:
+        if self.backlight_dir is None:
+            return 0
+        value = _read(self.backlight_dir / 'max_brightness')
+        return int(value) if value.isdigit() else 0
+
+    def brightness(self):
+        """Return current/max brightness and percentage."""
+        if self.backlight_dir is None:
+            return {'current': 'N/A', 'max': 'N/A', 'percentage': 0}
+        current = _read(self.brightness_path)
+        maximum = self.max_brightness()
+        percentage = round(int(current) / maximum * 100, 1) if current.isdigit() and maximum else 0
+        return {'current': current or 'N/A', 'max': str(maximum), 'percentage': percentage}
+
+    def temperature(self):
+        """CPU temperature in °C from the first thermal zone, or 'N/A'."""
+        raw = _read(self.thermal_path)
+        if not raw.lstrip('-').isdigit():
+            return 'N/A'
+        return round(int(raw) / 1000, 1)
+
+    def cpu_usage(self, min_interval=0.0) -> float:
+        """CPU busy % since the previous reading.
+
+        The baseline is this collector's own cpu_times(), so other callers of
+        psutil.cpu_percent() can't shorten the measured interval.  A call less
+        than min_interval seconds after the previous reading returns that
+        reading rather than measuring a sliver of time.
+        """
+        now = time.monotonic()
+        if now - self._cpu_at < min_interval:
+            return self._cpu_usage
+        times = psutil.cpu_times()
+        busy, total = _cpu_busy_total(times)
+        prev_busy, prev_total = _cpu_busy_total(self._cpu_times)
+        if total > prev_total:
+            self._cpu_usage = round(min(100.0, max(0.0, (busy - prev_busy) / (total - prev_total) * 100)), 1)
+        self._cpu_times, self._cpu_at = times, now
+        return self._cpu_usage
+
+    def uptime(self) -> str:
+        return format_uptime(time.time() - self.boot_time)
+
+    def ip_addresses(self):
+        """Non-loopback IPv4 addresses of all interfaces."""
+        addresses = []
+        for addrs in psutil.net_if_addrs().values():
+            for addr in addrs:
+                if addr.family == socket.AF_INET and not addr.address.startswith('127.'):
+                    addresses.append(addr.address)
+        return addresses
@@ -0,0 +1,77 @@
+"""Server-Sent Events fan-out.
+
+A single Broadcaster is shared by every connected /api/stream client.  Each
+event is serialised once in publish() and the same bytes are handed to every
+subscriber queue, so the cost of an update does not grow with the number of
+open tabs.  The latest payload of each event type is kept so a newly
+connected client is brought up to date immediately.
+"""
+import itertools
+import json
+import queue
+import threading
+
+
+class Broadcaster:
+    """Fan-out of SSE messages to any number of subscriber queues."""
+
+    def __init__(self, max_queue=64, heartbeat=15.0):
+        self.max_queue = max_queue
+        self.heartbeat = heartbeat
+        self._subscribers = set()
+        self._latest = {}  # event type -> encoded message
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self) -> queue.Queue:
+        """Register a new client; its queue is primed with the latest events."""
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            for message in self._latest.values():
+                q.put_nowait(message)
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event: str, data, replay=True):
+        """Encode an event once and queue it for every subscriber.
+
+        replay: keep it as the latest `event` message for new subscribers.
+        """
+        message = (f'id: {next(self._ids)}\nevent: {event}\n'
+                   f'data: {json.dumps(data, separators=(",", ":"))}\n\n').encode()
+        with self._lock:
+            if replay:
+                self._latest[event] = message
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # Slow client: drop its oldest message rather than block publishers
+                try:
+                    q.get_nowait()
+                    q.put_nowait(message)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def stream(self):
+        """Generator of SSE bytes for one client; unsubscribes when closed."""
+        q = self.subscribe()
+        try:
+            yield b'retry: 5000\n\n'
+            while True:
+                try:
+                    yield q.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield b': keepalive\n\n'
+        finally:
+            self.unsubscribe(q)
@@ -0,0 +1,106 @@
+"""File downloads with validators and byte ranges.
+
+:func:`send_file` answers ``If-None-Match``/``If-Modified-Since`` with 304,
+a single ``Range`` (guarded by ``If-Range``) with 206, an unsatisfiable one
+with 416, and everything else with the whole file.  The ETag is built from
+the file's size and mtime, so it never requires reading the file.
+
+The body is a :class:`FileRange`: iterating it reads the file in blocks,
+which any WSGI server can use, while ``wsgi_server`` spots its ``file``,
+``offset`` and ``length`` and hands the range to ``socket.sendfile`` (the
+kernel copies the file; Python never sees the bytes).
+"""
+import mimetypes
+import os
+from datetime import datetime, timezone
+
+from flask import Response, request
+
+READ_BLOCK = 256 * 1024
+
+
+class FileRange:
+    """WSGI body for `length` bytes of an open file starting at `offset`."""
+
+    def __init__(self, file, offset, length):
+        self.file = file
+        self.offset = offset
+        self.length = length
+
+    def __iter__(self):
+        self.file.seek(self.offset)
+        remaining = self.length
+        while remaining > 0:
+            block = self.file.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+    def close(self):
+        self.file.close()
+
+
+def _etag(st):
+    return f'{st.st_size:x}-{st.st_mtime_ns:x}'
+
+
+def send_file(path, mimetype=None):
+    """Response serving `path`, honouring conditional and Range requests."""
+    f = open(path, 'rb')
+    try:
+        st = os.fstat(f.fileno())  # the file we opened, even if path was just replaced
+        size = st.st_size
+        etag = _etag(st)
+        modified = datetime.fromtimestamp(int(st.st_mtime), timezone.utc)
+        mimetype = mimetype or mimetypes.guess_type(str(path))[0] or 'application/octet-stream'
+
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            since = request.if_modified_since
+            not_modified = bool(since and modified <= since)
+        if not_modified:
+            f.close()
+            return _finish(Response(status=304), etag, modified)
+
+        start, length, status = 0, size, 200
+        byte_range = request.range
+        # Only a single byte range is honoured (a multi-range request gets the
+        # whole file, which HTTP allows), and only while If-Range still matches
+        if byte_range is not None and len(byte_range.ranges) == 1 and _if_range_ok(etag, modified):
+            bounds = byte_range.range_for_length(size)
+            if bounds is None:
+                f.close()
+                response = _finish(Response(status=416), etag, modified)
+                response.headers['Content-Range'] = f'bytes */{size}'
+                return response
+            start, stop = bounds
+            length, status = stop - start, 206
+
+        response = Response(FileRange(f, start, length), status=status, mimetype=mimetype,
+                            direct_passthrough=True)
+        response.content_length = length
+        if status == 206:
+            response.headers['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+        return _finish(response, etag, modified)
+    except BaseException:
+        f.close()
+        raise
+
+
+def _if_range_ok(etag, modified):
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return if_range.date == modified
+    return True  # no If-Range header
+
+
+def _finish(response, etag, modified):
+    response.set_etag(etag)
+    response.last_modified = modified
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = 'no-cache'  # always revalidate (cheap: 304)
+    return response
@@ -0,0 +1,216 @@
+"""File change notifications via inotify, with a polling fallback.
+
+Watches the *directories* holding the registered files, so atomic
+temp-file-plus-rename replacements are seen (a watch on the old inode would
+be lost).  Bursts of events for one file are debounced into a single
+callback, fired once the file has been quiet for the debounce period (or,
+with ``max_delay``, at the latest that long into a burst, for files that
+are written continuously).  A file can be limited to the events that mark
+a finished write (``COMPLETE_EVENTS``), so a reader never sees it half
+written.  A slow stat() poll runs alongside as a safety net, and on its own
+when inotify is unavailable (non-Linux, exhausted watches, missing
+directory).
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# A write finished in place, or a file renamed into place
+COMPLETE_EVENTS = IN_CLOSE_WRITE | IN_MOVED_TO
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _file_state(path):
+    try:
+        st = os.stat(path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class _Inotify:
+    """Minimal ctypes binding: init, add_watch, read events."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def add_watch(self, directory, mask=WATCH_MASK):
+        wd = self._add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {directory}')
+        return wd
+
+    def read(self):
+        """Yield (wd, mask, name) for all queued events."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            yield wd, mask, name
+
+
+class FileWatcher:
+    """Per-file change callbacks driven by inotify (or polling)."""
+
+    def __init__(self, debounce=0.5, poll_interval=30):
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend = None  # 'inotify' or 'poll' once started
+        self._callbacks = {}  # path -> [callback]
+        self._debounce = {}   # path -> seconds
+        self._max_delay = {}  # path -> seconds from the first event of a burst
+        self._events = {}     # path -> inotify mask that counts as a change
+        self._states = {}     # path -> last seen stat state
+        self._pending = {}    # path -> fire deadline
+        self._bursts = {}     # path -> (time of the burst's first event, state when last marked)
+        self._dirs = {}       # inotify wd -> directory
+        self._lock = threading.Lock()
+        self._inotify = None
+        self._thread = None
+
+    def watch(self, path, callback, debounce=None, max_delay=None, events=None):
+        """Call callback(path) after `path` changes (debounced). Can be called after start().
+
+        `events` restricts which inotify events count as a change (e.g.
+        COMPLETE_EVENTS); `max_delay` caps how long a continuous burst can
+        hold the callback back.
+        """
+        path = Path(path).absolute()
+        with self._lock:
+            first = path not in self._callbacks
+            self._callbacks.setdefault(path, []).append(callback)
+            if debounce is not None:
+                self._debounce[path] = debounce
+            if max_delay is not None:
+                self._max_delay[path] = max_delay
+            if events is not None:
+                self._events[path] = events
+            if first:
+                self._states[path] = _file_state(path)
+        if first and self._inotify is not None:
+            self._add_dir(path.parent)
+
+    def _add_dir(self, directory):
+        if directory in self._dirs.values():
+            return
+        try:
+            self._dirs[self._inotify.add_watch(directory)] = directory
+        except OSError:
+            pass  # covered by the stat poll
+
+    def start(self):
+        if self._thread is not None:
+            return
+        try:
+            self._inotify = _Inotify()
+            for path in list(self._callbacks):
+                self._add_dir(path.parent)
+            self.backend = 'inotify'
+        except (OSError, AttributeError):
+            self._inotify = None
+            self.backend = 'poll'
+        self._thread = threading.Thread(target=self._run, daemon=True, name='file_watcher')
+        self._thread.start()
+
+    # ---- event loop ----
+
+    def _mark(self, path, now):
+        # Every event pushes the deadline out (trailing edge), so a burst fires
+        # once the file has gone quiet; max_delay bounds how far it can move.
+        started = self._bursts[path][0] if path in self._bursts else now
+        self._bursts[path] = (started, _file_state(path))
+        deadline = now + self._debounce.get(path, self.debounce)
+        max_delay = self._max_delay.get(path)
+        if max_delay is not None:
+            deadline = min(deadline, started + max_delay)
+        self._pending[path] = deadline
+
+    def _run(self):
+        next_poll = time.monotonic() + self.poll_interval
+        while True:
+            now = time.monotonic()
+            wake = min([next_poll] + list(self._pending.values()))
+            timeout = max(0.0, wake - now)
+            if self._inotify is not None:
+                readable, _, _ = select.select([self._inotify.fd], [], [], timeout)
+                if readable:
+                    self._handle_events(time.monotonic())
+            else:
+                time.sleep(timeout)
+
+            now = time.monotonic()
+            if now >= next_poll:
+                self._poll(now)
+                next_poll = now + self.poll_interval
+            self._fire_due(now)
+
+    def _handle_events(self, now):
+        with self._lock:
+            watched = list(self._callbacks)
+        for wd, mask, name in self._inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                for path in watched:  # lost events: re-check everything
+                    self._mark(path, now)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / name
+            if path in self._callbacks and mask & self._events.get(path, WATCH_MASK):
+                self._mark(path, now)
+
+    def _poll(self, now):
+        with self._lock:
+            watched = list(self._callbacks)
+        for path in watched:
+            if _file_state(path) != self._states.get(path):
+                self._mark(path, now)
+
+    def _fire_due(self, now):
+        for path, deadline in list(self._pending.items()):
+            if deadline > now:
+                continue
+            state = _file_state(path)
+            started, marked = self._bursts[path]
+            max_delay = self._max_delay.get(path)
+            if state != marked and (max_delay is None or now < started + max_delay):
+                self._mark(path, now)  # changed again without an event (poll): not settled yet
+                continue
+            del self._pending[path], self._bursts[path]
+            if state == self._states.get(path):
+                continue  # touched but unchanged (e.g. a no-op write)
+            self._states[path] = state
+            with self._lock:
+                callbacks = list(self._callbacks.get(path, ()))
+            for callback in callbacks:
+                try:
+                    callback(path)
+                except Exception as e:
+                    print(f"File watcher callback for {path.name} failed: {e}")
@@ -0,0 +1,214 @@
+"""City geocoding: an in-memory cache in front of a rate-limited Nominatim queue.
+
+geocode_cache.json is loaded once; new coordinates are written back behind
+a short delay, so a burst of lookups costs one rewrite.  The file is merged
+before each write, so entries added by the rally bot itself are kept.
+Lookups that miss the cache go through one worker thread that spaces
+requests by ``min_interval`` (Nominatim allows 1/s).  Concurrent lookups
+of the same city share a single request, and interactive lookups jump
+ahead of background pre-geocoding.
+"""
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+import requests
+
+NOMINATIM_URL = 'https://nominatim.openstreetmap.org/search'
+INTERACTIVE, BACKGROUND = 0, 1  # queue priorities
+
+
+class Geocoder:
+    """City -> [lat, lng] with single-flight, rate-limited lookups."""
+
+    def __init__(self, cache_file, url=NOMINATIM_URL, min_interval=1.0, timeout=8,
+                 save_delay=5.0, user_agent='rally-dashboard/1.0'):
+        self.cache_file = Path(cache_file)
+        self.url = url
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.save_delay = save_delay
+        self.user_agent = user_agent
+        self.coords = {}
+        self.not_found = set()  # not persisted: retried after a restart
+        self.version = 0  # bumped whenever coords gains entries
+        self._pending = {}  # city -> Future shared by every waiter
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._save_timer = None
+        self._file_state = None  # (mtime_ns, size) of our last read/write
+        self._last_request = 0.0
+        self._worker = None
+
+    # ---- persistence ----
+
+    def _stat(self):
+        try:
+            st = self.cache_file.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def load(self):
+        """Merge geocode_cache.json into memory (skipped if unchanged since our last read/write)."""
+        state = self._stat()
+        if state is None or state == self._file_state:
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading geocode cache: {e}")
+            return
+        with self._lock:
+            added = data.keys() - self.coords.keys()
+            for city in added:
+                self.coords[city] = data[city]
+            if added:
+                self.version += 1
+            self._file_state = state
+
+    def save(self):
+        """Write the cache now (atomic replace), keeping entries others added to the file."""
+        self.load()
+        with self._lock:
+            self._save_timer = None
+            data = dict(self.coords)
+        tmp = self.cache_file.with_name(self.cache_file.name + '.tmp')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+        except OSError as e:
+            print(f"Error saving geocode cache: {e}")
+            return
+        with self._lock:
+            self._file_state = self._stat()
+
+    def _schedule_save(self):
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write pending entries immediately (e.g. at shutdown)."""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+            self.save()
+
+    # ---- lookups ----
+
+    def get(self, city):
+        """Cached coordinates or None; never hits the network."""
+        return self.coords.get(city)
+
+    def _submit(self, city, priority):
+        """Shared future for `city`, enqueuing a lookup unless one is already pending."""
+        with self._lock:
+            future = self._pending.get(city)
+            if future is None:
+                future = self._pending[city] = Future()
+            elif priority == BACKGROUND:
+                return future
+        # An interactive request re-queues a pending background one ahead of
+        # the rest; the worker skips whichever copy comes second.
+        self._queue.put((priority, next(self._seq), city))
+        self._start()
+        return future
+
+    def request(self, cities, priority=INTERACTIVE):
+        """Split cities into (known {city: coords}, {city: future} for the rest)."""
+        known, futures = {}, {}
+        for city in cities:
+            if not city:
+                continue
+            coords = self.coords.get(city)
+            if coords is not None:
+                known[city] = coords
+            elif city not in self.not_found:
+                futures[city] = self._submit(city, priority)
+        return known, futures
+
+    def lookup(self, city, timeout=None):
+        """Coordinates for one city, waiting for the queue if needed.
+
+        Returns None if Nominatim has no match; raises TimeoutError if the
+        lookup is still queued after `timeout` seconds.
+        """
+        known, futures = self.request([city])
+        if city in known:
+            return known[city]
+        if city not in futures:
+            return None
+        return futures[city].result(timeout)
+
+    def prefetch(self, cities):
+        """Queue background lookups for every uncached city."""
+        _known, futures = self.request(cities, priority=BACKGROUND)
+        return len(futures)
+
+    # ---- worker ----
+
+    def _start(self):
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, daemon=True, name='geocoder')
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            _priority, _seq, city = self._queue.get()
+            with self._lock:
+                future = self._pending.get(city)
+            if future is None:
+                continue  # already answered via a higher-priority copy
+            try:
+                coords = self._fetch(city)
+            except Exception as e:
+                with self._lock:
+                    self._pending.pop(city, None)
+                future.set_exception(e)
+                continue
+            with self._lock:
+                if coords is None:
+                    self.not_found.add(city)
+                else:
+                    self.coords[city] = coords
+                    self.version += 1
+                self._pending.pop(city, None)
+            future.set_result(coords)
+            if coords is not None:
+                self._schedule_save()
+
+    def _fetch(self, city):
+        wait = self._last_request + self.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            resp = requests.get(
+                self.url,
+                params={'q': city, 'format': 'json', 'limit': 1},
+                headers={'User-Agent': self.user_agent},
+                timeout=self.timeout,
+            )
+        finally:
+            # Space from the end of the previous request, so network jitter
+            # can't squeeze two into one second
+            self._last_request = time.monotonic()
+        resp.raise_for_status()
+        results = resp.json()
+        if not results:
+            return None
+        return [float(results[0]['lat']), float(results[0]['lon'])]
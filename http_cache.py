@@ -0,0 +1,111 @@
+"""Conditional, compressed JSON responses for the heavy endpoints.
+
+Each endpoint supplies a cheap *version* (a file mtime, a store counter, ...)
+alongside a builder for its payload.  The version becomes a strong ETag, so
+``If-None-Match``/``If-Modified-Since`` are answered with 304 before the
+payload is even built.  The gzipped body is a different representation and
+gets its own tag (the same one suffixed ``-gz``); either is accepted.  Otherwise the serialised (and, for large bodies,
+gzipped) bytes are cached per key and version and reused until the version
+changes.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import Response, request
+
+GZIP_MIN_BYTES = 1024
+GZIP_ETAG_SUFFIX = '-gz'
+
+
+class ResponseCache:
+    """LRU of serialised JSON bodies keyed by (request key, version)."""
+
+    def __init__(self, max_entries=64, gzip_level=6):
+        self.max_entries = max_entries
+        self.gzip_level = gzip_level
+        self._entries = OrderedDict()  # key -> {'version', 'body', 'gzip'}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _etag(key, version) -> str:
+        return hashlib.blake2s(f'{key}\0{version}'.encode(), digest_size=12).hexdigest()
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['version'] == version:
+                self._entries.move_to_end(key)
+                return entry
+        return None
+
+    def _put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def json(self, key, version, build, last_modified=None):
+        """Respond with build()'s JSON for `key` at `version`.
+
+        build() may return a Flask response (or a (body, status) tuple) to
+        bypass caching, e.g. for validation errors.  last_modified is an
+        epoch timestamp used for Last-Modified / If-Modified-Since.
+        """
+        etag = self._etag(key, version)
+        gzip_etag = etag + GZIP_ETAG_SUFFIX
+        modified = (datetime.fromtimestamp(int(last_modified), timezone.utc)
+                    if last_modified else None)
+
+        if request.if_none_match:
+            # Whether the body would be gzipped isn't known before it is built;
+            # answer with the tag of whichever representation the client holds
+            if request.if_none_match.contains(gzip_etag) and 'gzip' in request.accept_encodings:
+                return self._finish(Response(status=304), gzip_etag, modified)
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            since = request.if_modified_since
+            not_modified = bool(modified and since and modified <= since)
+        if not_modified:
+            return self._finish(Response(status=304), etag, modified)
+
+        entry = self._get(key, version)
+        if entry is None:
+            payload = build()
+            if isinstance(payload, (Response, tuple)):
+                return payload
+            body = json.dumps(payload, separators=(',', ':')).encode()
+            entry = {'version': version, 'body': body, 'gzip': None}
+            self._put(key, entry)
+
+        body = entry['body']
+        encoding = None
+        if len(body) >= GZIP_MIN_BYTES and 'gzip' in request.accept_encodings:
+            if entry['gzip'] is None:
+                entry['gzip'] = gzip.compress(body, self.gzip_level)
+            body, encoding, etag = entry['gzip'], 'gzip', gzip_etag
+
+        response = Response(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return self._finish(response, etag, modified)
+
+    @staticmethod
+    def _finish(response, etag, modified):
+        response.set_etag(etag)
+        if modified:
+            response.last_modified = modified
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'  # always revalidate
+        return response
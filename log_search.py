@@ -0,0 +1,230 @@
+"""Paginated search over a large, append-only log through mmap.
+
+The file is never read whole.  A sparse index of (byte offset, timestamp)
+checkpoints -- one per CHECKPOINT_BYTES, at a line start -- is extended
+incrementally as the log grows, so a from/to window is turned into a byte
+region with two binary searches.  Only that region is scanned, line by line
+on the mapped pages, newest-first or oldest-first from a cursor.  Timestamps
+are compared as their 'YYYY-MM-DD HH:MM:SS' text, which sorts like time.
+"""
+import mmap
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+CHECKPOINT_BYTES = 64 * 1024
+SCAN_BUDGET_BYTES = 32 * 1024 * 1024  # per request; a cursor continues the scan
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+_TS_LEN = 19
+_LINE_RE = re.compile(rb'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\S* - .*? - ([A-Z]+) - ')
+
+
+def _line_time(line):
+    """'YYYY-MM-DD HH:MM:SS' prefix of a log line, or None for continuation lines."""
+    prefix = line[:_TS_LEN]
+    if len(prefix) == _TS_LEN and prefix[:2].isdigit() and prefix[4:5] == b'-' and prefix[13:14] == b':':
+        return prefix
+    return None
+
+
+def _cursor(generation, direction, offset):
+    """'b<offset>' pages towards older lines, 'a<offset>' towards newer ones."""
+    return f'{generation}-{direction}{offset}'
+
+
+def _epoch_text(ts):
+    return datetime.fromtimestamp(ts).strftime(_TS_FORMAT).encode()
+
+
+class LogIndex:
+    """Sparse offset/timestamp index over one log file, with mmap-backed search."""
+
+    def __init__(self, path, checkpoint_bytes=CHECKPOINT_BYTES, scan_budget=SCAN_BUDGET_BYTES):
+        self.path = path
+        self.checkpoint_bytes = checkpoint_bytes
+        self.scan_budget = scan_budget
+        self.offsets = array('Q')
+        self.times = array('d')
+        self.generation = ''  # changes on rotation/truncation; stales cursors
+        self._inode = None
+        self._end = 0  # end of the last complete line seen
+        self._lock = threading.Lock()
+
+    # ---- index maintenance ----
+
+    def _reset(self, st):
+        self.offsets = array('Q')
+        self.times = array('d')
+        self._end = 0
+        self._inode = st.st_ino
+        self.generation = f'{st.st_ino:x}.{st.st_mtime_ns:x}'
+
+    def refresh(self, mm, st):
+        """Extend the checkpoints over bytes appended since the last refresh."""
+        if st.st_ino != self._inode or st.st_size < self._end:
+            self._reset(st)
+        end = mm.rfind(b'\n') + 1  # a partially written last line is left for later
+        if end <= self._end:
+            return
+        next_cp = self.offsets[-1] + self.checkpoint_bytes if self.offsets else 0
+        while next_cp < end:
+            pos = 0
+            if next_cp:
+                nl = mm.find(b'\n', next_cp - 1, end)
+                if nl < 0:
+                    break
+                pos = nl + 1
+            # First timestamped line at or after the boundary
+            while pos < end:
+                nl = mm.find(b'\n', pos, end)
+                stamp = _line_time(mm[pos:pos + _TS_LEN])
+                if stamp is not None:
+                    try:
+                        ts = datetime.strptime(stamp.decode(), _TS_FORMAT).timestamp()
+                    except ValueError:
+                        ts = None
+                    if ts is not None:
+                        # Keep times non-decreasing so bisect stays valid
+                        self.offsets.append(pos)
+                        self.times.append(max(ts, self.times[-1]) if self.times else ts)
+                        break
+                pos = nl + 1
+            else:
+                break  # no timestamped line yet; retry on the next refresh
+            next_cp = self.offsets[-1] + self.checkpoint_bytes
+        self._end = end
+
+    def _region(self, start, end):
+        """Byte range that holds every line timestamped within [start, end] (epoch seconds)."""
+        lo, hi = 0, self._end
+        if start is not None:
+            i = bisect_left(self.times, start) - 1  # last checkpoint strictly before start
+            lo = self.offsets[i] if i >= 0 else 0
+        if end is not None:
+            j = bisect_right(self.times, end)  # first checkpoint strictly after end
+            hi = self.offsets[j] if j < len(self.offsets) else self._end
+        return lo, hi
+
+    # ---- cursors ----
+
+    def _parse_cursor(self, cursor):
+        """(direction, offset) from a cursor; ValueError if malformed, LookupError if stale."""
+        try:
+            generation, rest = cursor.rsplit('-', 1)
+            direction, offset = rest[0], int(rest[1:])
+        except (ValueError, IndexError):
+            raise ValueError('Invalid cursor')
+        if direction not in 'ba' or offset < 0:
+            raise ValueError('Invalid cursor')
+        if generation != self.generation:
+            raise LookupError('Log was rotated; restart the search')
+        return direction, offset
+
+    # ---- search ----
+
+    def search(self, query='', levels=(), start=None, end=None, cursor=None, limit=100):
+        """One page of matching lines, oldest first.
+
+        Without a cursor the page holds the newest matches.  'older' and
+        'newer' are cursors for the adjacent pages (None when the region is
+        exhausted in that direction).  Lines without a timestamp
+        (tracebacks) are filtered by text and level only.
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return {'lines': [], 'older': None, 'newer': None, 'scanned_bytes': 0}
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_size == 0:
+                return {'lines': [], 'older': None, 'newer': None, 'scanned_bytes': 0}
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with self._lock:
+                    self.refresh(mm, st)
+                    direction, pos = self._parse_cursor(cursor) if cursor else ('b', None)
+                    lo, hi = self._region(start, end)
+                    generation = self.generation
+                if pos is None:
+                    pos = hi
+                pos = min(max(pos, lo), hi)
+                matcher = self._matcher(query, levels,
+                                        _epoch_text(start) if start is not None else None,
+                                        _epoch_text(end) if end is not None else None)
+                if direction == 'a':
+                    return self._scan_forward(mm, pos, lo, hi, matcher, limit, generation)
+                return self._scan_backward(mm, pos, lo, hi, matcher, limit, generation)
+
+    @staticmethod
+    def _matcher(query, levels, start_text, end_text):
+        # Case-insensitive via casefold() (bytes.lower() only folds ASCII, so
+        # 'ZÜRICH' would miss 'zürich'); all-ASCII lines skip the decode
+        needle = query.casefold() if query else None
+        ascii_needle = needle.encode() if needle is not None and needle.isascii() else None
+        markers = [f' - {level} - '.encode() for level in levels]
+
+        def contains(line):
+            if ascii_needle is not None and line.isascii():
+                return ascii_needle in line.lower()
+            return needle in line.decode(errors='replace').casefold()
+
+        def match(line):
+            stamp = _line_time(line)
+            if stamp is not None:
+                if start_text is not None and stamp < start_text:
+                    return False
+                if end_text is not None and stamp > end_text:
+                    return False
+            if markers and not any(m in line for m in markers):
+                return False
+            return needle is None or contains(line)
+        return match
+
+    @staticmethod
+    def _entry(offset, line):
+        match = _LINE_RE.match(line)
+        return {
+            'offset': offset,
+            'timestamp': match.group(1).decode() if match else None,
+            'level': match.group(2).decode() if match else None,
+            'text': line.decode(errors='replace').rstrip('\r'),
+        }
+
+    def _scan_forward(self, mm, pos, lo, hi, matcher, limit, generation):
+        lines, start_pos = [], pos
+        budget_end = min(hi, pos + self.scan_budget)
+        while pos < budget_end and len(lines) < limit:
+            nl = mm.find(b'\n', pos, hi)
+            line_end = nl if nl >= 0 else hi
+            line = mm[pos:line_end]
+            if matcher(line):
+                lines.append(self._entry(pos, line))
+            pos = line_end + 1
+        pos = min(pos, hi)
+        return {
+            'lines': lines,
+            'older': _cursor(generation, 'b', start_pos) if start_pos > lo else None,
+            'newer': _cursor(generation, 'a', pos) if pos < hi else None,
+            'scanned_bytes': pos - start_pos,
+        }
+
+    def _scan_backward(self, mm, pos, lo, hi, matcher, limit, generation):
+        lines, start_pos = [], pos
+        budget_start = max(lo, pos - self.scan_budget)
+        while pos > budget_start and len(lines) < limit:
+            begin = mm.rfind(b'\n', lo, pos - 1) + 1
+            begin = max(begin, lo)
+            line = mm[begin:pos - 1] if mm[pos - 1:pos] == b'\n' else mm[begin:pos]
+            if matcher(line):
+                lines.append(self._entry(begin, line))
+            pos = begin
+        lines.reverse()
+        return {
+            'lines': lines,
+            'older': _cursor(generation, 'b', pos) if pos > lo else None,
+            'newer': _cursor(generation, 'a', start_pos) if start_pos < hi else None,
+            'scanned_bytes': start_pos - pos,
+        }
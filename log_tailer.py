@@ -0,0 +1,193 @@
+"""Incremental tailer for the rally bot's bot.log.
+
+Keeps the log open and a byte offset into it, so each poll parses only the
+lines appended since the last one (like ``tail -F``: rotation and truncation
+are detected by inode and size).  Parsed lines feed small per-level ring
+buffers and per-hour error/warning counters; the offset and that state are
+persisted so a restart resumes where it left off instead of rescanning.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from pathlib import Path
+
+LEVELS = ('ERROR', 'WARNING')
+BOOTSTRAP_BYTES = 200_000  # without saved state, start this far from the end
+
+
+def parse_line(line):
+    """Split 'YYYY-MM-DD HH:MM:SS,mmm - name - LEVEL - message' into (timestamp, level).
+
+    Either may be None for continuation lines (tracebacks) or other formats.
+    """
+    parts = line.split(' - ', 3)
+    timestamp = parts[0].strip() if len(parts) >= 2 and parts[0][:4].isdigit() else None
+    level = None
+    for candidate in LEVELS:
+        if f' - {candidate} - ' in line:
+            level = candidate
+            break
+    return timestamp, level
+
+
+class LogTailer:
+    """Incremental parser of one log file with per-level and per-hour summaries."""
+
+    def __init__(self, path, state_file=None, recent_lines=25, level_lines=50,
+                 hours=168, save_interval=60):
+        self.path = Path(path)
+        self.state_file = Path(state_file) if state_file else None
+        self.hours = hours
+        self.save_interval = save_interval
+        self.recent = deque(maxlen=recent_lines)
+        self.by_level = {level: deque(maxlen=level_lines) for level in LEVELS}
+        self.hourly = OrderedDict()  # 'YYYY-MM-DD HH' -> {'errors': n, 'warnings': n}
+        self.last_entry = None
+        self.size = 0
+        self.version = 0  # bumped whenever new lines are parsed
+        self._file = None
+        self._inode = None
+        self._saved_offset = None
+        self._partial = b''
+        self._last_save = 0.0
+        self._lock = threading.Lock()
+        self._load_state()
+
+    # ---- persistence ----
+
+    def _load_state(self):
+        if not self.state_file or not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            self._inode = state['inode']
+            self._saved_offset = state['offset']
+            self.recent.extend(state.get('recent', []))
+            for level in LEVELS:
+                self.by_level[level].extend(state.get('by_level', {}).get(level, []))
+            self.hourly.update(state.get('hourly', {}))
+            self.last_entry = state.get('last_entry')
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading log tailer state: {e}")
+
+    def save_state(self):
+        """Persist offset and summaries (atomic replace)."""
+        if not self.state_file or self._file is None:
+            return
+        with self._lock:
+            state = {
+                'inode': self._inode,
+                'offset': self._file.tell() - len(self._partial),
+                'recent': list(self.recent),
+                'by_level': {level: list(lines) for level, lines in self.by_level.items()},
+                'hourly': self.hourly,
+                'last_entry': self.last_entry,
+            }
+            tmp = self.state_file.with_name(self.state_file.name + '.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_file)
+            self._last_save = time.monotonic()
+
+    # ---- tailing ----
+
+    def _open(self, offset, skip_partial=False):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, 'rb')
+        self._file.seek(offset)
+        if skip_partial:
+            self._file.readline()
+        self._partial = b''
+
+    def _resume(self, st):
+        """First open: continue from the saved offset, or summarise the tail without state."""
+        offset = self._saved_offset
+        if offset is not None:
+            # Rotated or truncated while we were down: the file is new, read it all
+            same = st.st_ino == self._inode and offset <= st.st_size
+            self._open(offset if same else 0)
+        else:
+            # No usable state: only summarise the recent tail, not the whole history
+            start = max(0, st.st_size - BOOTSTRAP_BYTES)
+            self._open(start, skip_partial=start > 0)
+        self._inode = st.st_ino
+
+    def poll(self):
+        """Parse anything appended since the last poll; returns the number of new lines."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return 0
+        with self._lock:
+            count = 0
+            if self._file is None:
+                self._resume(st)
+            else:
+                # Drain the old file first: a rotated log may still have a tail
+                count += self._consume()
+                if st.st_ino != self._inode:
+                    self._open(0)
+                    self._inode = st.st_ino
+                elif st.st_size < self._file.tell():
+                    # Truncated in place (e.g. copytruncate)
+                    self._open(0)
+            count += self._consume()
+            self.size = st.st_size
+            if count:
+                self.version += 1
+        if count and self.state_file and time.monotonic() - self._last_save > self.save_interval:
+            self.save_state()
+        return count
+
+    def _consume(self):
+        data = self._file.read()
+        if not data:
+            return 0
+        data = self._partial + data
+        lines = data.split(b'\n')
+        self._partial = lines.pop()  # incomplete last line, if any
+        for raw in lines:
+            self._ingest(raw.decode(errors='replace').rstrip('\r'))
+        return len(lines)
+
+    def _ingest(self, line):
+        if not line.strip():
+            return
+        self.recent.append(line)
+        timestamp, level = parse_line(line)
+        if timestamp:
+            self.last_entry = timestamp
+        if level is None:
+            return
+        self.by_level[level].append(line)
+        hour = (timestamp or datetime.now().strftime('%Y-%m-%d %H'))[:13]
+        counts = self.hourly.get(hour)
+        if counts is None:
+            counts = self.hourly[hour] = {'errors': 0, 'warnings': 0}
+            while len(self.hourly) > self.hours:
+                self.hourly.popitem(last=False)
+        counts['errors' if level == 'ERROR' else 'warnings'] += 1
+
+    # ---- queries ----
+
+    def summary(self, window_hours=24):
+        """Counts over the last window_hours plus the recent/per-level lines and hourly history."""
+        with self._lock:
+            since = (datetime.now() - timedelta(hours=window_hours - 1)).strftime('%Y-%m-%d %H')
+            window = [(h, c) for h, c in self.hourly.items() if h >= since]
+            return {
+                'file_size_mb': round(self.size / (1024 * 1024), 1),
+                'recent_errors': sum(c['errors'] for _, c in window),
+                'recent_warnings': sum(c['warnings'] for _, c in window),
+                'window_hours': window_hours,
+                'last_entry': self.last_entry,
+                'recent_lines': list(self.recent),
+                'warning_lines': list(self.by_level['WARNING']),
+                'error_lines': list(self.by_level['ERROR']),
+                'hourly': [{'hour': h, **c} for h, c in self.hourly.items()],
+            }
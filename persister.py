@@ -0,0 +1,141 @@
+"""Debounced write-behind persistence of whole-file snapshots.
+
+Owners register a file with a ``dump()`` callable returning its bytes and
+call :meth:`WriteBehind.mark` after each change.  One background thread
+writes a file once it has been quiet for ``delay`` seconds (or has been
+dirty for ``max_delay``, so a steady stream of changes still lands), so a
+burst of changes costs a single write.  Writes are atomic: temp file,
+fsync, rename.  :meth:`WriteBehind.flush` writes everything pending
+immediately, e.g. at shutdown.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+
+def atomic_write(path, data: bytes):
+    """Replace `path` with `data` via a fsync'd temp file and rename."""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class _Target:
+    def __init__(self, path, dump):
+        self.path = Path(path)
+        self.dump = dump
+        self.first_mark = None  # monotonic time of the oldest unwritten change
+        self.last_mark = None
+        self.marks = 0          # changes since the last write
+        self.total_marks = 0
+        self.writes = 0
+        self.last_write = None  # wall-clock time
+        self.last_error = None
+        self.write_lock = threading.Lock()  # one writer per file (worker vs flush)
+
+
+class WriteBehind:
+    """Coalesces bursts of changes to registered files into single atomic writes."""
+
+    def __init__(self, delay=1.0, max_delay=10.0):
+        self.delay = delay
+        self.max_delay = max_delay
+        self._targets = {}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def register(self, name, path, dump):
+        """Persist `dump()` (bytes) to `path` whenever `name` is marked dirty."""
+        with self._cond:
+            self._targets[name] = _Target(path, dump)
+
+    def mark(self, name):
+        """Record a change to `name`; it is written after the debounce."""
+        now = time.monotonic()
+        with self._cond:
+            target = self._targets[name]
+            if target.first_mark is None:
+                target.first_mark = now
+            target.last_mark = now
+            target.marks += 1
+            target.total_marks += 1
+            self._cond.notify()
+        self._start()
+
+    def _start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True, name='write_behind')
+        self._thread.start()
+
+    def _due(self, target):
+        return min(target.last_mark + self.delay, target.first_mark + self.max_delay)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                dirty = [t for t in self._targets.values() if t.first_mark is not None]
+                if not dirty:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                ready = [name for name, t in self._targets.items()
+                         if t.first_mark is not None and self._due(t) <= now]
+                if not ready:
+                    self._cond.wait(min(self._due(t) for t in dirty) - now)
+                    continue
+            for name in ready:
+                self._write(name)
+
+    def _write(self, name):
+        target = self._targets[name]
+        with target.write_lock:
+            with self._cond:
+                if target.first_mark is None:
+                    return
+                marks = target.marks
+                target.first_mark = target.last_mark = None
+                target.marks = 0
+            try:
+                atomic_write(target.path, target.dump())
+            except Exception as e:
+                with self._cond:
+                    target.last_error = str(e)
+                    # Still dirty: retry after another debounce
+                    now = time.monotonic()
+                    target.first_mark = target.first_mark or now
+                    target.last_mark = target.last_mark or now
+                    target.marks += marks
+                print(f"Error writing {target.path.name}: {e}")
+                return
+            with self._cond:
+                target.writes += 1
+                target.last_write = time.time()
+                target.last_error = None
+
+    def flush(self):
+        """Write every dirty file now."""
+        with self._cond:
+            names = [name for name, t in self._targets.items() if t.first_mark is not None]
+        for name in names:
+            self._write(name)
+
+    def stats(self):
+        """Per file: pending changes, total changes and writes, last write time and error."""
+        with self._cond:
+            return {
+                name: {
+                    'pending': t.marks,
+                    'changes': t.total_marks,
+                    'writes': t.writes,
+                    'last_write': t.last_write,
+                    'last_error': t.last_error,
+                }
+                for name, t in self._targets.items()
+            }
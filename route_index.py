@@ -0,0 +1,214 @@
+"""In-memory query index over the enriched rally routes.
+
+Built once per route-cache reload.  Every return gets an integer id; origin,
+destination and model names are normalised (case- and accent-insensitive)
+into value -> id-set maps, and every available date range is stored in an
+interval list sorted by start day.  A query intersects the id sets of the
+active filters and answers date-range overlap with a bisect over the
+intervals, instead of scanning every route and return.
+"""
+import bisect
+import re
+import unicodedata
+from datetime import date, datetime
+from functools import lru_cache
+
+SORT_KEYS = ('earliest', 'duration', 'origin')
+
+
+def normalize(text) -> str:
+    """Case-fold and strip accents so 'Zürich' matches 'zurich'."""
+    decomposed = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+def parse_day(value):
+    """Parse 'DD/MM/YYYY' (provider format) or ISO 'YYYY-MM-DD' into a day ordinal."""
+    if isinstance(value, date):
+        return value.toordinal()
+    return _parse_day_str(str(value).strip())
+
+
+@lru_cache(maxsize=4096)
+def _parse_day_str(value):
+    # Few distinct dates repeat across thousands of returns: cache the parse
+    for fmt in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).toordinal()
+        except ValueError:
+            continue
+    raise ValueError(f'Invalid date: {value!r} (expected DD/MM/YYYY or YYYY-MM-DD)')
+
+
+def parse_duration(dr):
+    """Trip length in days: '5+3 nights' -> 8, '3 nights max' -> 3, 9 -> 9, else from the dates."""
+    duration = str(dr.get('duration') or '').strip()
+    match = re.match(r'^(\d+)\s*\+\s*(\d+)', duration)
+    if match:
+        return int(match.group(1)) + int(match.group(2))
+    match = re.match(r'^(\d+)', duration)
+    if match:
+        return int(match.group(1))
+    try:
+        return parse_day(dr.get('endDate')) - parse_day(dr.get('startDate'))
+    except ValueError:
+        return 0
+
+
+def _return_sort_key(ret, key):
+    dates = ret.get('available_dates', ())
+    if key == 'earliest':
+        days = []
+        for dr in dates:
+            try:
+                days.append(parse_day(dr.get('startDate')))
+            except ValueError:
+                pass
+        return min(days, default=date.max.toordinal())
+    if key == 'duration':
+        return max((parse_duration(dr) for dr in dates), default=0)
+    return normalize(ret.get('destination'))
+
+
+def sort_routes(routes, key='earliest', descending=False):
+    """Sort routes in place, and each route's returns, by earliest date, duration or origin.
+
+    A route's earliest date is that of its earliest return and its duration
+    that of its longest trip.
+    """
+    if key not in SORT_KEYS:
+        raise ValueError(f'sort must be one of {", ".join(SORT_KEYS)}')
+    for route in routes:
+        route['returns'].sort(key=lambda r: _return_sort_key(r, key), reverse=descending)
+    if key == 'origin':
+        route_key = lambda r: normalize(r.get('origin'))
+    else:
+        pick = min if key == 'earliest' else max
+        route_key = lambda r: pick((_return_sort_key(ret, key) for ret in r['returns']), default=0)
+    routes.sort(key=route_key, reverse=descending)
+    return routes
+
+
+def project(route, fields):
+    """Keep only the requested fields of a route and of its returns.
+
+    Field names apply at both levels (route keys such as 'origin', return
+    keys such as 'destination').  'count' adds the number of returns to the
+    route; returns are kept whenever a field names something inside them.
+    """
+    out = {k: v for k, v in route.items() if k in fields and k != 'returns'}
+    if 'count' in fields:
+        out['count'] = len(route['returns'])
+    return_fields = fields - out.keys() - {'count'}
+    if return_fields:
+        out['returns'] = [{k: v for k, v in ret.items() if k in return_fields} for ret in route['returns']]
+    return out
+
+
+class _ValueMap:
+    """Normalised field value -> set of return ids."""
+
+    def __init__(self):
+        self.ids = {}
+
+    def add(self, value, ret_id):
+        self.ids.setdefault(normalize(value), set()).add(ret_id)
+
+    def match(self, terms):
+        """Ids whose value contains any of the terms.
+
+        Terms are matched as substrings against the distinct values, which
+        are far fewer than returns ('comfort' matches 'Comfort' and
+        'Comfort Standard' alike).
+        """
+        terms = [normalize(term) for term in terms]
+        matched = set()
+        for value, ids in self.ids.items():
+            if any(term in value for term in terms):
+                matched |= ids
+        return matched
+
+
+class RouteIndex:
+    """Token maps and a date-interval list over one routes dataset."""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.returns = []  # ret_id -> (route position, return dict)
+        self.origins = _ValueMap()
+        self.destinations = _ValueMap()
+        self.models = _ValueMap()
+        # Date ranges sorted by start: parallel lists for bisect
+        self._starts, self._ends, self._owners = [], [], []
+        self._max_span = 0
+
+        intervals = []
+        for pos, route in enumerate(routes):
+            for ret in route.get('returns', ()):
+                ret_id = len(self.returns)
+                self.returns.append((pos, ret))
+                self.origins.add(route.get('origin'), ret_id)
+                self.destinations.add(ret.get('destination'), ret_id)
+                self.models.add(ret.get('model_name'), ret_id)
+                for date_idx, dr in enumerate(ret.get('available_dates', ())):
+                    try:
+                        start = parse_day(dr.get('startDate'))
+                        end = parse_day(dr.get('endDate'))
+                    except ValueError:
+                        continue
+                    intervals.append((start, max(start, end), ret_id, date_idx))
+        intervals.sort()
+        for start, end, ret_id, date_idx in intervals:
+            self._starts.append(start)
+            self._ends.append(end)
+            self._owners.append((ret_id, date_idx))
+            self._max_span = max(self._max_span, end - start)
+
+    def __len__(self):
+        return len(self.returns)
+
+    def overlapping(self, start=None, end=None):
+        """{ret_id: [date indices]} for date ranges overlapping [start, end] (day ordinals)."""
+        # Any overlapping range starts no earlier than start - longest span
+        lo = bisect.bisect_left(self._starts, start - self._max_span) if start is not None else 0
+        hi = bisect.bisect_right(self._starts, end) if end is not None else len(self._starts)
+        matches = {}
+        for i in range(lo, hi):
+            if start is not None and self._ends[i] < start:
+                continue
+            ret_id, date_idx = self._owners[i]
+            matches.setdefault(ret_id, []).append(date_idx)
+        return matches
+
+    def query(self, origins=(), destinations=(), models=(), start=None, end=None):
+        """Return matching routes as new dicts holding only the matching returns.
+
+        With a date window, each return's available_dates is narrowed to the
+        ranges that overlap it (returns with no overlap are dropped).
+        """
+        candidates = None
+        for field, terms in ((self.origins, origins), (self.destinations, destinations), (self.models, models)):
+            if terms:
+                ids = field.match(terms)
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    return []
+
+        date_matches = None
+        if start is not None or end is not None:
+            date_matches = self.overlapping(start, end)
+            candidates = set(date_matches) if candidates is None else candidates & date_matches.keys()
+
+        ids = range(len(self.returns)) if candidates is None else sorted(candidates)
+        result = []
+        current_pos, current_returns = None, None
+        for ret_id in ids:
+            pos, ret = self.returns[ret_id]
+            if date_matches is not None:
+                dates = ret.get('available_dates', ())
+                ret = {**ret, 'available_dates': [dates[i] for i in sorted(date_matches[ret_id])]}
+            if pos != current_pos:
+                current_pos, current_returns = pos, []
+                result.append({**self.routes[pos], 'returns': current_returns})
+            current_returns.append(ret)
+        return result
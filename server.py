@@ -1,10 +1,9 @@
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, Response, render_template, jsonify, request
 import subprocess
 import os
 import requests
-from datetime import datetime
+from datetime import date, datetime
 import psutil
-import socket
 from pathlib import Path
 import json
 import threading
@@ -15,6 +14,32 @@ import argparse
 import shutil
 import mimetypes
 import sys
+import atexit
+import signal
+import unicodedata
+from urllib.parse import quote as url_quote
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait as futures_wait
+from dataclasses import dataclass
+
+from battery_store import BatteryStore
+from chunked_upload import UploadError, UploadManager
+from collector import SystemCollector
+from events import Broadcaster
+from file_response import send_file
+from file_watcher import COMPLETE_EVENTS, FileWatcher
+from geocoder import NOMINATIM_URL, Geocoder
+from http_cache import ResponseCache
+from log_search import LEVELS as LOG_LEVELS, LogIndex
+from log_tailer import LogTailer
+from persister import WriteBehind
+from route_index import RouteIndex, parse_day, project, sort_routes
+from services import JsonBackend, ServiceMonitor
+from storage_index import StorageIndex
+from storage_listing import DirectoryLister
+from timeseries import MetricsHistory
+from todo_store import TodoStore
+from wsgi_server import PooledWSGIServer
+from zip_stream import stream_zip
 
 # Allow importing data fetchers from rally_bot sibling package
 _RALLY_BOT_DIR = Path(__file__).parent.parent / 'rally_bot'
@@ -23,15 +48,117 @@ if str(_RALLY_BOT_DIR) not in sys.path:
 
 app = Flask(__name__)
 
+# Shared fan-out for /api/stream (status samples, battery entries, route reloads)
+broadcaster = Broadcaster()
+# Serialised JSON bodies of the heavy endpoints, keyed by request and data version
+response_cache = ResponseCache()
+# inotify-driven change notifications for the rally bot's data files
+file_watcher = FileWatcher()
+# Debounced, atomic whole-file writes (todos); flushed at exit
+persister = WriteBehind(delay=1.0, max_delay=10.0)
+
 # ---- Rally routes auto-refresh config ----
 ROUTES_FILE = Path(__file__).parent.parent / 'rally_bot' / 'station_routes.json'
 # How often (seconds) to fetch fresh data from the APIs if the file hasn't been
 # updated by the Telegram bot.  0 = watcher only (never self-fetch).
 ROUTES_REFRESH_INTERVAL = 1800  # 30 minutes
+ROUTES_FETCH_WORKERS = 3        # providers fetched in parallel
+ROUTES_PROVIDER_TIMEOUT = 300   # seconds before a slow provider is skipped
+ROUTES_REQUEST_TIMEOUT = (10, 60)  # (connect, read) default for each provider HTTP request
+ROUTES_ABANDON_GRACE = 120      # seconds a skipped provider gets to wind down before it is abandoned
 
-_routes_cache: dict = {'data': None, 'mtime': 0.0}
+_routes_cache: dict = {'data': None, 'mtime': 0.0, 'filter_options': None, 'index': None}
 _routes_updating = threading.Event()   # set while a fetch is in progress
 _routes_lock = threading.Lock()
+_routes_fetch_stats: dict = {}   # last API refresh: finish time, duration, per-provider timings
+
+# bot.log is parsed incrementally; the offset and summaries survive restarts
+BOT_LOG_FILE = _RALLY_BOT_DIR / 'bot.log'
+BOT_LOG_STATE_FILE = Path(__file__).parent / 'bot_log_state.json'
+bot_log = LogTailer(BOT_LOG_FILE, state_file=BOT_LOG_STATE_FILE)
+# Sparse offset/timestamp index for /api/rally-bot/log searches
+bot_log_index = LogIndex(BOT_LOG_FILE)
+LOG_SEARCH_MAX_PAGE = 500
+
+# Map short roadsurfer model names to a known image via keyword matching
+_FALLBACK_KEYWORDS = {
+    'active bunk': 'Eu Active Bunk 4 Auto Base',
+    'active long': 'Active Long 2',
+    'active poptop': 'Eu Active Poptop 4 Auto Select',
+    'active standard': 'Eu Active Standard 2 Auto Select',
+    'california grand': 'VW Grand California',
+    'california standard': 'Eu California Standard 4 Auto Base',
+    'comfort compact': 'Comfort Compact',
+    'comfort family': 'EU Comfort Family 6 Auto Select',
+    'comfort long': 'EU Comfort Long 4 Auto Select',
+    'comfort space': 'Eu Comfort Space 4 Auto Select',
+    'comfort standard': 'Eu Comfort Standard 5 Auto Select',
+}
+
+
+def _enrich_routes(raw_routes):
+    """Build the served dataset from a freshly loaded station_routes.json.
+
+    Fills missing model images, dedupes available_dates and precomputes the
+    filter options.  Returns (routes, filter_options); routes is a tuple of
+    new dicts that is never mutated afterwards, so requests can share it.
+    """
+    # Build image lookup from models that have images, then fill gaps
+    img_lookup = {}
+    for route in raw_routes:
+        for ret in route.get('returns', []):
+            mi = ret.get('model_image', '')
+            if mi:
+                img_lookup[ret.get('model_name', '')] = mi
+    fallback_map = {k: img_lookup.get(v, '') for k, v in _FALLBACK_KEYWORDS.items()}
+
+    routes = []
+    for route in raw_routes:
+        returns = []
+        for ret in route.get('returns', []):
+            ret = dict(ret)
+            if not ret.get('model_image'):
+                key = ret.get('model_name', '').lower()
+                if fallback_map.get(key):
+                    ret['model_image'] = fallback_map[key]
+            # Deduplicate available_dates by (startDate, endDate, duration)
+            seen_dates = set()
+            unique_dates = []
+            for dr in ret.get('available_dates', []):
+                dk = (dr.get('startDate'), dr.get('endDate'), dr.get('duration'))
+                if dk not in seen_dates:
+                    seen_dates.add(dk)
+                    unique_dates.append(dr)
+            ret['available_dates'] = unique_dates
+            returns.append(ret)
+        routes.append({**route, 'returns': tuple(returns)})
+
+    filter_options = {
+        'origins': sorted({r['origin'] for r in routes}),
+        'destinations': sorted({ret['destination'] for r in routes for ret in r['returns']}),
+        'models': sorted({ret['model_name'] for r in routes for ret in r['returns'] if ret.get('model_name')}),
+    }
+    return tuple(routes), filter_options
+
+
+ROUTES_MAX_PAGE = 1000  # Upper bound for ?limit= on /api/rally-bot/routes
+
+
+def _routes_cursor(mtime, offset) -> str:
+    """Opaque page cursor bound to one version of the route cache."""
+    return f'{int(mtime * 1000):x}-{offset}'
+
+
+def _parse_routes_cursor(cursor, mtime) -> int:
+    """Offset encoded in a cursor; raises ValueError if malformed or stale."""
+    try:
+        version, offset = cursor.split('-', 1)
+        offset = int(offset)
+    except ValueError:
+        raise ValueError('Invalid cursor')
+    if version != f'{int(mtime * 1000):x}' or offset < 0:
+        raise LookupError('Route data changed; restart from the first page')
+    return offset
 
 
 def _load_routes_if_changed() -> bool:
@@ -47,62 +174,195 @@ def _load_routes_if_changed() -> bool:
             return False
         with open(ROUTES_FILE, 'r') as f:
             data = json.load(f)
-        _routes_cache = {'data': data, 'mtime': mtime}
+        routes, filter_options = _enrich_routes(data)
+        _routes_cache = {'data': routes, 'mtime': mtime, 'filter_options': filter_options,
+                         'index': RouteIndex(routes)}
+    broadcaster.publish('routes', {'mtime': mtime}, replay=False)
+    # Have every city on the map resolved before anyone opens it
+    geocoder.prefetch(filter_options['origins'] + filter_options['destinations'])
     return True
 
 
+def _current_routes_cache() -> dict:
+    """The enriched in-memory route cache; loads from disk if the cache is cold."""
+    with _routes_lock:
+        cache = _routes_cache
+    if cache['data'] is None:
+        _load_routes_if_changed()
+        with _routes_lock:
+            cache = _routes_cache
+    return cache
+
+
+class _TimeoutAdapter(requests.adapters.HTTPAdapter):
+    """HTTP adapter applying a default timeout to requests that don't set one."""
+
+    def __init__(self, timeout, max_retries=0):
+        super().__init__(max_retries=max_retries)
+        self.timeout = timeout
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+
+
+def _with_request_timeout(fetcher_cls):
+    """A subclass of fetcher_cls whose HTTP session times out stalled requests.
+
+    The fetchers make their requests without a timeout, so a stalled
+    connection would keep a pool thread busy forever.  The subclass mounts
+    a _TimeoutAdapter on the fetcher's own `session` (covering any thread
+    the fetcher starts itself); a fetcher without one is still bounded by
+    ROUTES_PROVIDER_TIMEOUT and, past the grace period, abandoned.
+    """
+    class Fetcher(fetcher_cls):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            session = getattr(self, 'session', None)
+            if isinstance(session, requests.Session):
+                for prefix, adapter in list(session.adapters.items()):
+                    retries = getattr(adapter, 'max_retries', 0)
+                    session.mount(prefix, _TimeoutAdapter(ROUTES_REQUEST_TIMEOUT, retries))
+
+    Fetcher.__name__ = Fetcher.__qualname__ = fetcher_cls.__name__
+    return Fetcher
+
+
+def _fetch_provider(fetcher_cls, logger):
+    """Run one provider's full update; returns (entries, fetcher, seconds taken)."""
+    started = time.monotonic()
+    fetcher = _with_request_timeout(fetcher_cls)(logger)
+    entries = list(fetcher.sync_full_update() or [])
+    return entries, fetcher, time.monotonic() - started
+
+
 def _fetch_routes_from_apis():
-    """Run all three data fetchers synchronously and save station_routes.json.
+    """Run the data fetchers in parallel and publish station_routes.json once.
     Safe to call from a background thread."""
     if _routes_updating.is_set():
         return  # already running
     _routes_updating.set()
+    import logging
+    logger = logging.getLogger('dashboard.routes_refresh')
+    started = time.monotonic()
+    providers = {}
+    pool, futures = None, {}
     try:
         from rally_bot.data_fetcher import StationDataFetcher, ImoovaDataFetcher, IndieCampersDataFetcher
-        import logging
-        logger = logging.getLogger('dashboard.routes_refresh')
         logger.info('Routes refresh: starting API fetch...')
 
-        imoova = ImoovaDataFetcher(logger)
-        indie  = IndieCampersDataFetcher(logger)
-        rs     = StationDataFetcher(logger)
-
-        merged = list(imoova.sync_full_update() or [])
-        imoova.output_data = merged
-        imoova.save_output_to_json(ROUTES_FILE)
-
-        merged += indie.sync_full_update() or []
-        indie.output_data = merged
-        indie.save_output_to_json(ROUTES_FILE)
+        # Merge order matches the file layout the bot writes: imoova, indie, roadsurfer
+        fetchers = {
+            'imoova': ImoovaDataFetcher,
+            'indiecampers': IndieCampersDataFetcher,
+            'roadsurfer': StationDataFetcher,
+        }
+        pool = ThreadPoolExecutor(max_workers=ROUTES_FETCH_WORKERS, thread_name_prefix='routes_fetch')
+        futures = {name: pool.submit(_fetch_provider, cls, logger) for name, cls in fetchers.items()}
+        deadline = time.monotonic() + ROUTES_PROVIDER_TIMEOUT
 
-        rs_data = rs.sync_full_update() or []
-        merged += rs_data
-        rs.output_data = merged
-        rs.save_output_to_json(ROUTES_FILE)
+        merged = []
+        writer = None
+        for name, future in futures.items():
+            try:
+                entries, fetcher, seconds = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FuturesTimeout:
+                providers[name] = {'ok': False, 'error': f'timed out after {ROUTES_PROVIDER_TIMEOUT}s'}
+                logger.warning(f'Routes refresh: {name} timed out')
+                continue
+            except Exception as e:
+                providers[name] = {'ok': False, 'error': str(e)}
+                logger.error(f'Routes refresh: {name} failed: {e}', exc_info=True)
+                continue
+            providers[name] = {'ok': True, 'seconds': round(seconds, 2), 'entries': len(entries)}
+            merged += entries
+            writer = writer or fetcher
+        # Publish without waiting for a provider that overran its timeout
+        pool.shutdown(wait=False, cancel_futures=True)
+
+        if writer is None:
+            logger.error('Routes refresh: every provider failed — keeping the current file')
+            return
+
+        # Single atomic publish: write a temp file next to the target, then rename
+        tmp = ROUTES_FILE.with_name(ROUTES_FILE.name + '.tmp')
+        writer.output_data = merged
+        writer.save_output_to_json(tmp)
+        os.replace(tmp, ROUTES_FILE)
 
         _load_routes_if_changed()
-        logger.info(f'Routes refresh: done — {len(merged)} entries')
+        logger.info(f'Routes refresh: done — {len(merged)} entries in {time.monotonic() - started:.1f}s')
     except Exception as e:
-        import logging
-        logging.getLogger('dashboard.routes_refresh').error(f'Routes refresh failed: {e}', exc_info=True)
+        logger.error(f'Routes refresh failed: {e}', exc_info=True)
     finally:
+        seconds = round(time.monotonic() - started, 2)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+            # Stay "updating" until skipped providers have wound down, so the next
+            # refresh doesn't pile more threads onto them; past the grace period
+            # they are abandoned (their threads finish in the background)
+            _, running = futures_wait(futures.values(), timeout=ROUTES_ABANDON_GRACE)
+            abandoned = sorted(name for name, future in futures.items() if future in running)
+            if abandoned:
+                for name in abandoned:
+                    providers.setdefault(name, {'ok': False})['abandoned'] = True
+                logger.error(f'Routes refresh: abandoned {", ".join(abandoned)} — still running '
+                             f'{ROUTES_ABANDON_GRACE}s after the {ROUTES_PROVIDER_TIMEOUT}s timeout')
+        # Published once and never touched again: finished_at versions the cached stats
+        _routes_fetch_stats.update({
+            'finished_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'seconds': seconds,
+            'providers': providers,
+        })
         _routes_updating.clear()
 
 
+def _on_routes_file_changed(path):
+    """File watcher callback: reload the route cache right away."""
+    if _load_routes_if_changed():
+        import logging
+        logging.getLogger('dashboard.routes_refresh').info(
+            'station_routes.json changed on disk — cache reloaded')
+
+
+def _on_rally_file_changed(path):
+    """File watcher callback for the other rally bot files: notify open views."""
+    broadcaster.publish('rally_files', {'file': path.name}, replay=False)
+
+
+def _on_geocode_file_changed(path):
+    """File watcher callback for geocode_cache.json: merge entries the bot added."""
+    geocoder.load()
+    _on_rally_file_changed(path)
+
+
+def _on_bot_log_changed(path):
+    """File watcher callback for bot.log: parse the appended lines, then notify."""
+    if bot_log.poll():
+        _on_rally_file_changed(path)
+
+
+def _start_file_watcher():
+    """Register per-file callbacks and start the watcher thread."""
+    # JSON files are parsed whole: only react once a write is complete
+    file_watcher.watch(ROUTES_FILE, _on_routes_file_changed, events=COMPLETE_EVENTS)
+    file_watcher.watch(_GEOCODE_CACHE_FILE, _on_geocode_file_changed, events=COMPLETE_EVENTS)
+    for name in ('notification_history.json', 'user_favorites.json'):
+        file_watcher.watch(_RALLY_BOT_DIR / name, _on_rally_file_changed, events=COMPLETE_EVENTS)
+    # bot.log is appended constantly: fire once it is quiet, or at least every 5 s
+    file_watcher.watch(BOT_LOG_FILE, _on_bot_log_changed, debounce=1, max_delay=5)
+    file_watcher.start()
+    print(f"File watcher started ({file_watcher.backend})")
+
+
 def _routes_watcher():
     """Background daemon thread:
-    - Reloads the cache whenever station_routes.json changes on disk.
+    - Warms up the route cache (later changes arrive via file_watcher).
     - If ROUTES_REFRESH_INTERVAL > 0 and the file hasn't been updated
       within that interval, kicks off a fresh API fetch.
     """
     _load_routes_if_changed()  # warm up cache at startup
     while True:
-        time.sleep(30)
-        changed = _load_routes_if_changed()
-        if changed:
-            import logging
-            logging.getLogger('dashboard.routes_refresh').info(
-                'station_routes.json changed on disk — cache reloaded')
+        time.sleep(60)
         if ROUTES_REFRESH_INTERVAL > 0 and not _routes_updating.is_set():
             try:
                 age = time.time() - ROUTES_FILE.stat().st_mtime
@@ -112,28 +372,36 @@ def _routes_watcher():
                 pass
 
 # ---- Battery history configuration ----
-BATTERY_HISTORY_FILE = Path(__file__).parent / 'battery_history.json'
+BATTERY_LOG_FILE = Path(__file__).parent / 'battery_history.log'
+BATTERY_HISTORY_FILE = Path(__file__).parent / 'battery_history.json'  # legacy, imported once
+BATTERY_RETENTION_DAYS = 180  # Keep ~6 months of readings in the append-only log
 
 # Todo storage
 TODO_FILE = Path(__file__).parent / 'todos.json'
-todos_data = []
-MAX_HISTORY_ENTRIES = 144  # Keep last 24 hours (144 entries at 10-minute intervals)
+todo_store = TodoStore()  # id-indexed; its version drives ETags and ?since= deltas
 BATTERY_UPDATE_INTERVAL = 600  # Record battery every 10 minutes (600 seconds)
-battery_history = []  # Will be loaded from file on startup
+BATTERY_DEFAULT_WINDOW = 86400  # /api/battery/history returns the last 24 hours by default
+battery_history = BatteryStore(BATTERY_LOG_FILE, retention_days=BATTERY_RETENTION_DAYS)
 last_battery_record_time = 0  # Track last time battery was recorded
 
-# Real-time metrics history (in-memory, last 60 points)
-MAX_REALTIME_POINTS = 60
-metrics_history = {
-    'timestamps': [],
-    'cpu': [],
-    'memory': [],
-    'temperature': [],
-    'network_rx': [],
-    'network_tx': []
-}
+# Metrics history (in-memory ring buffers with 1-minute / 1-hour rollups)
+MAX_REALTIME_POINTS = 720      # raw 5-second samples: 1 hour
+MAX_MINUTE_POINTS = 1440       # 1-minute min/avg/max: 24 hours
+MAX_HOUR_POINTS = 720          # 1-hour min/avg/max: 30 days
+metrics_history = MetricsHistory(
+    ('cpu', 'memory', 'temperature', 'network_rx', 'network_tx'),
+    raw_points=MAX_REALTIME_POINTS,
+    minute_points=MAX_MINUTE_POINTS,
+    hour_points=MAX_HOUR_POINTS,
+)
 prev_net_bytes = None  # For calculating network rates
 
+# Latest status snapshot published by the background collector
+METRICS_INTERVAL = 5  # Collector sampling period (seconds)
+_status_snapshot = None
+_snapshot_lock = threading.Lock()    # guards _status_snapshot
+_sample_lock = threading.RLock()     # serialises sampling so forced refreshes don't stampede
+
 # Load environment variables from .env file
 def load_env():
     env_path = Path(__file__).parent / '.env'
@@ -152,6 +420,33 @@ IPTV_USERNAME = os.environ.get('IPTV_USERNAME', 'your_username')
 IPTV_PASSWORD = os.environ.get('IPTV_PASSWORD', 'your_password')
 IPTV_HOST = os.environ.get('IPTV_HOST', 'your_host.com')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin')
+# Maximum age (seconds) of the collector snapshot served by /api/status and
+# /api/quick-stats before a request forces a fresh sample.
+STATUS_MAX_STALENESS = float(os.environ.get('STATUS_MAX_STALENESS', 15))
+# Root of the sysfs tree read by the system collector (override for testing)
+SYSFS_ROOT = os.environ.get('SYSFS_ROOT', '/sys')
+# Geocoding service (point at a local stand-in for testing) and its rate limit
+NOMINATIM_URL = os.environ.get('NOMINATIM_URL', NOMINATIM_URL)
+NOMINATIM_INTERVAL = float(os.environ.get('NOMINATIM_INTERVAL', 1.0))
+# `server.py --serve`: fixed worker pool, connections queued before answering
+# 503, idle keep-alive and SIGTERM drain times, and open /api/stream
+# connections (each has its own thread, outside the pool)
+SERVE_WORKERS = 16
+SERVE_BACKLOG = 64
+SERVE_KEEPALIVE = 15
+SERVE_SHUTDOWN_GRACE = 10
+SERVE_MAX_STREAMS = 32
+
+system_collector = SystemCollector(SYSFS_ROOT)
+
+# systemd units shown under "services" (comma-separated; '.service' is implied)
+MONITORED_SERVICES = os.environ.get('MONITORED_SERVICES', 'sshd,cron,systemd-resolved,dashboard').split(',')
+# JSON file of unit properties to use instead of systemctl (for testing)
+SERVICES_FIXTURE = os.environ.get('SERVICES_FIXTURE')
+service_monitor = ServiceMonitor(
+    MONITORED_SERVICES,
+    backend=JsonBackend(SERVICES_FIXTURE) if SERVICES_FIXTURE else None,
+)
 
 # In-memory admin sessions: token -> {created_at}
 admin_sessions = {}
@@ -159,6 +454,17 @@ admin_sessions = {}
 # In-memory terminal sessions: token -> {cwd, created_at}
 terminal_sessions = {}
 
+def _file_version(*paths):
+    """Cheap change token for a set of files: (mtime_ns, size) of each, None if missing."""
+    version = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            version.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
 def run_command(command):
     """Execute shell command and return output"""
     try:
@@ -169,53 +475,43 @@ def run_command(command):
 
 def load_todos():
     """Load todos from file"""
-    global todos_data
     try:
         if TODO_FILE.exists():
             with open(TODO_FILE, 'r') as f:
-                todos_data = json.load(f)
-                print(f"Loaded {len(todos_data)} todos")
+                todo_store.load(json.load(f))
+                print(f"Loaded {len(todo_store)} todos")
         else:
-            todos_data = []
+            todo_store.load([])
     except Exception as e:
         print(f"Error loading todos: {e}")
-        todos_data = []
+        todo_store.load([])
 
 
-def save_todos():
-    """Save todos to file"""
-    try:
-        with open(TODO_FILE, 'w') as f:
-            json.dump(todos_data, f, indent=2)
-    except Exception as e:
-        print(f"Error saving todos: {e}")
+def _todos_changed():
+    """Schedule a (coalesced) save and tell other open dashboards to sync"""
+    persister.mark('todos')
+    broadcaster.publish('todos', {'version': todo_store.version}, replay=False)
+
+
+def _dump_todos() -> bytes:
+    """Serialised todos for the write-behind persister"""
+    return json.dumps(todo_store.snapshot(), indent=2).encode()
+
+
+persister.register('todos', TODO_FILE, _dump_todos)
 
 
 def load_battery_history():
-    """Load battery history from file"""
-    global battery_history
+    """Load battery history from the append-only log (importing legacy JSON once)"""
     try:
-        if BATTERY_HISTORY_FILE.exists():
-            with open(BATTERY_HISTORY_FILE, 'r') as f:
-                battery_history = json.load(f)
-                print(f"Loaded {len(battery_history)} battery history entries")
-        else:
-            battery_history = []
+        count = battery_history.load(legacy_json=BATTERY_HISTORY_FILE)
+        print(f"Loaded {count} battery history entries")
     except Exception as e:
         print(f"Error loading battery history: {e}")
-        battery_history = []
-
-def save_battery_history():
-    """Save battery history to file"""
-    try:
-        with open(BATTERY_HISTORY_FILE, 'w') as f:
-            json.dump(battery_history, f)
-    except Exception as e:
-        print(f"Error saving battery history: {e}")
 
 def add_battery_entry(capacity, status, force=False):
     """Add a battery entry to history"""
-    global battery_history, last_battery_record_time
+    global last_battery_record_time
     
     # Only record every BATTERY_UPDATE_INTERVAL seconds unless forced
     current_time = time.time()
@@ -223,56 +519,44 @@ def add_battery_entry(capacity, status, force=False):
         return
     
     last_battery_record_time = current_time
-    entry = {
-        'timestamp': datetime.now().isoformat(),
-        'capacity': capacity,
-        'status': status
-    }
-    battery_history.append(entry)
-    
-    # Keep only last MAX_HISTORY_ENTRIES
-    if len(battery_history) > MAX_HISTORY_ENTRIES:
-        battery_history = battery_history[-MAX_HISTORY_ENTRIES:]
-    
-    # Save to file (in background to avoid blocking)
-    threading.Thread(target=save_battery_history, daemon=True).start()
+    try:
+        # A single fixed-size record appended to the log
+        entry = battery_history.append(capacity, status, ts=current_time)
+    except Exception as e:
+        print(f"Error saving battery history: {e}")
+        return
+    broadcaster.publish('battery', entry, replay=False)
 
 def get_battery_info():
     """Get battery status"""
     try:
-        capacity = run_command('cat /sys/class/power_supply/qcom-battery/capacity')
-        status = run_command('cat /sys/class/power_supply/qcom-battery/status')
+        battery = system_collector.battery()
+        capacity = battery['capacity']
         
         # Add to history if valid
-        if capacity != 'N/A' and capacity.isdigit():
-            add_battery_entry(int(capacity), status)
+        if capacity.isdigit():
+            add_battery_entry(int(capacity), battery['status'])
         
-        return {
-            'capacity': capacity,
-            'status': status
-        }
+        return battery
     except:
         return {'capacity': 'N/A', 'status': 'N/A'}
 
 def get_brightness():
     """Get current brightness level"""
     try:
-        brightness = run_command('cat /sys/class/backlight/*/brightness')
-        max_brightness = run_command('cat /sys/class/backlight/*/max_brightness')
-        return {
-            'current': brightness,
-            'max': max_brightness,
-            'percentage': round((int(brightness) / int(max_brightness)) * 100, 1) if max_brightness != '0' else 0
-        }
+        return system_collector.brightness()
     except:
         return {'current': 'N/A', 'max': 'N/A', 'percentage': 0}
 
 def set_brightness(value):
     """Set brightness level (0-100)"""
     try:
-        max_brightness = int(run_command('cat /sys/class/backlight/*/max_brightness'))
-        actual_value = int((value / 100) * max_brightness)
-        result = run_command(f'echo {actual_value} | sudo tee /sys/class/backlight/*/brightness')
+        path = system_collector.brightness_path
+        if path is None:
+            return {'success': False, 'error': 'No backlight device found'}
+        actual_value = int((value / 100) * system_collector.max_brightness())
+        subprocess.run(['sudo', 'tee', str(path)], input=str(actual_value), capture_output=True,
+                       text=True, timeout=5, check=True)
         return {'success': True, 'value': value}
     except Exception as e:
         return {'success': False, 'error': str(e)}
@@ -280,21 +564,24 @@ def set_brightness(value):
 def get_system_info():
     """Get system information"""
     try:
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
         return {
-            'hostname': socket.gethostname(),
-            'uptime': run_command('uptime -p'),
-            'kernel': run_command('uname -r'),
-            'os': run_command('cat /etc/os-release | grep PRETTY_NAME | cut -d= -f2').strip('"'),
-            'cpu_usage': psutil.cpu_percent(interval=1),
+            'hostname': system_collector.hostname,
+            'uptime': system_collector.uptime(),
+            'kernel': system_collector.kernel,
+            'os': system_collector.os_name,
+            # Usage since the previous sample, over at least half a collector tick
+            'cpu_usage': system_collector.cpu_usage(min_interval=METRICS_INTERVAL / 2),
             'memory': {
-                'total': round(psutil.virtual_memory().total / (1024**3), 2),
-                'used': round(psutil.virtual_memory().used / (1024**3), 2),
-                'percent': psutil.virtual_memory().percent
+                'total': round(memory.total / (1024**3), 2),
+                'used': round(memory.used / (1024**3), 2),
+                'percent': memory.percent
             },
             'disk': {
-                'total': round(psutil.disk_usage('/').total / (1024**3), 2),
-                'used': round(psutil.disk_usage('/').used / (1024**3), 2),
-                'percent': psutil.disk_usage('/').percent
+                'total': round(disk.total / (1024**3), 2),
+                'used': round(disk.used / (1024**3), 2),
+                'percent': disk.percent
             },
             'temperature': get_temperature()
         }
@@ -304,15 +591,14 @@ def get_system_info():
 def get_temperature():
     """Get CPU temperature"""
     try:
-        temp = run_command('cat /sys/class/thermal/thermal_zone*/temp | head -1')
-        return round(int(temp) / 1000, 1) if temp.isdigit() else 'N/A'
+        return system_collector.temperature()
     except:
         return 'N/A'
 
 def get_network_info():
     """Get network information"""
     try:
-        ip_addr = run_command("ip addr show | grep 'inet ' | grep -v '127.0.0.1' | awk '{print $2}' | cut -d/ -f1")
+        ip_addr = '\n'.join(system_collector.ip_addresses())
         interfaces = {}
         net_io = psutil.net_io_counters(pernic=True)
         
@@ -363,15 +649,8 @@ def get_iptv_status():
         return {"success": False, "error": str(e)}
 
 def get_running_services():
-    """Get status of important services"""
-    services = ['sshd', 'cron', 'systemd-resolved']
-    status = {}
-    
-    for service in services:
-        result = run_command(f'systemctl is-active {service}')
-        status[service] = result
-    
-    return status
+    """Get state, memory, CPU and restart counts of the monitored services"""
+    return service_monitor.status()
 
 def get_tmux_socket():
     """Find the best tmux socket to use (prefer non-root user sockets)"""
@@ -383,83 +662,105 @@ def get_tmux_socket():
     return sockets[0] if sockets else None
 
 
-def get_tmux_sessions():
-    """Get tmux sessions and their status"""
+# One list-windows and one list-panes call cover every session; fields are tab-separated
+_TMUX_WINDOW_FORMAT = '\t'.join([
+    '#{session_name}', '#{session_created}', '#{session_attached}',
+    '#{window_index}', '#{window_name}', '#{window_active}',
+])
+_TMUX_PANE_FORMAT = '\t'.join([
+    '#{session_name}', '#{window_index}', '#{pane_index}', '#{pane_active}',
+    '#{pane_current_command}', '#{pane_pid}',
+])
+TMUX_CACHE_SECONDS = 3
+_tmux_cache = {'at': 0.0, 'data': None}
+_tmux_lock = threading.Lock()
+
+
+def _tmux_rows(socket_path, command, fmt):
+    """Run `tmux -S socket <command> -a -F fmt` and split its output into rows."""
+    result = subprocess.run(['tmux', '-S', socket_path, command, '-a', '-F', fmt],
+                            capture_output=True, text=True, timeout=5)
+    if result.returncode != 0:  # no server running on this socket
+        return []
+    return [line.split('\t') for line in result.stdout.splitlines() if line]
+
+
+def _format_session_uptime(created):
     try:
-        socket_path = get_tmux_socket()
-        if not socket_path:
-            return {'sessions': [], 'total': 0}
-        sock_flag = f'-S {socket_path}'
+        uptime_seconds = int(time.time()) - int(created)
+    except ValueError:
+        return 'N/A'
+    hours = uptime_seconds // 3600
+    minutes = (uptime_seconds % 3600) // 60
+    return f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
+
+
+def _collect_tmux_sessions():
+    socket_path = get_tmux_socket()
+    if not socket_path:
+        return {'sessions': [], 'total': 0}
+
+    panes_by_window = {}
+    for row in _tmux_rows(socket_path, 'list-panes', _TMUX_PANE_FORMAT):
+        if len(row) < 6:
+            continue
+        session_name, window_index, pane_index, active, command, pid = row[:6]
+        panes_by_window.setdefault((session_name, window_index), []).append({
+            'index': int(pane_index) if pane_index.isdigit() else pane_index,
+            'active': active == '1',
+            'command': command,
+            'pid': int(pid) if pid.isdigit() else None,
+        })
 
-        # Get list of tmux sessions
-        sessions_output = run_command(f'tmux {sock_flag} list-sessions -F "#{{session_name}}|#{{session_created}}|#{{session_attached}}|#{{session_windows}}" 2>/dev/null')
-        
-        if not sessions_output or 'Error' in sessions_output or sessions_output == '':
-            return {'sessions': [], 'total': 0}
-        
-        sessions = []
-        for line in sessions_output.strip().split('\n'):
-            if not line:
-                continue
-            parts = line.split('|')
-            if len(parts) >= 4:
-                session_name = parts[0]
-                created = parts[1]
-                attached = parts[2]
-                windows = parts[3]
-                
-                # Get windows info for this session
-                windows_output = run_command(f'tmux {sock_flag} list-windows -t "{session_name}" -F "#{{window_index}}:#{{window_name}}|#{{window_active}}" 2>/dev/null')
-                window_list = []
-                if windows_output and 'Error' not in windows_output:
-                    for win_line in windows_output.strip().split('\n'):
-                        if '|' in win_line:
-                            win_info, is_active = win_line.split('|')
-                            window_list.append({
-                                'name': win_info,
-                                'active': is_active == '1'
-                            })
-                
-                # Get panes count
-                panes_count = run_command(f'tmux {sock_flag} list-panes -t "{session_name}" 2>/dev/null | wc -l')
-                
-                # Calculate uptime
-                try:
-                    created_ts = int(created)
-                    uptime_seconds = int(time.time()) - created_ts
-                    hours = uptime_seconds // 3600
-                    minutes = (uptime_seconds % 3600) // 60
-                    if hours > 0:
-                        uptime = f"{hours}h {minutes}m"
-                    else:
-                        uptime = f"{minutes}m"
-                except:
-                    uptime = 'N/A'
-                
-                sessions.append({
-                    'name': session_name,
-                    'attached': attached != '0',
-                    'windows': int(windows) if windows.isdigit() else 0,
-                    'panes': int(panes_count.strip()) if panes_count.strip().isdigit() else 0,
-                    'uptime': uptime,
-                    'window_list': window_list
-                })
-        
-        return {
-            'sessions': sessions,
-            'total': len(sessions)
-        }
-    except Exception as e:
-        print(f"Error getting tmux sessions: {e}")
-        return {'sessions': [], 'total': 0, 'error': str(e)}
+    sessions = {}  # name -> session dict, in tmux order
+    for row in _tmux_rows(socket_path, 'list-windows', _TMUX_WINDOW_FORMAT):
+        if len(row) < 6:
+            continue
+        session_name, created, attached, window_index, window_name, active = row[:6]
+        session = sessions.get(session_name)
+        if session is None:
+            session = sessions[session_name] = {
+                'name': session_name,
+                'attached': attached != '0',
+                'windows': 0,
+                'panes': 0,
+                'uptime': _format_session_uptime(created),
+                'window_list': [],
+            }
+        panes = panes_by_window.get((session_name, window_index), [])
+        session['windows'] += 1
+        session['panes'] += len(panes)
+        session['window_list'].append({
+            'name': f'{window_index}:{window_name}',
+            'active': active == '1',
+            'panes': panes,
+        })
+
+    return {
+        'sessions': list(sessions.values()),
+        'total': len(sessions)
+    }
+
+
+def get_tmux_sessions():
+    """Get tmux sessions, their windows and panes (cached for TMUX_CACHE_SECONDS)"""
+    with _tmux_lock:
+        if _tmux_cache['data'] is not None and time.monotonic() - _tmux_cache['at'] < TMUX_CACHE_SECONDS:
+            return _tmux_cache['data']
+        try:
+            data = _collect_tmux_sessions()
+        except Exception as e:
+            print(f"Error getting tmux sessions: {e}")
+            return {'sessions': [], 'total': 0, 'error': str(e)}
+        _tmux_cache.update(at=time.monotonic(), data=data)
+        return data
 
 def estimate_battery_life():
     """Estimate remaining battery life (or time to full charge) from recent history."""
-    if len(battery_history) < 2:
-        return None
-
     # Use up to the last 6 entries (~60 minutes of data)
-    window = battery_history[-6:]
+    window = battery_history.tail(6)
+    if len(window) < 2:
+        return None
     current = window[-1]
     current_status = current['status'].lower()
 
@@ -518,16 +819,8 @@ def estimate_battery_life():
 
 def add_metrics_history(system_info, network_info):
     """Add current metrics to history"""
-    global metrics_history, prev_net_bytes
-    
-    # Add timestamp
-    metrics_history['timestamps'].append(datetime.now().isoformat())
-    
-    # Add CPU, memory, temperature
-    metrics_history['cpu'].append(system_info.get('cpu_usage', 0))
-    metrics_history['memory'].append(system_info.get('memory', {}).get('percent', 0))
-    temp = system_info.get('temperature', 'N/A')
-    metrics_history['temperature'].append(temp if isinstance(temp, (int, float)) else 0)
+    global prev_net_bytes
+    now = time.time()
     
     # Calculate network rates (KB/s)
     total_rx = 0
@@ -539,18 +832,118 @@ def add_metrics_history(system_info, network_info):
     rx_kbs = 0
     tx_kbs = 0
     if prev_net_bytes:
-        time_diff = 5  # Assume 5 second intervals
+        time_diff = max(1e-3, now - prev_net_bytes['ts'])
         rx_kbs = max(0, (total_rx - prev_net_bytes['rx']) / time_diff / 1024)
         tx_kbs = max(0, (total_tx - prev_net_bytes['tx']) / time_diff / 1024)
     
-    prev_net_bytes = {'rx': total_rx, 'tx': total_tx}
-    metrics_history['network_rx'].append(rx_kbs)
-    metrics_history['network_tx'].append(tx_kbs)
-    
-    # Keep only last MAX_REALTIME_POINTS
-    for key in metrics_history:
-        if len(metrics_history[key]) > MAX_REALTIME_POINTS:
-            metrics_history[key] = metrics_history[key][-MAX_REALTIME_POINTS:]
+    prev_net_bytes = {'rx': total_rx, 'tx': total_tx, 'ts': now}
+
+    temp = system_info.get('temperature', 'N/A')
+    nan = float('nan')
+    metrics_history.add(now, {
+        'cpu': system_info.get('cpu_usage', nan),
+        'memory': system_info.get('memory', {}).get('percent', nan),
+        'temperature': temp if isinstance(temp, (int, float)) else nan,
+        'network_rx': rx_kbs,
+        'network_tx': tx_kbs,
+    })
+
+@dataclass(frozen=True)
+class StatusSnapshot:
+    """Immutable, timestamped result of one collector sample."""
+    taken_at: float
+    battery: dict
+    brightness: dict
+    system: dict
+    network: dict
+    services: dict
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.taken_at
+
+    @property
+    def timestamp(self) -> str:
+        return datetime.fromtimestamp(self.taken_at).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def sample_status() -> StatusSnapshot:
+    """Take a fresh sample of everything /api/status reports and publish it."""
+    global _status_snapshot
+    with _sample_lock:
+        snapshot = StatusSnapshot(
+            taken_at=time.time(),
+            battery=get_battery_info(),
+            brightness=get_brightness(),
+            system=get_system_info(),
+            network=get_network_info(),
+            services=get_running_services(),
+        )
+        with _snapshot_lock:
+            _status_snapshot = snapshot
+    broadcaster.publish('status', status_payload(snapshot))
+    return snapshot
+
+
+def get_status_snapshot(max_staleness=None) -> StatusSnapshot:
+    """Return the latest collector snapshot, sampling afresh if it is older
+    than max_staleness seconds (defaults to STATUS_MAX_STALENESS)."""
+    if max_staleness is None:
+        max_staleness = STATUS_MAX_STALENESS
+    with _snapshot_lock:
+        snapshot = _status_snapshot
+    if snapshot is not None and snapshot.age <= max_staleness:
+        return snapshot
+    with _sample_lock:
+        # Another request may have refreshed it while we waited for the lock
+        with _snapshot_lock:
+            snapshot = _status_snapshot
+        if snapshot is not None and snapshot.age <= max_staleness:
+            return snapshot
+        return sample_status()
+
+
+def status_payload(snapshot: StatusSnapshot) -> dict:
+    """The /api/status document for a snapshot (also pushed on /api/stream)."""
+    return {
+        'battery': snapshot.battery,
+        'battery_estimate': estimate_battery_life(),
+        'brightness': snapshot.brightness,
+        'system': snapshot.system,
+        'network': snapshot.network,
+        'services': snapshot.services,
+        'timestamp': snapshot.timestamp,
+        'age': round(snapshot.age, 1),
+    }
+
+
+def _parse_time_arg(name):
+    """Parse a from/to query argument given as epoch seconds or an ISO timestamp.
+    Raises ValueError for malformed values."""
+    raw = request.args.get(name, '').strip()
+    if not raw:
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(raw).timestamp()
+    except ValueError:
+        raise ValueError(f'{name}: expected epoch seconds or ISO timestamp')
+
+
+def _requested_staleness():
+    """Parse the optional ?max_age=<seconds> override.
+
+    Floored at one collector interval: a client can ask for a fresher
+    snapshot than the default, but not force a sample on every request.
+    """
+    try:
+        return max(float(METRICS_INTERVAL), float(request.args['max_age']))
+    except (KeyError, ValueError):
+        return None
+
 
 # Routes
 @app.route('/')
@@ -559,22 +952,16 @@ def index():
 
 @app.route('/api/status')
 def status():
-    """Get all status information"""
-    battery = get_battery_info()
-    brightness = get_brightness()
-    system = get_system_info()
-    network = get_network_info()
-    services = get_running_services()
-    battery_estimate = estimate_battery_life()
-
-    return jsonify({
-        'battery': battery,
-        'battery_estimate': battery_estimate,
-        'brightness': brightness,
-        'system': system,
-        'network': network,
-        'services': services,
-        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    """Get all status information from the latest collector snapshot"""
+    snapshot = get_status_snapshot(_requested_staleness())
+    return jsonify(status_payload(snapshot))
+
+@app.route('/api/stream')
+def event_stream():
+    """Server-Sent Events: 'status' samples, 'battery' entries and 'routes' reloads"""
+    return Response(broadcaster.stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
     })
 
 @app.route('/api/iptv')
@@ -584,13 +971,45 @@ def iptv_status():
 
 @app.route('/api/battery/history')
 def battery_history_api():
-    """Get battery history"""
-    return jsonify(battery_history)
+    """Get battery history.
+
+    Query: from/to (epoch seconds or ISO time, default the last 24 hours) and
+    step (seconds) to downsample into averaged buckets server-side.
+    """
+    try:
+        start = _parse_time_arg('from')
+        end = _parse_time_arg('to')
+        step = request.args.get('step', type=float)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if start is None:
+        start = (end or time.time()) - BATTERY_DEFAULT_WINDOW
+        if end is None:
+            # The "last 24 hours" window slides with the clock: snap its start
+            # to the recording interval so a cached body is reused only until
+            # the window moves on (it is part of the cache version below)
+            start -= start % BATTERY_UPDATE_INTERVAL
+    return response_cache.json(
+        request.full_path, (battery_history.version, start),
+        lambda: battery_history.query(start, end, step if step and step > 0 else None))
 
 @app.route('/api/metrics/history')
 def metrics_history_api():
-    """Get real-time metrics history"""
-    return jsonify(metrics_history)
+    """Get metrics history.
+
+    Query: resolution=raw|1m|1h, from/to (epoch seconds or ISO time),
+    limit (newest N points).
+    """
+    try:
+        limit = request.args.get('limit', type=int)
+        return jsonify(metrics_history.query(
+            request.args.get('resolution', 'raw'),
+            start=_parse_time_arg('from'),
+            end=_parse_time_arg('to'),
+            limit=limit if limit and limit > 0 else None,
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 @app.route('/api/brightness/set/<int:value>')
 def set_brightness_api(value):
@@ -721,93 +1140,89 @@ def terminal_logout():
 
 # ---- Todo endpoints ----
 
+@app.route('/api/persistence')
+def persistence_stats():
+    """Write-behind state per file (pending changes, writes, last error) and the battery log"""
+    try:
+        log_bytes = BATTERY_LOG_FILE.stat().st_size
+    except OSError:
+        log_bytes = 0
+    return jsonify({
+        'files': persister.stats(),
+        'battery_log': {'entries': len(battery_history), 'bytes': log_bytes, 'mode': 'append'},
+    })
+
+
 @app.route('/api/todos', methods=['GET'])
 def get_todos():
-    """Return all todos"""
-    return jsonify(todos_data)
+    """Return all todos, or with ?since=<version> only what changed after it.
+
+    The delta form is {version, reset, changed, deleted}; reset means the
+    client's version is too old and 'changed' holds the full list.
+    """
+    since = request.args.get('since')
+    if since is None:
+        return response_cache.json('todos', todo_store.version, todo_store.snapshot)
+    try:
+        since = int(since)
+    except ValueError:
+        return jsonify({'error': 'since must be an integer version'}), 400
+    # Deltas are small and per-client; not worth a slot in the response cache
+    return jsonify(todo_store.changes(since))
 
 
 @app.route('/api/todos/reorder', methods=['POST'])
 def reorder_todos():
     """Persist new ordering for open todos"""
     data = request.get_json() or {}
-    order = data.get('order', [])  # list of ids in new order
-    id_to_order = {tid: i for i, tid in enumerate(order)}
-    for todo in todos_data:
-        if todo['id'] in id_to_order:
-            todo['order'] = id_to_order[todo['id']]
-    threading.Thread(target=save_todos, daemon=True).start()
-    return jsonify({'success': True})
+    if todo_store.reorder(data.get('order', [])):  # list of ids in new order
+        _todos_changed()
+    return jsonify({'success': True, 'version': todo_store.version})
 
 
 @app.route('/api/todos', methods=['POST'])
 def create_todo():
     """Create a new todo item"""
-    data = request.get_json() or {}
-    new_id = secrets.token_hex(8)
-    open_count = len([t for t in todos_data if not t.get('completed', False)])
-    todo = {
-        'id': new_id,
-        'title': (data.get('title') or 'Untitled').strip(),
-        'description': data.get('description', ''),
-        'notes': data.get('notes', ''),
-        'due_date': data.get('due_date', ''),
-        'completed': False,
-        'created_at': datetime.now().isoformat(),
-        'completed_at': None,
-        'order': open_count,
-    }
-    todos_data.append(todo)
-    threading.Thread(target=save_todos, daemon=True).start()
+    todo = todo_store.create(request.get_json() or {})
+    _todos_changed()
     return jsonify(todo), 201
 
 
 @app.route('/api/todos/<todo_id>', methods=['PUT'])
 def update_todo(todo_id):
     """Update an existing todo item"""
-    data = request.get_json() or {}
-    for todo in todos_data:
-        if todo['id'] == todo_id:
-            for field in ['title', 'description', 'notes', 'due_date']:
-                if field in data:
-                    todo[field] = data[field]
-            threading.Thread(target=save_todos, daemon=True).start()
-            return jsonify(todo)
-    return jsonify({'error': 'Not found'}), 404
+    todo = todo_store.update(todo_id, request.get_json() or {})
+    if todo is None:
+        return jsonify({'error': 'Not found'}), 404
+    _todos_changed()
+    return jsonify(todo)
 
 
 @app.route('/api/todos/<todo_id>/complete', methods=['POST'])
 def complete_todo(todo_id):
     """Mark a todo as completed (archived)"""
-    for todo in todos_data:
-        if todo['id'] == todo_id:
-            todo['completed'] = True
-            todo['completed_at'] = datetime.now().isoformat()
-            threading.Thread(target=save_todos, daemon=True).start()
-            return jsonify(todo)
-    return jsonify({'error': 'Not found'}), 404
+    todo = todo_store.complete(todo_id)
+    if todo is None:
+        return jsonify({'error': 'Not found'}), 404
+    _todos_changed()
+    return jsonify(todo)
 
 
 @app.route('/api/todos/<todo_id>/reopen', methods=['POST'])
 def reopen_todo(todo_id):
     """Re-open an archived todo"""
-    open_count = len([t for t in todos_data if not t.get('completed', False)])
-    for todo in todos_data:
-        if todo['id'] == todo_id:
-            todo['completed'] = False
-            todo['completed_at'] = None
-            todo['order'] = open_count
-            threading.Thread(target=save_todos, daemon=True).start()
-            return jsonify(todo)
-    return jsonify({'error': 'Not found'}), 404
+    todo = todo_store.reopen(todo_id)
+    if todo is None:
+        return jsonify({'error': 'Not found'}), 404
+    _todos_changed()
+    return jsonify(todo)
 
 
 @app.route('/api/todos/<todo_id>', methods=['DELETE'])
 def delete_todo(todo_id):
     """Delete a todo item permanently"""
-    global todos_data
-    todos_data = [t for t in todos_data if t['id'] != todo_id]
-    threading.Thread(target=save_todos, daemon=True).start()
+    if todo_store.delete(todo_id):
+        _todos_changed()
     return jsonify({'success': True})
 
 
@@ -821,136 +1236,89 @@ def rally_bot_asset(filename):
 
 @app.route('/api/rally-bot/routes')
 def rally_bot_routes():
-    """Get rally bot station routes with optional filtering"""
+    """Get rally bot station routes with optional filtering.
+
+    Query: origin/destination/model (comma-separated), start_date/end_date,
+    sort=earliest|duration|origin with order=asc|desc, limit/cursor for
+    pagination and fields=<comma-separated> to project route/return keys.
+    Responses carry an ETag tied to the route cache version.
+    """
     try:
-        # Use in-memory cache; falls back to disk if cache is cold
-        with _routes_lock:
-            all_routes = _routes_cache['data']
-        if all_routes is None:
-            _load_routes_if_changed()
-            with _routes_lock:
-                all_routes = _routes_cache['data']
-        if all_routes is None:
+        cache = _current_routes_cache()
+        if cache['data'] is None:
             return jsonify({'success': False, 'error': 'Rally bot data not found'})
 
-        # Build image lookup from models that have images, then fill gaps
-        img_lookup = {}
-        for route in all_routes:
-            for ret in route.get('returns', []):
-                mi = ret.get('model_image', '')
-                if mi:
-                    img_lookup[ret.get('model_name', '')] = mi
-        # Map short roadsurfer names to a known image via keyword matching
-        _FALLBACK_KEYWORDS = {
-            'active bunk': 'Eu Active Bunk 4 Auto Base',
-            'active long': 'Active Long 2',
-            'active poptop': 'Eu Active Poptop 4 Auto Select',
-            'active standard': 'Eu Active Standard 2 Auto Select',
-            'california grand': 'VW Grand California',
-            'california standard': 'Eu California Standard 4 Auto Base',
-            'comfort compact': 'Comfort Compact',
-            'comfort family': 'EU Comfort Family 6 Auto Select',
-            'comfort long': 'EU Comfort Long 4 Auto Select',
-            'comfort space': 'Eu Comfort Space 4 Auto Select',
-            'comfort standard': 'Eu Comfort Standard 5 Auto Select',
-        }
-        fallback_map = {k: img_lookup.get(v, '') for k, v in _FALLBACK_KEYWORDS.items()}
-        for route in all_routes:
-            for ret in route.get('returns', []):
-                if not ret.get('model_image'):
-                    key = ret.get('model_name', '').lower()
-                    if key in fallback_map and fallback_map[key]:
-                        ret['model_image'] = fallback_map[key]
-                # Deduplicate available_dates by (startDate, endDate, duration)
-                seen_dates = set()
-                unique_dates = []
-                for dr in ret.get('available_dates', []):
-                    dk = (dr.get('startDate'), dr.get('endDate'), dr.get('duration'))
-                    if dk not in seen_dates:
-                        seen_dates.add(dk)
-                        unique_dates.append(dr)
-                ret['available_dates'] = unique_dates
-
-        # Get filter parameters (comma-separated multi-values supported)
-        def parse_multi(param):
-            raw = request.args.get(param, '').strip()
-            return [v.strip().lower() for v in raw.split(',') if v.strip()] if raw else []
-
-        origin_filters = parse_multi('origin')
-        destination_filters = parse_multi('destination')
-        model_filters = parse_multi('model')
-        start_date = request.args.get('start_date', '').strip()
-        end_date = request.args.get('end_date', '').strip()
-        
-        filtered_routes = []
-        
-        for route in all_routes:
-            # Filter by origin (any selected)
-            if origin_filters and not any(f in route['origin'].lower() for f in origin_filters):
-                continue
-            
-            # Filter returns by destination, model and date
-            filtered_returns = []
-            for ret in route.get('returns', []):
-                # Filter by destination (any selected)
-                if destination_filters and not any(f in ret['destination'].lower() for f in destination_filters):
-                    continue
-                
-                # Filter by model name (any selected)
-                if model_filters and not any(f in ret.get('model_name', '').lower() for f in model_filters):
-                    continue
-                
-                # Filter by date
-                if start_date or end_date:
-                    has_matching_date = False
-                    for date_range in ret.get('available_dates', []):
-                        # Check if route dates match filter
-                        if start_date and end_date:
-                            # Check if there's overlap with filter range
-                            has_matching_date = True  # Simplified - could add proper date comparison
-                        elif start_date:
-                            has_matching_date = True
-                        elif end_date:
-                            has_matching_date = True
-                    if not has_matching_date:
-                        continue
-                
-                filtered_returns.append(ret)
-            
-            if filtered_returns:
-                route_copy = route.copy()
-                route_copy['returns'] = filtered_returns
-                filtered_routes.append(route_copy)
-        
-        # Get unique origins, destinations and models for filter options
-        origins = sorted(list(set([r['origin'] for r in all_routes])))
-        destinations = sorted(list(set([
-            ret['destination'] 
-            for r in all_routes 
-            for ret in r.get('returns', [])
-        ])))
-        models = sorted(list(set([
-            ret['model_name']
-            for r in all_routes
-            for ret in r.get('returns', [])
-            if ret.get('model_name')
-        ])))
-        
-        return jsonify({
-            'success': True,
-            'routes': filtered_routes,
-            'total_routes': len(filtered_routes),
-            'total_returns': sum([len(r['returns']) for r in filtered_routes]),
-            'filter_options': {
-                'origins': origins,
-                'destinations': destinations,
-                'models': models
-            }
-        })
+        return response_cache.json(request.full_path, cache['mtime'],
+                                   lambda: _routes_payload(cache), last_modified=cache['mtime'])
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 
+def _routes_payload(cache):
+    """Filter, sort and page the route cache for the current request.
+    Returns the response dict, or an error response for invalid arguments."""
+    # Get filter parameters (comma-separated multi-values supported)
+    def parse_multi(param):
+        raw = request.args.get(param, '').strip()
+        return [v.strip().lower() for v in raw.split(',') if v.strip()] if raw else []
+
+    # Dates as DD/MM/YYYY or YYYY-MM-DD; a return matches if any of its
+    # available date ranges overlaps [start_date, end_date]
+    try:
+        start_date = request.args.get('start_date', '').strip()
+        end_date = request.args.get('end_date', '').strip()
+        start_day = parse_day(start_date) if start_date else None
+        end_day = parse_day(end_date) if end_date else None
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    filtered_routes = cache['index'].query(
+        origins=parse_multi('origin'),
+        destinations=parse_multi('destination'),
+        models=parse_multi('model'),
+        start=start_day,
+        end=end_day,
+    )
+    total_returns = sum(len(r['returns']) for r in filtered_routes)
+
+    sort_key = request.args.get('sort', '').strip()
+    if sort_key:
+        try:
+            sort_routes(filtered_routes, sort_key, descending=request.args.get('order') == 'desc')
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+    # Pagination over routes (origins); cursors are tied to the cache version
+    page = filtered_routes
+    next_cursor = None
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', '').strip()
+    if limit or cursor:
+        try:
+            offset = _parse_routes_cursor(cursor, cache['mtime']) if cursor else 0
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except LookupError as e:
+            return jsonify({'success': False, 'error': str(e)}), 409
+        limit = max(1, min(limit or ROUTES_MAX_PAGE, ROUTES_MAX_PAGE))
+        page = filtered_routes[offset:offset + limit]
+        if offset + limit < len(filtered_routes):
+            next_cursor = _routes_cursor(cache['mtime'], offset + limit)
+
+    fields = set(parse_multi('fields'))
+    if fields:
+        page = [project(r, fields) for r in page]
+
+    return {
+        'success': True,
+        'routes': page,
+        'total_routes': len(filtered_routes),
+        'total_returns': total_returns,
+        'next_cursor': next_cursor,
+        'filter_options': cache['filter_options'],
+    }
+
+
 @app.route('/api/rally-bot/refresh', methods=['POST'])
 def rally_bot_refresh():
     """Manually trigger a fresh data fetch from all relocation APIs."""
@@ -960,133 +1328,172 @@ def rally_bot_refresh():
     return jsonify({'success': True, 'message': 'Refresh started in background'})
 
 
+_stats_sections: dict = {}  # section name -> (source version, computed section)
+_stats_lock = threading.Lock()
+
+
+def _stats_section(name, version, build):
+    """Return a cached stats section, recomputing it only when its source version changes."""
+    with _stats_lock:
+        entry = _stats_sections.get(name)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    section = build()
+    with _stats_lock:
+        _stats_sections[name] = (version, section)
+    return section
+
+
+def _routes_stats(cache):
+    """Routes section, computed from the already-loaded route cache."""
+    all_routes = cache['data']
+    all_returns = [ret for r in all_routes for ret in r['returns']]
+
+    model_counts = {}
+    for ret in all_returns:
+        m = ret.get('model_name') or 'Unknown'
+        model_counts[m] = model_counts.get(m, 0) + 1
+
+    top_origins = sorted(
+        [{'origin': r['origin'], 'count': len(r['returns'])} for r in all_routes],
+        key=lambda x: x['count'], reverse=True
+    )[:10]
+
+    # Day ordinals (parse_day caches the few distinct date strings)
+    first_day = last_day = None
+    for ret in all_returns:
+        for d in ret.get('available_dates', []):
+            try:
+                day = parse_day(d['startDate'])
+            except (KeyError, ValueError):
+                continue
+            first_day = day if first_day is None else min(first_day, day)
+            last_day = day if last_day is None else max(last_day, day)
+
+    def fmt(day):
+        return date.fromordinal(day).strftime('%d/%m/%Y') if day is not None else None
+
+    return {
+        'data_freshness': datetime.fromtimestamp(cache['mtime']).strftime('%Y-%m-%d %H:%M:%S'),
+        'total_origins': len(all_routes),
+        'total_returns': len(all_returns),
+        'unique_destinations': len(cache['filter_options']['destinations']),
+        'model_breakdown': [{'model': k, 'count': v} for k, v in sorted(model_counts.items(), key=lambda x: x[1], reverse=True)],
+        'top_origins': top_origins,
+        'earliest_date': fmt(first_day),
+        'latest_date': fmt(last_day),
+    }
+
+
+def _notifications_stats(notif_file):
+    if not notif_file.exists():
+        return None
+    with open(notif_file, 'r') as f:
+        notif_data = json.load(f)
+    per_user = {uid: len(notifs) for uid, notifs in notif_data.items()}
+    return {
+        'total': sum(per_user.values()),
+        'per_user': per_user,
+    }
+
+
+def _favorites_stats(favs_file):
+    if not favs_file.exists():
+        return None
+    with open(favs_file, 'r') as f:
+        favs_data = json.load(f)
+    return {
+        'total': sum(len(v) for v in favs_data.values()),
+        'per_user': {uid: len(favs) for uid, favs in favs_data.items()},
+    }
+
+
 @app.route('/api/rally-bot/stats')
 def rally_bot_stats():
-    """Get rally bot statistics for admin dashboard"""
+    """Get rally bot statistics for admin dashboard.
+
+    Each section is computed once per version of its source (route cache
+    mtime, or the file's mtime and size) and the response is ETag'd on them.
+    The log section comes from the incremental bot.log tailer.
+    """
     try:
-        rally_dir = Path(__file__).parent.parent / 'rally_bot'
-        result = {}
-
-        # --- station_routes.json ---
-        routes_file = rally_dir / 'station_routes.json'
-        if routes_file.exists():
-            with open(routes_file, 'r') as f:
-                all_routes = json.load(f)
-
-            all_returns = [ret for r in all_routes for ret in r.get('returns', [])]
-
-            model_counts = {}
-            for ret in all_returns:
-                m = ret.get('model_name') or 'Unknown'
-                model_counts[m] = model_counts.get(m, 0) + 1
-
-            top_origins = sorted(
-                [{'origin': r['origin'], 'count': len(r.get('returns', []))} for r in all_routes],
-                key=lambda x: x['count'], reverse=True
-            )[:10]
-
-            all_dates = []
-            for ret in all_returns:
-                for d in ret.get('available_dates', []):
-                    try:
-                        all_dates.append(datetime.strptime(d['startDate'], '%d/%m/%Y'))
-                    except Exception:
-                        pass
-
-            result['routes'] = {
-                'data_freshness': datetime.fromtimestamp(routes_file.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                'total_origins': len(all_routes),
-                'total_returns': len(all_returns),
-                'unique_destinations': len(set(ret['destination'] for ret in all_returns)),
-                'model_breakdown': [{'model': k, 'count': v} for k, v in sorted(model_counts.items(), key=lambda x: x[1], reverse=True)],
-                'top_origins': top_origins,
-                'earliest_date': min(all_dates).strftime('%d/%m/%Y') if all_dates else None,
-                'latest_date': max(all_dates).strftime('%d/%m/%Y') if all_dates else None,
-            }
-        else:
-            result['routes'] = None
-
-        # --- notification_history.json ---
-        notif_file = rally_dir / 'notification_history.json'
-        if notif_file.exists():
-            with open(notif_file, 'r') as f:
-                notif_data = json.load(f)
-            per_user = {uid: len(notifs) for uid, notifs in notif_data.items()}
-            result['notifications'] = {
-                'total': sum(per_user.values()),
-                'per_user': per_user,
-            }
-        else:
-            result['notifications'] = None
-
-        # --- user_favorites.json ---
-        favs_file = rally_dir / 'user_favorites.json'
-        if favs_file.exists():
-            with open(favs_file, 'r') as f:
-                favs_data = json.load(f)
-            result['favorites'] = {
-                'total': sum(len(v) for v in favs_data.values()),
-                'per_user': {uid: len(favs) for uid, favs in favs_data.items()},
-            }
-        else:
-            result['favorites'] = None
-
-        # --- bot.log (last ~200 KB for recent stats) ---
-        log_file = rally_dir / 'bot.log'
-        if log_file.exists():
-            with open(log_file, 'r', errors='replace') as f:
-                f.seek(0, 2)
-                size = f.tell()
-                chunk = min(size, 200000)
-                f.seek(size - chunk)
-                lines = f.read(chunk).splitlines()
-
-            error_count = sum(1 for l in lines if ' - ERROR - ' in l)
-            warning_count = sum(1 for l in lines if ' - WARNING - ' in l)
-
-            last_ts = None
-            for line in reversed(lines):
-                parts = line.split(' - ', 2)
-                if len(parts) >= 2 and parts[0].strip():
-                    last_ts = parts[0].strip()
-                    break
-
-            recent = [l for l in lines[-100:] if l.strip()][-25:]
-            warning_lines = [l for l in lines if ' - WARNING - ' in l][-50:]
-            error_lines   = [l for l in lines if ' - ERROR - '   in l][-50:]
-
-            result['log'] = {
-                'file_size_mb': round(log_file.stat().st_size / (1024 * 1024), 1),
-                'recent_errors': error_count,
-                'recent_warnings': warning_count,
-                'last_entry': last_ts,
-                'recent_lines': recent,
-                'warning_lines': warning_lines,
-                'error_lines': error_lines,
+        cache = _current_routes_cache()
+        notif_file = _RALLY_BOT_DIR / 'notification_history.json'
+        favs_file = _RALLY_BOT_DIR / 'user_favorites.json'
+        bot_log.poll()  # a stat() unless lines were appended since the watcher ran
+        versions = {
+            'routes': cache['mtime'] if cache['data'] is not None else None,
+            'notifications': _file_version(notif_file),
+            'favorites': _file_version(favs_file),
+            # The 24 h counters roll over with the hour even without new lines
+            'log': (bot_log.version, datetime.now().strftime('%Y-%m-%d %H')),
+        }
+
+        def build():
+            result = {
+                'routes': _stats_section('routes', versions['routes'],
+                                         lambda: _routes_stats(cache) if cache['data'] is not None else None),
+                'notifications': _stats_section('notifications', versions['notifications'],
+                                                lambda: _notifications_stats(notif_file)),
+                'favorites': _stats_section('favorites', versions['favorites'],
+                                            lambda: _favorites_stats(favs_file)),
+                'log': _stats_section('log', versions['log'],
+                                      lambda: bot_log.summary() if BOT_LOG_FILE.exists() else None),
+                'refresh': dict(_routes_fetch_stats) or None,
             }
-        else:
-            result['log'] = None
+            return {'success': True, **result}
 
-        return jsonify({'success': True, **result})
+        version = tuple(versions.values()) + (_routes_fetch_stats.get('finished_at'),)
+        return response_cache.json('rally-bot-stats', version, build)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 
+@app.route('/api/rally-bot/log')
+def rally_bot_log():
+    """Search bot.log.
+
+    Query: q (case-insensitive text), level (comma-separated), from/to (epoch
+    seconds or ISO), limit, and cursor from a previous page's older/newer.
+    Without a cursor the newest matches are returned; lines are oldest first.
+    """
+    try:
+        levels = [v.strip().upper() for v in request.args.get('level', '').split(',') if v.strip()]
+        unknown = [v for v in levels if v not in LOG_LEVELS]
+        if unknown:
+            return jsonify({'success': False, 'error': f'Unknown level: {", ".join(unknown)}'}), 400
+        start = _parse_time_arg('from')
+        end = _parse_time_arg('to')
+        limit = max(1, min(request.args.get('limit', 100, type=int), LOG_SEARCH_MAX_PAGE))
+        result = bot_log_index.search(
+            query=request.args.get('q', '').strip(),
+            levels=levels,
+            start=start,
+            end=end,
+            cursor=request.args.get('cursor', '').strip() or None,
+            limit=limit,
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    return jsonify({'success': True, **result})
+
+
 @app.route('/api/quick-stats')
 def quick_stats():
     """Get quick stats for dashboard header (lightweight)"""
     try:
-        battery = get_battery_info()
-        cpu_usage = psutil.cpu_percent(interval=0.1)
-        mem_percent = psutil.virtual_memory().percent
-        temp = get_temperature()
-        
+        snapshot = get_status_snapshot(_requested_staleness())
+        system = snapshot.system
+
         return jsonify({
-            'battery': battery,
-            'cpu': cpu_usage,
-            'memory': mem_percent,
-            'temperature': temp,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'battery': snapshot.battery,
+            'cpu': system.get('cpu_usage'),
+            'memory': system.get('memory', {}).get('percent'),
+            'temperature': system.get('temperature', 'N/A'),
+            'timestamp': snapshot.timestamp,
+            'age': round(snapshot.age, 1),
         })
     except Exception as e:
         return jsonify({'error': str(e)})
@@ -1098,32 +1505,28 @@ def background_metrics_collector():
     
     while True:
         try:
-            # Collect system metrics
-            system = get_system_info()
-            network = get_network_info()
+            # Sample everything once and publish it for the API endpoints
+            # (battery history timing is handled inside get_battery_info)
+            snapshot = sample_status()
             
             # Add to metrics history
-            add_metrics_history(system, network)
-            
-            # Check if it's time to record battery (every 10 minutes)
-            battery = get_battery_info()
-            # get_battery_info already handles the timing internally
+            add_metrics_history(snapshot.system, snapshot.network)
             
-            time.sleep(5)  # Collect every 5 seconds
+            time.sleep(METRICS_INTERVAL)
         except Exception as e:
             print(f"Error in background collector: {e}")
-            time.sleep(5)
+            time.sleep(METRICS_INTERVAL)
 
 # ---- Rally Bot geocoding endpoints ----
 _GEOCODE_CACHE_FILE = Path(__file__).parent.parent / 'rally_bot' / 'geocode_cache.json'
+GEOCODE_WAIT = 15          # seconds /api/rally-bot/geocode waits for the queue
+GEOCODE_BATCH_MAX_WAIT = 10
+geocoder = Geocoder(_GEOCODE_CACHE_FILE, url=NOMINATIM_URL, min_interval=NOMINATIM_INTERVAL)
 
 @app.route('/api/rally-bot/geocodes')
 def rally_bot_geocodes():
     """Return the full geocode cache (city → [lat, lng])."""
-    if not _GEOCODE_CACHE_FILE.exists():
-        return jsonify({})
-    with open(_GEOCODE_CACHE_FILE, 'r') as f:
-        return jsonify(json.load(f))
+    return response_cache.json('geocodes', geocoder.version, lambda: dict(geocoder.coords))
 
 @app.route('/api/rally-bot/geocode')
 def rally_bot_geocode_city():
@@ -1132,39 +1535,78 @@ def rally_bot_geocode_city():
     if not city:
         return jsonify({'error': 'city required'}), 400
 
-    # Load existing cache
-    cache = {}
-    if _GEOCODE_CACHE_FILE.exists():
-        with open(_GEOCODE_CACHE_FILE, 'r') as f:
-            cache = json.load(f)
-
-    if city in cache:
-        return jsonify({'coords': cache[city], 'cached': True})
-
-    # Query Nominatim
+    coords = geocoder.get(city)
+    if coords is not None:
+        return jsonify({'coords': coords, 'cached': True})
     try:
-        resp = requests.get(
-            'https://nominatim.openstreetmap.org/search',
-            params={'q': city, 'format': 'json', 'limit': 1},
-            headers={'User-Agent': 'rally-dashboard/1.0'},
-            timeout=8,
-        )
-        results = resp.json()
-        if results:
-            coords = [float(results[0]['lat']), float(results[0]['lon'])]
-            cache[city] = coords
-            with open(_GEOCODE_CACHE_FILE, 'w') as f:
-                json.dump(cache, f, indent=2)
-            return jsonify({'coords': coords, 'cached': False})
-        return jsonify({'error': 'City not found'}), 404
+        coords = geocoder.lookup(city, timeout=GEOCODE_WAIT)
+    except FuturesTimeout:
+        return jsonify({'error': 'Lookup queued, try again shortly', 'pending': True}), 202
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    if coords is None:
+        return jsonify({'error': 'City not found'}), 404
+    return jsonify({'coords': coords, 'cached': False})
+
+@app.route('/api/rally-bot/geocode/batch', methods=['POST'])
+def rally_bot_geocode_batch():
+    """Resolve many cities at once.
+
+    Body: {"cities": [...], "wait": seconds}.  Cached cities are answered
+    immediately; the rest are queued (ahead of background pre-geocoding) and
+    waited for up to `wait` seconds.  Cities still queued are listed in
+    'pending', those Nominatim does not know in 'missing', and those whose
+    lookup failed (HTTP error, timeout, rate limit) in 'errors'; failed
+    lookups aren't remembered, so they are retried next time.
+    """
+    data = request.get_json(silent=True) or {}
+    cities = data.get('cities')
+    if not isinstance(cities, list):
+        return jsonify({'error': 'cities must be a list'}), 400
+    try:
+        wait = max(0.0, min(float(data.get('wait', 0)), GEOCODE_BATCH_MAX_WAIT))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'wait must be a number'}), 400
+
+    cities = list(dict.fromkeys(str(c).strip() for c in cities if str(c).strip()))
+    coords, futures = geocoder.request(cities)
+    deadline = time.monotonic() + wait
+    pending, errors = [], []
+    for city, future in futures.items():
+        try:
+            result = future.result(max(0.0, deadline - time.monotonic()))
+        except FuturesTimeout:
+            pending.append(city)
+            continue
+        except Exception:
+            errors.append(city)
+            continue
+        if result is not None:
+            coords[city] = result
+    unresolved = set(pending) | set(errors)
+    missing = [c for c in cities if c not in coords and c not in unresolved]
+    return jsonify({'coords': coords, 'pending': pending, 'missing': missing, 'errors': errors})
 
 # ---- File Storage endpoints ----
 STORAGE_ROOT = Path(__file__).parent / 'storage'
 STORAGE_ROOT.mkdir(exist_ok=True)
 
 IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.svg', '.ico'}
+STORAGE_PAGE_SIZE = 200   # listing entries per page by default
+STORAGE_PAGE_MAX = 2000
+
+STORAGE_INDEX_FILE = Path(__file__).parent / 'storage_index.db'
+STORAGE_RESCAN_SECONDS = int(os.environ.get('STORAGE_RESCAN_SECONDS', '600'))
+STORAGE_SEARCH_MAX = 500
+
+storage_lister = DirectoryLister(image_exts=IMAGE_EXTS)
+storage_index = StorageIndex(STORAGE_INDEX_FILE, STORAGE_ROOT, image_exts=IMAGE_EXTS)
+
+# Resumable uploads: part files live beside storage/ (same filesystem, so
+# finalising is a rename) and are dropped after a week without progress
+STORAGE_PARTS_DIR = Path(__file__).parent / 'storage_uploads'
+STORAGE_UPLOAD_MAX_BYTES = int(os.environ.get('STORAGE_UPLOAD_MAX_BYTES', str(4 * 1024 ** 3)))
+storage_uploads = UploadManager(STORAGE_PARTS_DIR, STORAGE_UPLOAD_MAX_BYTES)
 
 
 def _resolve_storage_path(rel: str) -> Path:
@@ -1176,27 +1618,60 @@ def _resolve_storage_path(rel: str) -> Path:
     return target
 
 
+def _storage_rel(target: Path) -> str:
+    """Path of a resolved storage path relative to STORAGE_ROOT ('' for the root)."""
+    rel = target.relative_to(STORAGE_ROOT.resolve()).as_posix()
+    return '' if rel == '.' else rel
+
+
+def _storage_rescanner():
+    """Background daemon thread: reconcile the storage index with the disk,
+    picking up files added or removed outside the dashboard."""
+    while True:
+        try:
+            fixed = storage_index.rescan()
+            if fixed:
+                print(f"Storage index: fixed {fixed} entries")
+        except Exception as e:
+            print(f"Error rescanning storage: {e}")
+        time.sleep(STORAGE_RESCAN_SECONDS)
+
+
 @app.route('/api/storage/list')
 def storage_list():
-    """List contents of a directory inside storage."""
+    """List a directory inside storage, a page at a time.
+
+    ?sort=name|size|mtime (folders always first), ?order=asc|desc,
+    ?limit=N (default STORAGE_PAGE_SIZE) and ?cursor= from the previous
+    page's next_cursor.
+    """
     rel = request.args.get('path', '')
     try:
         folder = _resolve_storage_path(rel)
-        if not folder.exists() or not folder.is_dir():
+        if not folder.is_dir():
             return jsonify({'success': False, 'error': 'Not a directory'}), 400
-        items = []
-        for item in sorted(folder.iterdir(), key=lambda p: (p.is_file(), p.name.lower())):
-            stat = item.stat()
-            entry = {
-                'name': item.name,
-                'type': 'file' if item.is_file() else 'dir',
-                'size': stat.st_size if item.is_file() else None,
-                'modified': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M'),
-                'is_image': item.suffix.lower() in IMAGE_EXTS,
-                'path': str(item.relative_to(STORAGE_ROOT)),
-            }
-            items.append(entry)
-        return jsonify({'success': True, 'items': items, 'path': rel or '/'})
+        try:
+            limit = int(request.args.get('limit', STORAGE_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+        limit = max(1, min(limit, STORAGE_PAGE_MAX))
+        folder_rel = _storage_rel(folder)
+        try:
+            page = storage_lister.page(
+                folder, folder_rel,
+                sort=request.args.get('sort', 'name'),
+                descending=request.args.get('order', 'asc') == 'desc',
+                cursor=request.args.get('cursor'), limit=limit,
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        # Recursive totals for the folder and the subfolders on this page
+        dirs = [item['path'] for item in page['items'] if item['type'] == 'dir']
+        totals = storage_index.folder_totals(dirs + [folder_rel])
+        page['items'] = [{**item, **totals[item['path']]} if item['path'] in totals else item
+                         for item in page['items']]
+        return jsonify({'success': True, 'path': rel or '/', 'folder': totals.get(folder_rel),
+                        **page})
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid path'}), 400
     except Exception as e:
@@ -1211,6 +1686,8 @@ def storage_mkdir():
     try:
         folder = _resolve_storage_path(rel)
         folder.mkdir(parents=True, exist_ok=False)
+        storage_lister.invalidate(folder.parent)
+        storage_index.added(_storage_rel(folder))
         return jsonify({'success': True})
     except FileExistsError:
         return jsonify({'success': False, 'error': 'Folder already exists'}), 409
@@ -1220,6 +1697,17 @@ def storage_mkdir():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _unique_dest(folder: Path, filename: str) -> Path:
+    """folder/filename, with a counter appended if that name is taken."""
+    dest = folder / filename
+    counter = 1
+    stem, suffix = dest.stem, dest.suffix
+    while dest.exists():
+        dest = folder / f'{stem}_{counter}{suffix}'
+        counter += 1
+    return dest
+
+
 @app.route('/api/storage/upload', methods=['POST'])
 def storage_upload():
     """Upload one or more files to a target directory."""
@@ -1232,15 +1720,11 @@ def storage_upload():
             filename = Path(f.filename).name  # strip any directory components
             if not filename:
                 continue
-            dest = folder / filename
-            # avoid overwriting: append a counter if needed
-            counter = 1
-            stem, suffix = dest.stem, dest.suffix
-            while dest.exists():
-                dest = folder / f'{stem}_{counter}{suffix}'
-                counter += 1
+            dest = _unique_dest(folder, filename)
             f.save(str(dest))
+            storage_index.added(_storage_rel(dest))
             saved.append(dest.name)
+        storage_lister.invalidate(folder)
         return jsonify({'success': True, 'saved': saved})
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid path'}), 400
@@ -1248,6 +1732,93 @@ def storage_upload():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _upload_error(e: UploadError):
+    body = {'success': False, 'error': str(e)}
+    if e.offset is not None:
+        body['offset'] = e.offset
+    return jsonify(body), e.status
+
+
+@app.route('/api/storage/uploads', methods=['POST'])
+def storage_upload_init():
+    """Start a resumable upload: {path, filename, size[, sha256]} -> {id, offset, ...}.
+
+    Then PUT the bytes to /api/storage/uploads/<id>?offset=N in chunks,
+    GET /api/storage/uploads/<id> to find where to resume, and POST
+    /api/storage/uploads/<id>/finalize once offset == size.
+    """
+    data = request.get_json() or {}
+    filename = Path(str(data.get('filename', ''))).name  # strip any directory components
+    if not filename:
+        return jsonify({'success': False, 'error': 'filename is required'}), 400
+    try:
+        folder = _resolve_storage_path(data.get('path', ''))
+        status = storage_uploads.create(_storage_rel(folder), filename, data.get('size'),
+                                        sha256=data.get('sha256'))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid path'}), 400
+    except UploadError as e:
+        return _upload_error(e)
+    return jsonify({'success': True, 'max_size': STORAGE_UPLOAD_MAX_BYTES, **status}), 201
+
+
+@app.route('/api/storage/uploads/<upload_id>', methods=['GET'])
+def storage_upload_status(upload_id):
+    """Where an upload stands (offset = bytes received so far)."""
+    try:
+        return jsonify({'success': True, **storage_uploads.get_status(upload_id)})
+    except UploadError as e:
+        return _upload_error(e)
+
+
+@app.route('/api/storage/uploads/<upload_id>', methods=['PUT'])
+def storage_upload_chunk(upload_id):
+    """Append the request body to an upload at ?offset= (streamed, not buffered)."""
+    try:
+        offset = int(request.args.get('offset', ''))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'offset must be an integer'}), 400
+    if request.content_length is None:
+        return jsonify({'success': False, 'error': 'Content-Length is required'}), 411
+    try:
+        status = storage_uploads.write(upload_id, offset, request.stream, request.content_length)
+    except UploadError as e:
+        return _upload_error(e)
+    return jsonify({'success': True, **status})
+
+
+@app.route('/api/storage/uploads/<upload_id>', methods=['DELETE'])
+def storage_upload_abort(upload_id):
+    """Abandon an upload and delete its part file."""
+    try:
+        storage_uploads.abort(upload_id)
+    except UploadError as e:
+        return _upload_error(e)
+    return jsonify({'success': True})
+
+
+@app.route('/api/storage/uploads/<upload_id>/finalize', methods=['POST'])
+def storage_upload_finalize(upload_id):
+    """Move a complete upload into its folder (optionally checking {sha256})."""
+    data = request.get_json(silent=True) or {}
+
+    def dest_for(folder_rel, filename):
+        folder = _resolve_storage_path(folder_rel)
+        folder.mkdir(parents=True, exist_ok=True)
+        return _unique_dest(folder, filename)
+
+    try:
+        dest, digest = storage_uploads.finish(upload_id, dest_for, sha256=data.get('sha256'))
+    except UploadError as e:
+        return _upload_error(e)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid path'}), 400
+    storage_lister.invalidate(dest.parent)
+    storage_index.added(_storage_rel(dest))
+    return jsonify({'success': True, 'saved': dest.name, 'path': _storage_rel(dest),
+                    'sha256': digest})
+
+
 @app.route('/api/storage/delete', methods=['POST'])
 def storage_delete():
     """Delete a file or folder (recursively)."""
@@ -1259,8 +1830,11 @@ def storage_delete():
             return jsonify({'success': False, 'error': 'Not found'}), 404
         if target.is_dir():
             shutil.rmtree(target)
+            storage_lister.invalidate()  # subfolders may be cached too
         else:
             target.unlink()
+            storage_lister.invalidate(target.parent)
+        storage_index.removed(_storage_rel(target))
         return jsonify({'success': True})
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid path'}), 400
@@ -1268,16 +1842,69 @@ def storage_delete():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/storage/search')
+def storage_search():
+    """Files and folders whose name contains ?q= (case-insensitive), from the index.
+
+    ?path= limits the search to one folder's subtree; ?limit= caps the results.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': False, 'error': 'q is required'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 100)), STORAGE_SEARCH_MAX))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+    try:
+        under = _storage_rel(_resolve_storage_path(request.args.get('path', '')))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid path'}), 400
+    items = storage_index.search(query, limit=limit, under=under)
+    return jsonify({'success': True, 'query': query, 'items': items,
+                    'truncated': len(items) == limit, 'index': storage_index.stats()})
+
+
+@app.route('/api/storage/archive')
+def storage_archive():
+    """Download a folder (?path=, default the whole storage) as a ZIP built while it is sent."""
+    try:
+        folder = _resolve_storage_path(request.args.get('path', ''))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid path'}), 400
+    if not folder.is_dir():
+        return jsonify({'success': False, 'error': 'Not a directory'}), 404
+    name = (folder.name if _storage_rel(folder) else 'storage') + '.zip'
+    response = Response(stream_zip(folder), mimetype='application/zip')
+    try:
+        name.encode('ascii')
+        names = {'filename': name}
+    except UnicodeEncodeError:
+        # ASCII fallback plus the real name for clients that read filename*
+        ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+        if ascii_name == '.zip':
+            ascii_name = 'folder.zip'
+        names = {'filename': ascii_name, 'filename*': "UTF-8''" + url_quote(name, safe='')}
+    response.headers.set('Content-Disposition', 'attachment', **names)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
 @app.route('/api/storage/file/<path:rel>')
 def storage_file(rel):
-    """Serve a file from storage (for preview / download)."""
+    """Serve a file from storage (for preview / download).
+
+    Supports Range/If-Range (206) and ETag/If-None-Match; under --serve the
+    bytes are sent with sendfile.
+    """
     try:
         target = _resolve_storage_path(rel)
         if not target.is_file():
             return jsonify({'error': 'Not found'}), 404
-        return send_from_directory(str(target.parent), target.name)
+        return send_file(target)
     except ValueError:
         return jsonify({'error': 'Invalid path'}), 400
+    except OSError:
+        return jsonify({'error': 'Not found'}), 404
 
 
 def main():
@@ -1285,22 +1912,46 @@ def main():
     # Load persisted data on startup
     load_battery_history()
     load_todos()
+    geocoder.load()
+    atexit.register(bot_log.save_state)
+    atexit.register(geocoder.flush)
+    atexit.register(persister.flush)
     
     # Start background metrics collection thread
     collector_thread = threading.Thread(target=background_metrics_collector, daemon=True)
     collector_thread.start()
 
-    # Start rally routes file watcher / auto-refresh thread
+    # Watch the rally bot's data files, then start the routes auto-refresh thread
+    _start_file_watcher()
     threading.Thread(target=_routes_watcher, daemon=True, name='routes_watcher').start()
+    threading.Thread(target=_storage_rescanner, daemon=True, name='storage_rescanner').start()
 
     parser = argparse.ArgumentParser(description='Server Dashboard')
     parser.add_argument('--port', type=int, default=6969, help='Port to listen on (default: 6969)')
+    parser.add_argument('--serve', action='store_true',
+                        help='Use the bounded worker-pool server instead of the Flask development server')
+    parser.add_argument('--workers', type=int, default=SERVE_WORKERS,
+                        help=f'Worker threads for --serve (default: {SERVE_WORKERS})')
+    parser.add_argument('--backlog', type=int, default=SERVE_BACKLOG,
+                        help=f'Connections queued before --serve answers 503 (default: {SERVE_BACKLOG})')
     args = parser.parse_args()
 
     cert = Path(__file__).parent / 'certs' / 'cert.pem'
     key  = Path(__file__).parent / 'certs' / 'key.pem'
     ssl_ctx = (str(cert), str(key)) if cert.exists() and key.exists() else None
 
+    if args.serve:
+        server = PooledWSGIServer('0.0.0.0', args.port, app, workers=args.workers,
+                                  backlog=args.backlog, keepalive=SERVE_KEEPALIVE,
+                                  max_streams=SERVE_MAX_STREAMS, ssl_context=ssl_ctx)
+        print(f"Serving on port {args.port} ({'HTTPS' if ssl_ctx else 'HTTP'}, "
+              f"{args.workers} workers, backlog {args.backlog})...")
+        server.serve_until_signalled(grace=SERVE_SHUTDOWN_GRACE)
+        print(f"Server stopped ({server.rejected} connections turned away while busy)")
+        return
+
+    # Exit (running the atexit flushes) rather than die on systemd's SIGTERM
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     print(f"Starting server on port {args.port} ({'HTTPS' if ssl_ctx else 'HTTP'})...")
     app.run(host='0.0.0.0', port=args.port, debug=False, ssl_context=ssl_ctx)
 
@@ -0,0 +1,128 @@
+"""Bulk systemd unit monitoring.
+
+All watched units are queried with a single ``systemctl show`` call per
+sample instead of one ``systemctl is-active`` per unit.  The query goes
+through a backend object so the monitor can be fed from a JSON fixture on
+machines without systemd.
+"""
+import json
+import subprocess
+import time
+
+PROPERTIES = ('Id', 'LoadState', 'ActiveState', 'SubState', 'MainPID',
+              'MemoryCurrent', 'CPUUsageNSec', 'NRestarts')
+_UNSET = 2 ** 64 - 1  # systemd's "[not set]" for unsigned properties
+
+
+def _unit_name(name: str) -> str:
+    return name if '.' in name else f'{name}.service'
+
+
+def _parse_show(output: str):
+    """Split `systemctl show` output into one {property: value} dict per unit."""
+    blocks, current = [], {}
+    for line in output.splitlines():
+        if not line.strip():
+            if current:
+                blocks.append(current)
+                current = {}
+            continue
+        key, _, value = line.partition('=')
+        current[key] = value
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+class SystemctlBackend:
+    """Query units through one `systemctl show` process."""
+
+    def __init__(self, systemctl='systemctl', timeout=5):
+        self.systemctl = systemctl
+        self.timeout = timeout
+
+    def show(self, units):
+        """{unit: {property: value}}, in the order units were given."""
+        result = subprocess.run(
+            [self.systemctl, 'show', '--no-pager', '-p', ','.join(PROPERTIES), *units],
+            capture_output=True, text=True, timeout=self.timeout,
+        )
+        if result.returncode != 0 and not result.stdout:
+            raise OSError(result.stderr.strip() or f'systemctl exited with {result.returncode}')
+        # Blocks come back in argument order; Id may differ for aliases (sshd -> ssh.service)
+        return dict(zip(units, _parse_show(result.stdout)))
+
+
+class JsonBackend:
+    """Unit properties from a JSON file ({unit: {property: value}}), for testing."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def show(self, units):
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        missing = {'LoadState': 'not-found'}
+        return {unit: {k: str(v) for k, v in data.get(unit, missing).items()} for unit in units}
+
+
+def _int_prop(props, name):
+    try:
+        value = int(props.get(name, ''))
+    except ValueError:
+        return None
+    return None if value == _UNSET else value
+
+
+class ServiceMonitor:
+    """State, memory, CPU and restart counts for a configured list of units."""
+
+    def __init__(self, units, backend=None):
+        self.units = [_unit_name(u) for u in units if u.strip()]
+        self.backend = backend or SystemctlBackend()
+        self._last_cpu = {}  # unit -> (monotonic time, CPUUsageNSec)
+
+    def status(self):
+        """{unit name: {state, sub_state, pid, memory_mb, cpu_seconds, cpu_percent, restarts}}."""
+        if not self.units:
+            return {}
+        try:
+            raw = self.backend.show(self.units)
+        except (OSError, ValueError, subprocess.SubprocessError) as e:
+            return {self._key(u): {'state': 'unknown', 'error': str(e)} for u in self.units}
+
+        now = time.monotonic()
+        services = {}
+        for unit in self.units:
+            props = raw.get(unit, {})
+            if props.get('LoadState') == 'not-found':
+                services[self._key(unit)] = {'state': 'not-found'}
+                continue
+            memory = _int_prop(props, 'MemoryCurrent')
+            cpu_ns = _int_prop(props, 'CPUUsageNSec')
+            services[self._key(unit)] = {
+                'state': props.get('ActiveState', 'unknown'),
+                'sub_state': props.get('SubState'),
+                'pid': _int_prop(props, 'MainPID') or None,
+                'memory_mb': round(memory / (1024 * 1024), 1) if memory is not None else None,
+                'cpu_seconds': round(cpu_ns / 1e9, 1) if cpu_ns is not None else None,
+                'cpu_percent': self._cpu_percent(unit, now, cpu_ns),
+                'restarts': _int_prop(props, 'NRestarts'),
+            }
+        return services
+
+    def _cpu_percent(self, unit, now, cpu_ns):
+        """CPU use since the previous sample, as a percentage of one core."""
+        previous = self._last_cpu.get(unit)
+        if cpu_ns is None:
+            self._last_cpu.pop(unit, None)
+            return None
+        self._last_cpu[unit] = (now, cpu_ns)
+        if previous is None or now <= previous[0] or cpu_ns < previous[1]:
+            return None
+        return round((cpu_ns - previous[1]) / 1e9 / (now - previous[0]) * 100, 1)
+
+    @staticmethod
+    def _key(unit):
+        # Report plain services by their short name, as before ('sshd', 'cron')
+        return unit[:-len('.service')] if unit.endswith('.service') else unit
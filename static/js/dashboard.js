@@ -220,35 +220,37 @@ function applyLang() {
 function updateQuickStats() {
   fetch('/api/quick-stats')
     .then(r => r.json())
-    .then(data => {
-      document.getElementById('last-update').textContent = data.timestamp;
-      
-      // Update battery hero
-      const cap = Number(data.battery.capacity);
-      const capOk = Number.isFinite(cap);
-      document.getElementById('battery-hero-pct').textContent = capOk ? `${cap.toFixed(0)}%` : '--%';
-      document.getElementById('battery-hero-status').textContent = data.battery.status || '--';
-      document.getElementById('battery-hero-arrow').textContent = batteryArrow(data.battery.status);
-      document.getElementById('battery-hero-bar').style.width = capOk ? `${Math.max(0, Math.min(100, cap))}%` : '0%';
-      
-      // Update quick stats
-      const cpu = Number(data.cpu);
-      const mem = Number(data.memory);
-      const temp = Number(data.temperature);
-      
-      document.getElementById('quick-cpu').textContent = Number.isFinite(cpu) ? `${cpu.toFixed(0)}%` : '--%';
-      document.getElementById('quick-mem').textContent = Number.isFinite(mem) ? `${mem.toFixed(0)}%` : '--%';
-      document.getElementById('quick-temp').textContent = Number.isFinite(temp) ? `${temp.toFixed(1)}°C` : '--°C';
-      
-      // Update status dot
-      const overallBad = (Number.isFinite(cpu) && cpu > 95) || (Number.isFinite(mem) && mem > 92) || (Number.isFinite(temp) && temp > 85);
-      const dot = document.getElementById('status-dot');
-      dot.style.background = overallBad ? 'var(--bad)' : 'var(--accent)';
-      dot.style.boxShadow = overallBad ? '0 0 0 3px rgba(239,68,68,.18)' : '0 0 0 3px rgba(34,197,94,.16)';
-    })
+    .then(renderQuickStats)
     .catch(err => console.error('Error fetching quick stats:', err));
 }
 
+function renderQuickStats(data) {
+  document.getElementById('last-update').textContent = data.timestamp;
+  
+  // Update battery hero
+  const cap = Number(data.battery.capacity);
+  const capOk = Number.isFinite(cap);
+  document.getElementById('battery-hero-pct').textContent = capOk ? `${cap.toFixed(0)}%` : '--%';
+  document.getElementById('battery-hero-status').textContent = data.battery.status || '--';
+  document.getElementById('battery-hero-arrow').textContent = batteryArrow(data.battery.status);
+  document.getElementById('battery-hero-bar').style.width = capOk ? `${Math.max(0, Math.min(100, cap))}%` : '0%';
+  
+  // Update quick stats
+  const cpu = Number(data.cpu);
+  const mem = Number(data.memory);
+  const temp = Number(data.temperature);
+  
+  document.getElementById('quick-cpu').textContent = Number.isFinite(cpu) ? `${cpu.toFixed(0)}%` : '--%';
+  document.getElementById('quick-mem').textContent = Number.isFinite(mem) ? `${mem.toFixed(0)}%` : '--%';
+  document.getElementById('quick-temp').textContent = Number.isFinite(temp) ? `${temp.toFixed(1)}°C` : '--°C';
+  
+  // Update status dot
+  const overallBad = (Number.isFinite(cpu) && cpu > 95) || (Number.isFinite(mem) && mem > 92) || (Number.isFinite(temp) && temp > 85);
+  const dot = document.getElementById('status-dot');
+  dot.style.background = overallBad ? 'var(--bad)' : 'var(--accent)';
+  dot.style.boxShadow = overallBad ? '0 0 0 3px rgba(239,68,68,.18)' : '0 0 0 3px rgba(34,197,94,.16)';
+}
+
 // Admin-only windows (require admin authentication)
 const ADMIN_WINDOWS = new Set(['metrics', 'controls', 'todo', 'rally-stats', 'files']);
 let isAdmin = false;
@@ -628,17 +630,7 @@ function loadBatteryHistory() {
       batteryData.length = 0;
       batteryStatusData.length = 0;
       
-      data.forEach((entry, index) => {
-        const date = new Date(entry.timestamp);
-        // Show absolute time for first entry, then relative hours
-        if (index === 0) {
-          batteryLabels.push(date.toLocaleString([], {month:'short', day:'numeric', hour:'2-digit', minute:'2-digit'}));
-        } else {
-          batteryLabels.push(date.toLocaleTimeString([], {hour:'2-digit', minute:'2-digit'}));
-        }
-        batteryData.push(entry.capacity);
-        batteryStatusData.push({status: entry.status || '', capacity: entry.capacity});
-      });
+      data.forEach(pushBatteryEntry);
       
       batteryChart.update();
       console.log(`Loaded ${data.length} battery history entries`);
@@ -646,9 +638,21 @@ function loadBatteryHistory() {
     .catch(err => console.error('Error loading battery history:', err));
 }
 
+function pushBatteryEntry(entry) {
+  const date = new Date(entry.timestamp);
+  // Show absolute time for first entry, then relative hours
+  if (batteryLabels.length === 0) {
+    batteryLabels.push(date.toLocaleString([], {month:'short', day:'numeric', hour:'2-digit', minute:'2-digit'}));
+  } else {
+    batteryLabels.push(date.toLocaleTimeString([], {hour:'2-digit', minute:'2-digit'}));
+  }
+  batteryData.push(entry.capacity);
+  batteryStatusData.push({status: entry.status || '', capacity: entry.capacity});
+}
+
 // ---- metrics history ----
 function loadMetricsHistory() {
-  fetch('/api/metrics/history')
+  fetch(`/api/metrics/history?limit=${MAX_POINTS}`)
     .then(r => r.json())
     .then(data => {
       // Clear arrays
@@ -692,133 +696,139 @@ function loadMetricsHistory() {
 function updateDashboard(){
   fetch('/api/status')
     .then(r => r.json())
-    .then(data => {
-      document.getElementById('last-update').textContent = data.timestamp;
-
-      // Battery hero
-      const cap = Number(data.battery.capacity);
-      const capOk = Number.isFinite(cap);
-      document.getElementById('battery-hero-pct').textContent = capOk ? `${cap.toFixed(0)}%` : '--%';
-      document.getElementById('battery-hero-status').textContent = data.battery.status || '--';
-      document.getElementById('battery-hero-arrow').textContent = batteryArrow(data.battery.status);
-      document.getElementById('battery-hero-bar').style.width = capOk ? `${Math.max(0, Math.min(100, cap))}%` : '0%';
-      
-      // Battery history KPI
-      document.getElementById('battery-hist-kpi').textContent = capOk ? cap.toFixed(0) : '--';
-
-      // Battery life estimate
-      const est = data.battery_estimate;
-      let estText = '';
-      let estCardText = '';
-      if (est) {
-        const rate = est.rate_per_hour ? `${est.rate_per_hour}%/h` : '';
-        if (est.status === 'discharging' && est.estimate !== 'Stable') {
-          estText = `~${est.estimate} left`;
-          estCardText = `⬇ ${rate} · ~${est.estimate} remaining`;
-        } else if (est.status === 'charging' && est.estimate !== 'Stable') {
-          estText = `~${est.estimate} to full`;
-          estCardText = `⬆ ${rate} · ~${est.estimate} to full`;
-        } else if (est.estimate === 'Stable') {
-          estText = 'Stable';
-          estCardText = 'Drain rate: 0%/h';
-        }
-      }
-      document.getElementById('battery-hero-estimate').textContent = estText;
-      document.getElementById('battery-estimate-card').textContent = estCardText;
+    .then(renderStatus)
+    .catch(err => console.error('Error fetching status:', err));
 
-      // Current metrics
-      const cpu = Number(data.system.cpu_usage);
-      const mem = Number(data.system.memory?.percent);
-      const disk = Number(data.system.disk?.percent);
-      const temp = (typeof data.system.temperature === 'number') ? data.system.temperature : Number(data.system.temperature);
-
-      document.getElementById('cpu-kpi').textContent = Number.isFinite(cpu) ? cpu.toFixed(0) : '--';
-      document.getElementById('mem-kpi').textContent = Number.isFinite(mem) ? mem.toFixed(0) : '--';
-      document.getElementById('disk-kpi').textContent = Number.isFinite(disk) ? disk.toFixed(0) : '--';
-      document.getElementById('temp-kpi').textContent = Number.isFinite(temp) ? temp.toFixed(1) : '--';
-
-      // Disk gauge
-      setSpeedometerGauge(diskGauge, disk);
-
-      // memory/disk details
-      document.getElementById('mem-progress').style.width = (Number.isFinite(mem) ? mem : 0) + '%';
-      document.getElementById('mem-info').textContent =
-        `${data.system.memory?.used ?? '--'} GB / ${data.system.memory?.total ?? '--'} GB`;
-
-      const diskInfo = `${data.system.disk?.used ?? '--'} GB / ${data.system.disk?.total ?? '--'} GB`;
-      document.getElementById('disk-info').textContent = diskInfo;
-
-      // Network
-      document.getElementById('net-ip').textContent = data.network.ip_address || '--';
-      let interfacesHTML = '';
-      let rxBytes = 0, txBytes = 0;
-      for (const [iface, stats] of Object.entries(data.network.interfaces || {})) {
-        // Skip usb0 and rmnet_ipa0
-        if (iface === 'usb0' || iface === 'rmnet_ipa0') continue;
-        
-        const rb = Number(stats.bytes_recv) || 0;
-        const tb = Number(stats.bytes_sent) || 0;
-        rxBytes += rb;
-        txBytes += tb;
-        const rMB = (rb / (1024 * 1024)).toFixed(2);
-        const tMB = (tb / (1024 * 1024)).toFixed(2);
-        interfacesHTML += `
-          <div class="stat">
-            <span class="stat-label">${iface}</span>
-            <span class="stat-value">↓ ${rMB} MB   ↑ ${tMB} MB</span>
-          </div>`;
-      }
-      document.getElementById('network-interfaces').innerHTML = interfacesHTML || '';
-
-      // KB/s from delta bytes
-      const now = Date.now();
-      let rxKBs = 0, txKBs = 0;
-      if (prevNetTotals) {
-        const dt = Math.max(1, (now - prevNetTotals.ts) / 1000);
-        rxKBs = Math.max(0, ((rxBytes - prevNetTotals.rxBytes) / dt) / 1024);
-        txKBs = Math.max(0, ((txBytes - prevNetTotals.txBytes) / dt) / 1024);
-      }
-      prevNetTotals = { rxBytes, txBytes, ts: now };
-
-      // Threshold pills
-      setPill('cpu-pill', !(Number.isFinite(cpu) && cpu > 90));
-      setPill('mem-pill', !(Number.isFinite(mem) && mem > 85));
-      setPill('disk-pill', !(Number.isFinite(disk) && disk > 90));
-      setPill('temp-pill', !(Number.isFinite(temp) && temp > 80));
-
-      // Overall dot
-      const overallBad =
-        (Number.isFinite(cpu) && cpu > 95) ||
-        (Number.isFinite(mem) && mem > 92) ||
-        (Number.isFinite(disk) && disk > 95) ||
-        (Number.isFinite(temp) && temp > 85);
-
-      const dot = document.getElementById('status-dot');
-      dot.style.background = overallBad ? 'var(--bad)' : 'var(--accent)';
-      dot.style.boxShadow = overallBad ? '0 0 0 3px rgba(239,68,68,.18)' : '0 0 0 3px rgba(34,197,94,.16)';
-
-      // Brightness (sync, but do not overwrite while dragging)
-      const b = Number(data.brightness?.percentage);
-      if (Number.isFinite(b)) {
-        document.getElementById('brightness-kpi').textContent = b.toFixed(0);
-        if (!userDraggingBrightness) slider.value = b.toFixed(0);
-      }
+  updateIptv();
+}
 
-      // ---- push historic points (CPU/MEM/TEMP + NET rate) ----
-      pushLabel();
-      pushPoint(cpuData, Number.isFinite(cpu) ? cpu : null);
-      pushPoint(memData, Number.isFinite(mem) ? mem : null);
-      pushPoint(tempData, Number.isFinite(temp) ? temp : null);
-      pushPoint(netRx, rxKBs);
-      pushPoint(netTx, txKBs);
+function renderStatus(data) {
+  document.getElementById('last-update').textContent = data.timestamp;
 
-      cpuChart.update();
-      memChart.update();
-      tempChart.update();
-      netChart.update();
-    })
-    .catch(err => console.error('Error fetching status:', err));
+  // Battery hero
+  const cap = Number(data.battery.capacity);
+  const capOk = Number.isFinite(cap);
+  document.getElementById('battery-hero-pct').textContent = capOk ? `${cap.toFixed(0)}%` : '--%';
+  document.getElementById('battery-hero-status').textContent = data.battery.status || '--';
+  document.getElementById('battery-hero-arrow').textContent = batteryArrow(data.battery.status);
+  document.getElementById('battery-hero-bar').style.width = capOk ? `${Math.max(0, Math.min(100, cap))}%` : '0%';
+  
+  // Battery history KPI
+  document.getElementById('battery-hist-kpi').textContent = capOk ? cap.toFixed(0) : '--';
+
+  // Battery life estimate
+  const est = data.battery_estimate;
+  let estText = '';
+  let estCardText = '';
+  if (est) {
+    const rate = est.rate_per_hour ? `${est.rate_per_hour}%/h` : '';
+    if (est.status === 'discharging' && est.estimate !== 'Stable') {
+      estText = `~${est.estimate} left`;
+      estCardText = `⬇ ${rate} · ~${est.estimate} remaining`;
+    } else if (est.status === 'charging' && est.estimate !== 'Stable') {
+      estText = `~${est.estimate} to full`;
+      estCardText = `⬆ ${rate} · ~${est.estimate} to full`;
+    } else if (est.estimate === 'Stable') {
+      estText = 'Stable';
+      estCardText = 'Drain rate: 0%/h';
+    }
+  }
+  document.getElementById('battery-hero-estimate').textContent = estText;
+  document.getElementById('battery-estimate-card').textContent = estCardText;
+
+  // Current metrics
+  const cpu = Number(data.system.cpu_usage);
+  const mem = Number(data.system.memory?.percent);
+  const disk = Number(data.system.disk?.percent);
+  const temp = (typeof data.system.temperature === 'number') ? data.system.temperature : Number(data.system.temperature);
+
+  document.getElementById('cpu-kpi').textContent = Number.isFinite(cpu) ? cpu.toFixed(0) : '--';
+  document.getElementById('mem-kpi').textContent = Number.isFinite(mem) ? mem.toFixed(0) : '--';
+  document.getElementById('disk-kpi').textContent = Number.isFinite(disk) ? disk.toFixed(0) : '--';
+  document.getElementById('temp-kpi').textContent = Number.isFinite(temp) ? temp.toFixed(1) : '--';
+
+  // Disk gauge
+  setSpeedometerGauge(diskGauge, disk);
+
+  // memory/disk details
+  document.getElementById('mem-progress').style.width = (Number.isFinite(mem) ? mem : 0) + '%';
+  document.getElementById('mem-info').textContent =
+    `${data.system.memory?.used ?? '--'} GB / ${data.system.memory?.total ?? '--'} GB`;
+
+  const diskInfo = `${data.system.disk?.used ?? '--'} GB / ${data.system.disk?.total ?? '--'} GB`;
+  document.getElementById('disk-info').textContent = diskInfo;
+
+  // Network
+  document.getElementById('net-ip').textContent = data.network.ip_address || '--';
+  let interfacesHTML = '';
+  let rxBytes = 0, txBytes = 0;
+  for (const [iface, stats] of Object.entries(data.network.interfaces || {})) {
+    // Skip usb0 and rmnet_ipa0
+    if (iface === 'usb0' || iface === 'rmnet_ipa0') continue;
+    
+    const rb = Number(stats.bytes_recv) || 0;
+    const tb = Number(stats.bytes_sent) || 0;
+    rxBytes += rb;
+    txBytes += tb;
+    const rMB = (rb / (1024 * 1024)).toFixed(2);
+    const tMB = (tb / (1024 * 1024)).toFixed(2);
+    interfacesHTML += `
+      <div class="stat">
+        <span class="stat-label">${iface}</span>
+        <span class="stat-value">↓ ${rMB} MB   ↑ ${tMB} MB</span>
+      </div>`;
+  }
+  document.getElementById('network-interfaces').innerHTML = interfacesHTML || '';
+
+  // KB/s from delta bytes
+  const now = Date.now();
+  let rxKBs = 0, txKBs = 0;
+  if (prevNetTotals) {
+    const dt = Math.max(1, (now - prevNetTotals.ts) / 1000);
+    rxKBs = Math.max(0, ((rxBytes - prevNetTotals.rxBytes) / dt) / 1024);
+    txKBs = Math.max(0, ((txBytes - prevNetTotals.txBytes) / dt) / 1024);
+  }
+  prevNetTotals = { rxBytes, txBytes, ts: now };
+
+  // Threshold pills
+  setPill('cpu-pill', !(Number.isFinite(cpu) && cpu > 90));
+  setPill('mem-pill', !(Number.isFinite(mem) && mem > 85));
+  setPill('disk-pill', !(Number.isFinite(disk) && disk > 90));
+  setPill('temp-pill', !(Number.isFinite(temp) && temp > 80));
+
+  // Overall dot
+  const overallBad =
+    (Number.isFinite(cpu) && cpu > 95) ||
+    (Number.isFinite(mem) && mem > 92) ||
+    (Number.isFinite(disk) && disk > 95) ||
+    (Number.isFinite(temp) && temp > 85);
+
+  const dot = document.getElementById('status-dot');
+  dot.style.background = overallBad ? 'var(--bad)' : 'var(--accent)';
+  dot.style.boxShadow = overallBad ? '0 0 0 3px rgba(239,68,68,.18)' : '0 0 0 3px rgba(34,197,94,.16)';
+
+  // Brightness (sync, but do not overwrite while dragging)
+  const b = Number(data.brightness?.percentage);
+  if (Number.isFinite(b)) {
+    document.getElementById('brightness-kpi').textContent = b.toFixed(0);
+    if (!userDraggingBrightness) slider.value = b.toFixed(0);
+  }
+
+  // ---- push historic points (CPU/MEM/TEMP + NET rate) ----
+  pushLabel();
+  pushPoint(cpuData, Number.isFinite(cpu) ? cpu : null);
+  pushPoint(memData, Number.isFinite(mem) ? mem : null);
+  pushPoint(tempData, Number.isFinite(temp) ? temp : null);
+  pushPoint(netRx, rxKBs);
+  pushPoint(netTx, txKBs);
+
+  cpuChart.update();
+  memChart.update();
+  tempChart.update();
+  netChart.update();
+}
 
+function updateIptv() {
   fetch('/api/iptv')
     .then(r => r.json())
     .then(data => {
@@ -861,14 +871,79 @@ function smartRefresh() {
   // Rally bot and stats don't need auto-refresh (user-driven)
 }
 
-// Load battery history on startup and refresh every 5 minutes
-loadBatteryHistory();
-setInterval(loadBatteryHistory, 300000);
+// ---- Live updates (Server-Sent Events) ----
+// One /api/stream connection replaces the status / quick-stats / battery polls.
+// The server pushes a 'status' sample every collector tick, a 'battery' entry
+// when one is recorded, 'routes' when station_routes.json is reloaded and
+// 'rally_files' when another rally bot data file changes.
+function handleStatusEvent(data) {
+  renderQuickStats({
+    timestamp: data.timestamp,
+    battery: data.battery,
+    cpu: data.system?.cpu_usage,
+    memory: data.system?.memory?.percent,
+    temperature: data.system?.temperature,
+  });
+  const disk = Number(data.system?.disk?.percent);
+  document.getElementById('quick-disk').textContent = Number.isFinite(disk) ? `${disk.toFixed(0)}%` : '--%';
 
-// Load metrics history on startup, then start smart updates
+  if (currentWindow === 'metrics' || currentWindow === 'controls') {
+    renderStatus(data);
+  }
+}
+
+function handleBatteryEvent(entry) {
+  pushBatteryEntry(entry);
+  batteryChart.update();
+}
+
+function handleRoutesEvent() {
+  if (!rallyLoaded) return;
+  // Drop the stale dataset; reload it now if the user is looking at it
+  rallyLoaded = false;
+  if (currentWindow === 'rally') loadRallyBotData();
+  else if (currentWindow === 'map') loadMapWindow();
+}
+
+function handleRallyFilesEvent(data) {
+  if (data.file === 'geocode_cache.json') {
+    mapGeocodesLoaded = false;  // refetch on next map render
+  } else if (currentWindow === 'rally-stats') {
+    loadRallyStats();
+  }
+}
+
+function handleTodosEvent(data) {
+  if (currentWindow === 'todo' && data.version !== todoVersion) loadTodos();
+}
+
+function startLiveStream() {
+  if (!window.EventSource) {
+    // Fallback: poll like before
+    loadBatteryHistory();
+    setInterval(loadBatteryHistory, 300000);
+    setInterval(smartRefresh, REFRESH_MS);
+    smartRefresh();
+    return;
+  }
+  const stream = new EventSource('/api/stream');
+  stream.addEventListener('status', e => handleStatusEvent(JSON.parse(e.data)));
+  stream.addEventListener('battery', e => handleBatteryEvent(JSON.parse(e.data)));
+  stream.addEventListener('routes', handleRoutesEvent);
+  stream.addEventListener('rally_files', e => handleRallyFilesEvent(JSON.parse(e.data)));
+  stream.addEventListener('todos', e => handleTodosEvent(JSON.parse(e.data)));
+  // EventSource reconnects on its own; resync history we may have missed
+  stream.addEventListener('open', () => { loadBatteryHistory(); });
+}
+
+// IPTV is an external API call: refresh it slowly while its window is open
+setInterval(() => {
+  if (currentWindow === 'metrics' || currentWindow === 'controls') updateIptv();
+}, 60000);
+
+// Load metrics history on startup, then follow the live stream
 loadMetricsHistory();
-updateDashboard();
-setInterval(smartRefresh, REFRESH_MS);
+startLiveStream();
 
 
 
@@ -1010,6 +1085,9 @@ function rbsCloseDetail(e) {
 // ---- Rally Bot Functions ----
 let rallyAllRoutes = [];      // full unfiltered dataset
 let rallyLoaded = false;
+// Only the keys the list and map views render (server-side projection)
+const RALLY_ROUTES_URL = '/api/rally-bot/routes?fields=' +
+  ['origin', 'destination', 'model_name', 'model_image', 'roadsurfer_url', 'available_dates'].join(',');
 
 // Load rally bot data on startup (default window)
 loadRallyBotData();
@@ -1019,7 +1097,7 @@ function loadRallyBotData() {
   document.getElementById('rally-routes-container').innerHTML =
     `<div class="loading-message">${t('msg_loading_routes')}</div>`;
 
-  fetch('/api/rally-bot/routes')
+  fetch(RALLY_ROUTES_URL)
     .then(r => r.json())
     .then(data => {
       if (!data.success) {
@@ -1741,6 +1819,7 @@ function displayRallyRoutes(routes) {
    ================================================================ */
 
 let todoItems = [];
+let todoVersion = 0;  // server version todoItems is synced to (0 = never loaded)
 let todoArchiveVisible = false;
 let todoDragSrcId = null;
 let todoDragOverId = null;
@@ -1749,8 +1828,18 @@ let todoDragOverId = null;
 
 async function loadTodos() {
   try {
-    const res = await fetch('/api/todos');
-    todoItems = await res.json();
+    // Only fetch what changed since our last sync; the server says when to start over
+    const res  = await fetch(`/api/todos?since=${todoVersion}`);
+    const data = await res.json();
+    if (data.reset) {
+      todoItems = data.changed;
+    } else {
+      const byId = new Map(todoItems.map(t => [t.id, t]));
+      data.deleted.forEach(id => byId.delete(id));
+      data.changed.forEach(t => byId.set(t.id, t));
+      todoItems = [...byId.values()];
+    }
+    todoVersion = data.version;
     renderTodos();
   } catch (e) {
     console.error('Error loading todos:', e);
@@ -2067,12 +2156,13 @@ let filesDndReady = false;
 
 function loadFiles(path) {
   filesCurrentPath = (path == null || path === undefined) ? '' : path;
+  const search = document.getElementById('files-search');
+  if (search) search.value = '';
   filesSetupDnd();
   renderFilesBreadcrumb(filesCurrentPath);
   const grid = document.getElementById('files-grid');
   grid.innerHTML = '<div class="loading-message">Loading…</div>';
-  fetch('/api/storage/list?path=' + encodeURIComponent(filesCurrentPath))
-    .then(r => r.json())
+  filesFetchPage(null)
     .then(data => {
       grid.innerHTML = '';
       if (!data.success) {
@@ -2099,59 +2189,147 @@ function loadFiles(path) {
         grid.appendChild(empty);
         return;
       }
-      data.items.forEach(item => {
-        const card = document.createElement('div');
-        card.className = 'file-card' + (item.type === 'dir' ? ' file-card-dir' : '');
-
-        if (item.is_image) {
-          const img = document.createElement('img');
-          img.className = 'file-card-img';
-          img.loading = 'lazy';
-          img.alt = item.name;
-          img.src = '/api/storage/file/' + item.path.split('/').map(encodeURIComponent).join('/');
-          card.appendChild(img);
-        } else {
-          const icon = document.createElement('div');
-          icon.className = 'file-card-icon';
-          icon.textContent = item.type === 'dir' ? '📁' : filesIcon(item.name);
-          card.appendChild(icon);
-        }
-
-        const nameEl = document.createElement('div');
-        nameEl.className = 'file-card-name';
-        nameEl.textContent = item.name;
-        nameEl.title = item.name;
-        card.appendChild(nameEl);
-
-        const metaEl = document.createElement('div');
-        metaEl.className = 'file-card-meta';
-        metaEl.textContent = item.type === 'file'
-          ? (filesFormatBytes(item.size) + ' · ' + item.modified)
-          : item.modified;
-        card.appendChild(metaEl);
-
-        const delBtn = document.createElement('button');
-        delBtn.className = 'file-delete-btn';
-        delBtn.textContent = '✕';
-        delBtn.title = 'Delete';
-        delBtn.addEventListener('click', e => { e.stopPropagation(); filesDelete(item.path); });
-        card.appendChild(delBtn);
-
-        if (item.type === 'dir') {
-          card.addEventListener('click', () => loadFiles(item.path));
-        } else {
-          card.addEventListener('click', () => {
-            window.open('/api/storage/file/' + item.path.split('/').map(encodeURIComponent).join('/'), '_blank');
-          });
-        }
-        grid.appendChild(card);
-      });
+      filesAppendPage(grid, data, 0);
     })
     .catch(() => {
       grid.innerHTML = '<div class="loading-message">Failed to load files</div>';
     });
 }
 
+// One page of the current folder in the selected sort order
+function filesFetchPage(cursor) {
+  const [sort, order] = (document.getElementById('files-sort')?.value || 'name:asc').split(':');
+  let url = '/api/storage/list?path=' + encodeURIComponent(filesCurrentPath) +
+            '&sort=' + sort + '&order=' + order;
+  if (cursor) url += '&cursor=' + encodeURIComponent(cursor);
+  return fetch(url).then(r => r.json());
+}
+
+// Add a page of cards, plus a "load more" card if the folder has more entries
+function filesAppendPage(grid, data, shown) {
+  const path = filesCurrentPath;
+  data.items.forEach(item => grid.appendChild(filesCard(item)));
+  shown += data.items.length;
+  if (!data.next_cursor) return;
+  const more = document.createElement('div');
+  more.className = 'file-card file-card-dir';
+  more.innerHTML = '<div class="file-card-icon">⋯</div><div class="file-card-name"></div>';
+  more.querySelector('.file-card-name').textContent = `Load more (${data.total - shown} left)`;
+  more.addEventListener('click', () => {
+    more.style.pointerEvents = 'none';
+    filesFetchPage(data.next_cursor)
+      .then(next => {
+        if (path !== filesCurrentPath) return;  // navigated away meanwhile
+        more.remove();
+        if (next.success) filesAppendPage(grid, next, shown);
+        else loadFiles(filesCurrentPath);  // e.g. sort changed: start over
+      })
+      .catch(() => { more.style.pointerEvents = ''; });
+  });
+  grid.appendChild(more);
+}
+
+function filesCard(item) {
+  const card = document.createElement('div');
+  card.className = 'file-card' + (item.type === 'dir' ? ' file-card-dir' : '');
+
+  if (item.is_image) {
+    const img = document.createElement('img');
+    img.className = 'file-card-img';
+    img.loading = 'lazy';
+    img.alt = item.name;
+    img.src = '/api/storage/file/' + item.path.split('/').map(encodeURIComponent).join('/');
+    card.appendChild(img);
+  } else {
+    const icon = document.createElement('div');
+    icon.className = 'file-card-icon';
+    icon.textContent = item.type === 'dir' ? '📁' : filesIcon(item.name);
+    card.appendChild(icon);
+  }
+
+  const nameEl = document.createElement('div');
+  nameEl.className = 'file-card-name';
+  nameEl.textContent = item.name;
+  nameEl.title = item.path;
+  card.appendChild(nameEl);
+
+  const metaEl = document.createElement('div');
+  metaEl.className = 'file-card-meta';
+  if (item.type === 'file') {
+    metaEl.textContent = filesFormatBytes(item.size) + ' · ' + item.modified;
+  } else if (item.files != null) {
+    metaEl.textContent = `${item.files} files · ${filesFormatBytes(item.total_size)}`;
+    metaEl.title = item.modified;
+  } else {
+    metaEl.textContent = item.modified;
+  }
+  card.appendChild(metaEl);
+
+  const delBtn = document.createElement('button');
+  delBtn.className = 'file-delete-btn';
+  delBtn.textContent = '✕';
+  delBtn.title = 'Delete';
+  delBtn.addEventListener('click', e => { e.stopPropagation(); filesDelete(item.path); });
+  card.appendChild(delBtn);
+
+  if (item.type === 'dir') {
+    const zipBtn = document.createElement('button');
+    zipBtn.className = 'file-delete-btn file-zip-btn';
+    zipBtn.textContent = '⬇';
+    zipBtn.title = 'Download as ZIP';
+    zipBtn.addEventListener('click', e => {
+      e.stopPropagation();
+      window.location.href = '/api/storage/archive?path=' + encodeURIComponent(item.path);
+    });
+    card.appendChild(zipBtn);
+  }
+
+  if (item.type === 'dir') {
+    card.addEventListener('click', () => loadFiles(item.path));
+  } else {
+    card.addEventListener('click', () => {
+      window.open('/api/storage/file/' + item.path.split('/').map(encodeURIComponent).join('/'), '_blank');
+    });
+  }
+  return card;
+}
+
+// Name search over the whole storage tree (server-side index)
+let filesSearchTimer = null;
+
+function filesSearchInput(input) {
+  clearTimeout(filesSearchTimer);
+  filesSearchTimer = setTimeout(() => filesSearch(input.value.trim()), 250);
+}
+
+function filesSearch(query) {
+  if (!query) { loadFiles(filesCurrentPath); return; }
+  const grid = document.getElementById('files-grid');
+  fetch('/api/storage/search?q=' + encodeURIComponent(query))
+    .then(r => r.json())
+    .then(data => {
+      if (document.getElementById('files-search').value.trim() !== query) return;  // stale
+      grid.innerHTML = '';
+      if (!data.success || !data.items.length) {
+        const msg = document.createElement('div');
+        msg.className = 'loading-message';
+        msg.textContent = data.success ? `Nothing named like “${query}”` : 'Error: ' + data.error;
+        grid.appendChild(msg);
+        return;
+      }
+      data.items.forEach(item => grid.appendChild(filesCard(item)));
+      if (data.truncated) {
+        const more = document.createElement('div');
+        more.className = 'loading-message';
+        more.textContent = 'Showing the first ' + data.items.length + ' matches — refine the search';
+        grid.appendChild(more);
+      }
+    })
+    .catch(() => {
+      grid.innerHTML = '<div class="loading-message">Search failed</div>';
+    });
+}
+
 function renderFilesBreadcrumb(path) {
   const bc = document.getElementById('files-breadcrumb');
   if (!path) {
@@ -2212,23 +2390,97 @@ function filesHandleInput(input) {
   input.value = '';
 }
 
-function filesUpload(fileList) {
-  const formData = new FormData();
-  for (const f of fileList) formData.append('files', f);
-  formData.append('path', filesCurrentPath);
+// Uploads go up in chunks through the resumable upload API: a dropped
+// connection retries from the server's offset, and re-uploading the same
+// file after a reload (or a server restart) continues where it stopped.
+const FILES_CHUNK_BYTES = 8 * 1024 * 1024;
+const FILES_MAX_RETRIES = 6;
+
+async function filesUpload(fileList) {
+  const folder = filesCurrentPath;
   const zone = document.getElementById('files-drop-zone');
-  zone.innerHTML = '<span>Uploading ' + fileList.length + ' file(s)…</span>';
-  fetch('/api/storage/upload', { method: 'POST', body: formData })
-    .then(r => r.json())
-    .then(data => {
-      zone.innerHTML = `<span>${t('msg_drop_files')}</span>`;
-      if (data.success) loadFiles(filesCurrentPath);
-      else alert('Upload error: ' + data.error);
-    })
-    .catch(() => {
-      zone.innerHTML = `<span>${t('msg_drop_files')}</span>`;
-      alert('Upload failed');
+  const files = Array.from(fileList);
+  const total = files.reduce((sum, f) => sum + f.size, 0) || 1;
+  let done = 0;
+  const failed = [];
+  for (const [i, file] of files.entries()) {
+    const progress = sent => {
+      const pct = Math.floor((done + sent) / total * 100);
+      zone.innerHTML = '';
+      const span = document.createElement('span');
+      span.textContent = `Uploading ${i + 1}/${files.length}: ${file.name} (${pct}%)…`;
+      zone.appendChild(span);
+    };
+    try {
+      progress(0);
+      await filesUploadOne(file, folder, progress);
+    } catch (e) {
+      failed.push(`${file.name}: ${e.message}`);
+    }
+    done += file.size;
+  }
+  zone.innerHTML = `<span>${t('msg_drop_files')}</span>`;
+  if (folder === filesCurrentPath) loadFiles(filesCurrentPath);
+  if (failed.length) alert('Upload error:\n' + failed.join('\n'));
+}
+
+async function filesUploadOne(file, folder, onProgress) {
+  const key = 'upload:' + [folder, file.name, file.size, file.lastModified].join('|');
+  let status = null;
+  const savedId = localStorage.getItem(key);
+  if (savedId) {
+    const r = await fetch('/api/storage/uploads/' + savedId).catch(() => null);
+    if (r && r.ok) status = await r.json();
+  }
+  if (!status) {
+    const r = await fetch('/api/storage/uploads', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ path: folder, filename: file.name, size: file.size })
     });
+    status = await r.json();
+    if (!status.success) throw new Error(status.error);
+    localStorage.setItem(key, status.id);
+  }
+
+  const url = '/api/storage/uploads/' + status.id;
+  let offset = status.offset;
+  let failures = 0;
+  while (offset < file.size) {
+    onProgress(offset);
+    let r;
+    try {
+      r = await fetch(`${url}?offset=${offset}`, {
+        method: 'PUT',
+        body: file.slice(offset, Math.min(offset + FILES_CHUNK_BYTES, file.size))
+      });
+    } catch (e) {
+      // Network trouble: back off, then ask the server how much it kept
+      if (++failures > FILES_MAX_RETRIES) throw new Error('connection lost');
+      await new Promise(res => setTimeout(res, 1000 * 2 ** failures));
+      const s = await fetch(url).then(res => res.json()).catch(() => null);
+      if (s && s.success) offset = s.offset;
+      continue;
+    }
+    const data = await r.json();
+    if (r.ok) {
+      offset = data.offset;
+      failures = 0;
+    } else if (r.status === 409 && data.offset != null) {
+      // Out of step (or a previous attempt still finishing): resume from the server's offset
+      await new Promise(res => setTimeout(res, 1000));
+      offset = data.offset;
+    } else {
+      if (r.status === 404) localStorage.removeItem(key);
+      throw new Error(data.error);
+    }
+  }
+  onProgress(file.size);
+  const r = await fetch(url + '/finalize', { method: 'POST' });
+  const data = await r.json();
+  if (!data.success) throw new Error(data.error);
+  localStorage.removeItem(key);
+  return data;
 }
 
 function filesDelete(path) {
@@ -2293,7 +2545,7 @@ let mapFiltersBuilt   = false;
 function loadMapWindow() {
   // Ensure rally data is loaded (reuse the same dataset)
   if (!rallyLoaded) {
-    fetch('/api/rally-bot/routes')
+    fetch(RALLY_ROUTES_URL)
       .then(r => r.json())
       .then(data => {
         rallyAllRoutes = data.routes || [];
@@ -2335,14 +2587,25 @@ function _mapInit() {
   }
 }
 
-async function _geocodeCity(city) {
-  if (mapGeocodes[city]) return mapGeocodes[city];
+let mapGeocodeRetry = null;
+
+// Resolve all unknown cities in one request; returns the cities worth asking for
+// again (still queued server-side, or whose lookup failed)
+async function _geocodeCities(cities) {
+  const unknown = cities.filter(c => !mapGeocodes[c]);
+  if (!unknown.length) return [];
   try {
-    const r = await fetch('/api/rally-bot/geocode?city=' + encodeURIComponent(city));
+    const r = await fetch('/api/rally-bot/geocode/batch', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ cities: unknown, wait: 3 }),
+    });
     const d = await r.json();
-    if (d.coords) { mapGeocodes[city] = d.coords; return d.coords; }
-  } catch (_) {}
-  return null;
+    Object.assign(mapGeocodes, d.coords || {});
+    return [...(d.pending || []), ...(d.errors || [])];
+  } catch (_) {
+    return [];
+  }
 }
 
 async function applyMapFilters() {
@@ -2403,7 +2666,12 @@ async function applyMapFilters() {
   // Collect all unique city names and geocode any missing ones
   const allCities = new Set();
   pairs.forEach(p => { allCities.add(p.origin); allCities.add(p.destination); });
-  await Promise.all([...allCities].map(c => _geocodeCity(c)));
+  const pendingCities = await _geocodeCities([...allCities]);
+  // The server geocodes at 1 city/s: redraw once more of the queue has resolved
+  clearTimeout(mapGeocodeRetry);
+  if (pendingCities.length) {
+    mapGeocodeRetry = setTimeout(() => { if (currentWindow === 'map') applyMapFilters(); }, 5000);
+  }
 
   // Render
   let visible = 0; let missing = 0;
@@ -0,0 +1,240 @@
+"""Persistent metadata index of the storage tree (SQLite).
+
+One row per file and folder: path (relative, '/'-separated; the root is
+''), parent, name, type, size and mtime.  Folder rows also carry the
+recursive size and file count of everything below them, kept up to date
+as entries are added and removed, so folder totals and name searches never
+walk the tree.
+
+The storage endpoints update the index as they change the tree;
+:meth:`StorageIndex.rescan` walks the tree and fixes whatever differs
+(changes made behind the server's back), re-checking each difference
+against the disk so it can run concurrently with uploads.
+"""
+import os
+import sqlite3
+import stat
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    path        TEXT PRIMARY KEY,
+    parent      TEXT,
+    name        TEXT NOT NULL,
+    type        TEXT NOT NULL,            -- 'file' or 'dir'
+    size        INTEGER NOT NULL DEFAULT 0,
+    mtime       REAL NOT NULL DEFAULT 0,
+    total_size  INTEGER NOT NULL DEFAULT 0,  -- dirs: recursive size of their files
+    files       INTEGER NOT NULL DEFAULT 0   -- dirs: recursive file count
+);
+CREATE INDEX IF NOT EXISTS entries_parent ON entries (parent);
+CREATE INDEX IF NOT EXISTS entries_name ON entries (name COLLATE NOCASE);
+'''
+
+
+def _parent(path):
+    return path.rpartition('/')[0] if path else None
+
+
+def _ancestors(path):
+    """'a/b/c' -> ['a/b', 'a', '']."""
+    out = []
+    while path:
+        path = _parent(path)
+        out.append(path)
+    return out
+
+
+def _subtree_bounds(path):
+    # Every 'path/...' sorts between 'path/' and 'path0' ('0' follows '/')
+    return path + '/', path + '0'
+
+
+class StorageIndex:
+    """Tree metadata with recursive folder totals, searchable by name."""
+
+    def __init__(self, db_file, root, image_exts=()):
+        self.db_file = Path(db_file)
+        self.root = Path(root)
+        self.image_exts = set(image_exts)
+        self.last_scan = None  # {'finished', 'seconds', 'entries', 'fixed'}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.executescript(SCHEMA)
+            self._db.execute("INSERT OR IGNORE INTO entries (path, parent, name, type) "
+                             "VALUES ('', NULL, '', 'dir')")
+
+    # ---- incremental updates ----
+
+    def _row(self, path):
+        return self._db.execute('SELECT * FROM entries WHERE path = ?', (path,)).fetchone()
+
+    def _bump(self, path, size, files):
+        """Add size/files to the totals of every folder above path."""
+        ancestors = _ancestors(path)
+        if ancestors and (size or files):
+            self._db.executemany(
+                'UPDATE entries SET total_size = total_size + ?, files = files + ? WHERE path = ?',
+                [(size, files, a) for a in ancestors])
+
+    def _ensure_dirs(self, path):
+        """Insert missing folder rows for path's ancestors (not path itself)."""
+        for ancestor in reversed(_ancestors(path)[:-1]):
+            self._db.execute(
+                "INSERT OR IGNORE INTO entries (path, parent, name, type, mtime) "
+                "VALUES (?, ?, ?, 'dir', ?)",
+                (ancestor, _parent(ancestor), ancestor.rpartition('/')[2], time.time()))
+
+    def _put(self, path, kind, size, mtime):
+        old = self._row(path)
+        if old is not None and old['type'] != kind:
+            self._remove(path)
+            old = None
+        self._ensure_dirs(path)
+        if old is None:
+            self._db.execute(
+                'INSERT INTO entries (path, parent, name, type, size, mtime) VALUES (?, ?, ?, ?, ?, ?)',
+                (path, _parent(path), path.rpartition('/')[2], kind, size, mtime))
+            if kind == 'file':
+                self._bump(path, size, 1)
+        else:
+            self._db.execute('UPDATE entries SET size = ?, mtime = ? WHERE path = ?',
+                             (size, mtime, path))
+            if kind == 'file':
+                self._bump(path, size - old['size'], 0)
+
+    def _remove(self, path):
+        row = self._row(path)
+        if row is None or not path:
+            return
+        if row['type'] == 'dir':
+            low, high = _subtree_bounds(path)
+            self._db.execute('DELETE FROM entries WHERE path >= ? AND path < ?', (low, high))
+            self._bump(path, -row['total_size'], -row['files'])
+        else:
+            self._bump(path, -row['size'], -1)
+        self._db.execute('DELETE FROM entries WHERE path = ?', (path,))
+
+    def _stat_put(self, path):
+        """Index path as it is on disk now (removing it if it is gone)."""
+        try:
+            st = os.stat(self.root / path)
+        except OSError:
+            self._remove(path)
+            return
+        if stat.S_ISDIR(st.st_mode):
+            self._put(path, 'dir', 0, st.st_mtime)
+        else:
+            self._put(path, 'file', st.st_size, st.st_mtime)
+
+    def added(self, path):
+        """Record a file or folder created at path (relative to the root)."""
+        with self._lock, self._db:
+            self._stat_put(path)
+
+    def removed(self, path):
+        """Record that path (and, for a folder, everything below it) is gone."""
+        with self._lock, self._db:
+            self._remove(path)
+
+    # ---- reconciliation ----
+
+    def _walk(self):
+        """{path: (type, size, mtime)} for everything below the root."""
+        found = {}
+        stack = ['']
+        while stack:
+            folder = stack.pop()
+            try:
+                it = os.scandir(self.root / folder)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    path = f'{folder}/{entry.name}' if folder else entry.name
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    if stat.S_ISDIR(st.st_mode):
+                        found[path] = ('dir', 0, st.st_mtime)
+                        if not entry.is_symlink():
+                            stack.append(path)
+                    else:
+                        found[path] = ('file', st.st_size, st.st_mtime)
+        return found
+
+    def rescan(self):
+        """Bring the index in line with the disk; returns the number of entries fixed."""
+        started = time.monotonic()
+        found = self._walk()
+        with self._lock:
+            indexed = {r['path']: (r['type'], r['size'], r['mtime']) for r in
+                       self._db.execute("SELECT path, type, size, mtime FROM entries WHERE path != ''")}
+        stale = [p for p in found.keys() | indexed.keys() if found.get(p) != indexed.get(p)]
+        # Parents before children, so a re-added folder exists before its contents
+        stale.sort(key=lambda p: p.count('/'))
+        with self._lock, self._db:
+            for path in stale:
+                self._stat_put(path)  # the disk may have moved on since the walk
+        self.last_scan = {'finished': time.time(), 'seconds': round(time.monotonic() - started, 2),
+                          'entries': len(found), 'fixed': len(stale)}
+        return len(stale)
+
+    # ---- queries ----
+
+    def _item(self, row):
+        """A row in the shape of a storage listing entry."""
+        item = {
+            'name': row['name'],
+            'type': row['type'],
+            'size': row['size'] if row['type'] == 'file' else None,
+            'modified': datetime.fromtimestamp(row['mtime']).strftime('%Y-%m-%d %H:%M'),
+            'is_image': os.path.splitext(row['name'])[1].lower() in self.image_exts,
+            'path': row['path'],
+        }
+        if row['type'] == 'dir':
+            item['total_size'] = row['total_size']
+            item['files'] = row['files']
+        return item
+
+    def folder_totals(self, paths):
+        """{path: {'total_size', 'files'}} for the given folder paths that are indexed."""
+        paths = list(paths)
+        totals = {}
+        with self._lock:
+            for i in range(0, len(paths), 500):  # stay under SQLite's variable limit
+                chunk = paths[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT path, total_size, files FROM entries WHERE type = 'dir' "
+                    f"AND path IN ({','.join('?' * len(chunk))})", chunk)
+                for row in rows:
+                    totals[row['path']] = {'total_size': row['total_size'], 'files': row['files']}
+        return totals
+
+    def search(self, query, limit=100, under=''):
+        """Entries whose name contains query (case-insensitive), folders first."""
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        sql = "SELECT * FROM entries WHERE path != '' AND name LIKE ? ESCAPE '\\'"
+        args = [pattern]
+        if under:
+            low, high = _subtree_bounds(under)
+            sql += ' AND path >= ? AND path < ?'
+            args += [low, high]
+        sql += " ORDER BY type = 'file', name COLLATE NOCASE, path LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return [self._item(row) for row in self._db.execute(sql, args)]
+
+    def stats(self):
+        with self._lock:
+            root = self._row('')
+            dirs = self._db.execute("SELECT COUNT(*) FROM entries WHERE type = 'dir'").fetchone()[0]
+        return {'files': root['files'], 'folders': dirs - 1, 'total_size': root['total_size'],
+                'last_scan': self.last_scan}
@@ -0,0 +1,163 @@
+"""Paginated, sorted directory listings for the file storage window.
+
+Each directory is read with one ``os.scandir`` pass (one stat per entry)
+into a snapshot that is cached, keyed on the directory's mtime: adding,
+removing or renaming an entry changes it, so a cached snapshot is reused
+until the folder's contents change.  Sorted views of a snapshot are built
+on first use and cached with it, so paging through a 20k-file folder only
+slices lists.
+
+Pages are addressed by an opaque cursor holding the sort key of the last
+entry returned, so paging stays consistent if the folder changes between
+requests (entries are neither repeated nor skipped, apart from the ones
+that were added or removed).
+"""
+import base64
+import bisect
+import json
+import os
+import stat
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+SORT_FIELDS = ('name', 'size', 'mtime')
+
+
+class _Desc:
+    """Inverts the ordering of a value, for descending sort keys."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class _Snapshot:
+    def __init__(self, mtime_ns, entries):
+        self.mtime_ns = mtime_ns
+        self.entries = entries  # [(raw sort fields, item dict)], in scandir order
+        self.views = {}         # (sort, descending) -> (view keys, raw keys, items)
+
+
+def _raw_key(is_file, name, size, mtime_ns, sort):
+    """Ascending sort key: folders first, then the field, then the name."""
+    value = {'name': None, 'size': size, 'mtime': mtime_ns}[sort]
+    rest = (name.lower(), name) if value is None else (value, name.lower(), name)
+    return (int(is_file),) + rest
+
+
+def _view_key(raw, descending):
+    return (raw[0], _Desc(raw[1:])) if descending else raw
+
+
+class DirectoryLister:
+    """LRU of directory snapshots, served a page at a time."""
+
+    def __init__(self, max_dirs=64, image_exts=()):
+        self.max_dirs = max_dirs
+        self.image_exts = set(image_exts)
+        self._snapshots = OrderedDict()  # directory path -> _Snapshot
+        self._lock = threading.Lock()
+
+    def _scan(self, folder, rel):
+        prefix = f'{rel}/' if rel else ''
+        entries = []
+        with os.scandir(folder) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    st = entry.stat(follow_symlinks=False)  # dangling symlink
+                is_file = not stat.S_ISDIR(st.st_mode)
+                name = entry.name
+                item = {
+                    'name': name,
+                    'type': 'file' if is_file else 'dir',
+                    'size': st.st_size if is_file else None,
+                    'modified': datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d %H:%M'),
+                    'is_image': os.path.splitext(name)[1].lower() in self.image_exts,
+                    'path': prefix + name,
+                }
+                entries.append(((is_file, name, st.st_size if is_file else 0, st.st_mtime_ns), item))
+        return entries
+
+    def snapshot(self, folder, rel=''):
+        """Cached snapshot of `folder` (shown as `rel`), rescanned if its mtime changed."""
+        key = os.fspath(folder)
+        mtime_ns = os.stat(key).st_mtime_ns
+        with self._lock:
+            snap = self._snapshots.get(key)
+            if snap is not None and snap.mtime_ns == mtime_ns:
+                self._snapshots.move_to_end(key)
+                return snap
+        snap = _Snapshot(mtime_ns, self._scan(key, rel))
+        with self._lock:
+            self._snapshots[key] = snap
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_dirs:
+                self._snapshots.popitem(last=False)
+        return snap
+
+    def invalidate(self, folder=None):
+        """Drop the cached snapshot of `folder` (or all of them)."""
+        with self._lock:
+            if folder is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(os.fspath(folder), None)
+
+    @staticmethod
+    def _view(snap, sort, descending):
+        view = snap.views.get((sort, descending))
+        if view is None:
+            raw = [(_raw_key(*fields, sort), item) for fields, item in snap.entries]
+            raw.sort(key=lambda pair: _view_key(pair[0], descending))
+            view = snap.views[(sort, descending)] = (
+                [_view_key(k, descending) for k, _ in raw], [k for k, _ in raw], [i for _, i in raw])
+        return view
+
+    def page(self, folder, rel='', sort='name', descending=False, cursor=None, limit=200):
+        """One page of `folder`: {items, total, next_cursor}.
+
+        Raises ValueError for an unknown sort field or a malformed cursor.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f'sort must be one of {", ".join(SORT_FIELDS)}')
+        snap = self.snapshot(folder, rel)
+        keys, raw_keys, items = self._view(snap, sort, descending)
+        start = 0
+        if cursor:
+            last = _decode_cursor(cursor, sort, descending)
+            start = bisect.bisect_right(keys, _view_key(last, descending))
+        end = start + limit
+        next_cursor = _encode_cursor(raw_keys[end - 1], sort, descending) if end < len(items) else None
+        return {'items': items[start:end], 'total': len(items), 'next_cursor': next_cursor}
+
+
+def _encode_cursor(raw, sort, descending):
+    payload = json.dumps([sort, descending, list(raw)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor, sort, descending):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        c_sort, c_desc, raw = json.loads(base64.urlsafe_b64decode(padded))
+        raw = tuple(raw)
+        numeric = raw[1:-2] if sort != 'name' else ()
+        if (len(raw) != (3 if sort == 'name' else 4) or raw[0] not in (0, 1)
+                or not all(isinstance(v, int) for v in numeric)
+                or not all(isinstance(v, str) for v in raw[-2:])):
+            raise ValueError
+    except (ValueError, TypeError, IndexError):
+        raise ValueError('Invalid cursor')
+    if (c_sort, c_desc) != (sort, descending):
+        raise ValueError('Cursor belongs to a different sort order')
+    return raw
@@ -0,0 +1,22 @@
+from battery_store import RECORD, BatteryStore
+
+
+def test_torn_trailing_record_is_cut_before_appending(tmp_path):
+    path = tmp_path / 'battery_history.log'
+    store = BatteryStore(path)
+    store.load()
+    for i in range(3):
+        store.append(50 + i, 'Discharging', ts=1_700_000_000 + i * 60)
+    with open(path, 'ab') as f:
+        f.write(b'\x01\x02\x03')  # crash part-way through a record
+
+    store = BatteryStore(path)
+    assert store.load() == 3
+    assert path.stat().st_size == 3 * RECORD.size
+    store.append(60, 'Charging', ts=1_700_000_300)
+    store.append(61, 'Full', ts=1_700_000_360)
+
+    reloaded = BatteryStore(path)
+    assert reloaded.load() == 5
+    assert [(e['capacity'], e['status']) for e in reloaded.tail(2)] == [(60, 'Charging'), (61, 'Full')]
+    assert list(reloaded.times[-2:]) == [1_700_000_300, 1_700_000_360]
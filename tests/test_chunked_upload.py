@@ -0,0 +1,35 @@
+import io
+import os
+import time
+
+import pytest
+
+from chunked_upload import UploadError, UploadManager
+
+
+def _age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_expire_removes_stale_uploads_and_orphaned_parts(tmp_path):
+    uploads = UploadManager(tmp_path, max_size=1 << 20, expire_seconds=3600)
+    stale = uploads.create('', 'old.bin', 4)['id']
+    fresh = uploads.create('', 'new.bin', 4)['id']
+    uploads.write(fresh, 0, io.BytesIO(b'data'), 4)
+    _age(tmp_path / f'{stale}.json', 7200)
+
+    # A part file whose record is gone: old ones go, recent ones are left alone
+    old_orphan = tmp_path / ('a' * 32 + '.part')
+    new_orphan = tmp_path / ('b' * 32 + '.part')
+    old_orphan.write_bytes(b'x')
+    new_orphan.write_bytes(b'x')
+    _age(old_orphan, 7200)
+
+    uploads.expire()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        [f'{fresh}.json', f'{fresh}.part', new_orphan.name])
+    with pytest.raises(UploadError):
+        uploads.get_status(stale)
+    assert uploads.get_status(fresh)['offset'] == 4
@@ -0,0 +1,30 @@
+from collections import namedtuple
+
+import collector
+from collector import SystemCollector, format_uptime
+
+CpuTimes = namedtuple('CpuTimes', 'user nice system idle iowait irq softirq steal guest guest_nice')
+
+
+def _times(busy, idle):
+    return CpuTimes(busy, 0, 0, idle, 0, 0, 0, 0, 0, 0)
+
+
+def test_format_uptime():
+    assert format_uptime(30) == 'up 0 minutes'
+    assert format_uptime(86400 + 2 * 3600 + 60) == 'up 1 day, 2 hours, 1 minute'
+
+
+def test_cpu_usage_uses_its_own_baseline(tmp_path, monkeypatch):
+    readings = iter([_times(100, 900), _times(130, 970), _times(190, 1010)])
+    monkeypatch.setattr(collector.psutil, 'cpu_times', lambda: next(readings))
+    clock = [1000.0]
+    monkeypatch.setattr(collector.time, 'monotonic', lambda: clock[0])
+    c = SystemCollector(tmp_path, tmp_path / 'os-release')
+
+    clock[0] += 5
+    assert c.cpu_usage(min_interval=2.5) == 30.0   # 30 busy of 100
+    clock[0] += 1
+    assert c.cpu_usage(min_interval=2.5) == 30.0   # too soon: previous reading
+    clock[0] += 4
+    assert c.cpu_usage(min_interval=2.5) == 60.0   # 60 busy of 100
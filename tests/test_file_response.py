@@ -0,0 +1,104 @@
+import os
+from email.utils import format_datetime
+from datetime import datetime, timezone
+
+import pytest
+from flask import Flask
+
+from file_response import FileRange, send_file
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+MTIME = 1_700_000_000
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(DATA)
+    os.utime(path, (MTIME, MTIME))
+    app = Flask(__name__)
+    app.add_url_rule('/file', 'file', lambda: send_file(path))
+    return app.test_client()
+
+
+def _http_date(ts):
+    return format_datetime(datetime.fromtimestamp(ts, timezone.utc), usegmt=True)
+
+
+def test_whole_file(client):
+    r = client.get('/file')
+    assert r.status_code == 200 and r.data == DATA
+    assert r.headers['Content-Length'] == str(len(DATA))
+    assert r.headers['Content-Type'] == 'video/mp4'
+    assert r.headers['Accept-Ranges'] == 'bytes'
+    assert r.headers['ETag'] == f'"{len(DATA):x}-{MTIME * 10**9:x}"'
+    assert r.headers['Last-Modified'] == _http_date(MTIME)
+
+
+def test_conditional_get(client):
+    etag = client.get('/file').headers['ETag']
+    assert client.get('/file', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/file', headers={'If-None-Match': '"other"'}).status_code == 200
+    assert client.get('/file', headers={'If-Modified-Since': _http_date(MTIME)}).status_code == 304
+    assert client.get('/file', headers={'If-Modified-Since': _http_date(MTIME - 60)}).status_code == 200
+    # If-None-Match wins over If-Modified-Since
+    r = client.get('/file', headers={'If-None-Match': '"other"', 'If-Modified-Since': _http_date(MTIME)})
+    assert r.status_code == 200
+
+
+@pytest.mark.parametrize('header, start, stop', [
+    ('bytes=0-99', 0, 100),
+    ('bytes=100-', 100, len(DATA)),
+    ('bytes=-500', len(DATA) - 500, len(DATA)),
+    ('bytes=10000-20000', 10000, len(DATA)),  # clipped to the file
+    ('bytes=10239-10239', 10239, 10240),
+])
+def test_single_range(client, header, start, stop):
+    r = client.get('/file', headers={'Range': header})
+    assert r.status_code == 206
+    assert r.data == DATA[start:stop]
+    assert r.headers['Content-Length'] == str(stop - start)
+    assert r.headers['Content-Range'] == f'bytes {start}-{stop - 1}/{len(DATA)}'
+
+
+@pytest.mark.parametrize('header', ['bytes=10240-', 'bytes=20000-30000'])
+def test_unsatisfiable_range(client, header):
+    r = client.get('/file', headers={'Range': header})
+    assert r.status_code == 416
+    assert r.headers['Content-Range'] == f'bytes */{len(DATA)}'
+    assert r.data == b''
+
+
+def test_multiple_ranges_get_the_whole_file(client):
+    r = client.get('/file', headers={'Range': 'bytes=0-9,20-29'})
+    assert r.status_code == 200 and r.data == DATA
+
+
+def test_if_range(client):
+    etag = client.get('/file').headers['ETag']
+    r = client.get('/file', headers={'Range': 'bytes=0-9', 'If-Range': etag})
+    assert r.status_code == 206 and r.data == DATA[:10]
+    r = client.get('/file', headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+    assert r.status_code == 200 and r.data == DATA
+    r = client.get('/file', headers={'Range': 'bytes=0-9', 'If-Range': _http_date(MTIME)})
+    assert r.status_code == 206
+    r = client.get('/file', headers={'Range': 'bytes=0-9', 'If-Range': _http_date(MTIME - 60)})
+    assert r.status_code == 200
+
+
+def test_changed_file_invalidates_the_etag(client, tmp_path):
+    etag = client.get('/file').headers['ETag']
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(DATA[:100])
+    assert client.get('/file', headers={'If-None-Match': etag}).status_code == 200
+    r = client.get('/file', headers={'Range': 'bytes=0-9', 'If-Range': etag})
+    assert r.status_code == 200 and r.data == DATA[:100]
+
+
+def test_file_range_body(tmp_path):
+    path = tmp_path / 'f'
+    path.write_bytes(DATA)
+    body = FileRange(open(path, 'rb'), 300, 700_000)  # past the end: stops at EOF
+    assert b''.join(body) == DATA[300:]
+    body.close()
+    assert body.file.closed
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from file_watcher import COMPLETE_EVENTS, FileWatcher
+
+
+def _watch(tmp_path, name, **kwargs):
+    path = tmp_path / name
+    path.write_text('')
+    calls = []
+    changed = threading.Event()
+
+    def callback(p):
+        calls.append((time.monotonic(), p.read_text()))
+        changed.set()
+
+    watcher = FileWatcher(poll_interval=60)
+    watcher.watch(path, callback, **kwargs)
+    watcher.start()
+    if watcher.backend != 'inotify':
+        pytest.skip('inotify unavailable')
+    return path, calls, changed
+
+
+def _write_slowly(path, chunks, pause, close_each=False):
+    if close_each:
+        for chunk in chunks:
+            with open(path, 'a') as f:
+                f.write(chunk)
+            time.sleep(pause)
+        return
+    with open(path, 'w') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            f.flush()
+            time.sleep(pause)
+
+
+def test_burst_fires_once_after_it_goes_quiet(tmp_path):
+    path, calls, changed = _watch(tmp_path, 'bot.log', debounce=0.3)
+    _write_slowly(path, ['a'] * 8, 0.1, close_each=True)  # longer than the debounce
+    done = time.monotonic()
+    assert changed.wait(3)
+    time.sleep(0.5)
+    assert len(calls) == 1
+    fired, text = calls[0]
+    assert text == 'a' * 8 and fired >= done
+
+
+def test_max_delay_bounds_a_continuous_burst(tmp_path):
+    path, calls, changed = _watch(tmp_path, 'bot.log', debounce=0.3, max_delay=0.4)
+    started = time.monotonic()
+    _write_slowly(path, ['a'] * 12, 0.1, close_each=True)
+    assert changed.wait(3)
+    assert calls[0][0] - started < 1.0  # fired mid-burst
+    time.sleep(0.6)
+    assert calls[-1][1] == 'a' * 12
+
+
+def test_complete_events_skip_a_file_still_being_written(tmp_path):
+    path, calls, changed = _watch(tmp_path, 'routes.json', debounce=0.1, events=COMPLETE_EVENTS)
+    _write_slowly(path, ['[1,', '2,', '3]'], 0.4)  # pauses longer than the debounce
+    assert changed.wait(3)
+    time.sleep(0.3)
+    assert [text for _, text in calls] == ['[1,2,3]']
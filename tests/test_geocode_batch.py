@@ -0,0 +1,28 @@
+import requests
+
+import server
+from geocoder import Geocoder
+
+KNOWN = {'Zürich': [47.37, 8.54]}
+
+
+def _fetch(city):
+    if city == 'Flaky' and city not in KNOWN:
+        raise requests.HTTPError('429 Too Many Requests')
+    return KNOWN.get(city)
+
+
+def test_failed_lookups_are_errors_not_misses(tmp_path, monkeypatch):
+    geocoder = Geocoder(tmp_path / 'geocode_cache.json', min_interval=0, save_delay=60)
+    monkeypatch.setattr(geocoder, '_fetch', _fetch)
+    monkeypatch.setattr(server, 'geocoder', geocoder)
+    client = server.app.test_client()
+
+    r = client.post('/api/rally-bot/geocode/batch', json={'cities': ['Zürich', 'Nowhere', 'Flaky'], 'wait': 5})
+    assert r.get_json() == {'coords': KNOWN, 'pending': [], 'missing': ['Nowhere'], 'errors': ['Flaky']}
+    assert geocoder.not_found == {'Nowhere'}
+
+    # The failure isn't cached: asking again looks it up again
+    monkeypatch.setitem(KNOWN, 'Flaky', [1.0, 2.0])
+    r = client.post('/api/rally-bot/geocode/batch', json={'cities': ['Flaky'], 'wait': 5})
+    assert r.get_json()['coords'] == {'Flaky': [1.0, 2.0]}
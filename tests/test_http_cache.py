@@ -0,0 +1,56 @@
+from flask import Flask
+
+from http_cache import ResponseCache
+
+app = Flask(__name__)
+cache = ResponseCache()
+state = {'version': 1}
+
+
+@app.route('/big')
+def big():
+    return cache.json('big', state['version'], lambda: {'items': list(range(1000))})
+
+
+@app.route('/small')
+def small():
+    return cache.json('small', state['version'], lambda: {'ok': True})
+
+
+def test_gzip_and_identity_bodies_have_distinct_etags():
+    client = app.test_client()
+    plain = client.get('/big', headers={'Accept-Encoding': 'identity'})
+    packed = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['ETag'] != packed.headers['ETag']
+    assert packed.headers['ETag'] == plain.headers['ETag'][:-1] + '-gz"'
+    assert not plain.headers['ETag'].startswith('W/')
+
+
+def test_either_tag_revalidates():
+    client = app.test_client()
+    plain = client.get('/big', headers={'Accept-Encoding': 'identity'}).headers['ETag']
+    packed = client.get('/big', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+
+    r = client.get('/big', headers={'Accept-Encoding': 'gzip', 'If-None-Match': packed})
+    assert r.status_code == 304 and r.headers['ETag'] == packed
+    r = client.get('/big', headers={'Accept-Encoding': 'identity', 'If-None-Match': plain})
+    assert r.status_code == 304 and r.headers['ETag'] == plain
+    # A gzip tag from a client that no longer accepts gzip doesn't match
+    r = client.get('/big', headers={'Accept-Encoding': 'identity', 'If-None-Match': packed})
+    assert r.status_code == 200 and r.headers['ETag'] == plain
+
+
+def test_small_bodies_are_never_gzipped_and_new_versions_miss():
+    client = app.test_client()
+    r = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in r.headers
+    etag = r.headers['ETag']
+    assert client.get('/small', headers={'If-None-Match': etag}).status_code == 304
+    state['version'] += 1
+    try:
+        r = client.get('/small', headers={'If-None-Match': etag})
+        assert r.status_code == 200 and r.headers['ETag'] != etag
+    finally:
+        state['version'] -= 1
@@ -0,0 +1,154 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from log_search import LogIndex
+
+BASE = datetime(2026, 10, 1, 12, 0, 0)
+LEVELS = ('INFO', 'WARNING', 'ERROR')
+CITIES = ('Zürich', 'ÖREBRO', 'Lyon', 'München')
+
+
+def _lines(count):
+    lines = []
+    for i in range(count):
+        ts = (BASE + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S')
+        level = LEVELS[i % 3]
+        lines.append(f'{ts},000 - rally_bot - {level} - route {i} from {CITIES[i % 4]}')
+        if level == 'ERROR':
+            lines.append(f'Traceback for route {i}')  # continuation line, no timestamp
+    return lines
+
+
+def _epoch(minutes):
+    return (BASE + timedelta(minutes=minutes)).timestamp()
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / 'bot.log'
+    lines = _lines(300)
+    path.write_text('\n'.join(lines) + '\n')
+    # Tiny checkpoints and budget so paging crosses many of both
+    return LogIndex(path, checkpoint_bytes=512, scan_budget=2048), path, lines
+
+
+def _page_backward(index, limit, **kwargs):
+    pages, cursor = [], None
+    while True:
+        page = index.search(cursor=cursor, limit=limit, **kwargs)
+        pages.append(page)
+        assert len(page['lines']) <= limit
+        if page['older'] is None:
+            break
+        cursor = page['older']
+    return pages
+
+
+def _texts(pages):
+    return [line['text'] for page in pages for line in page['lines']]
+
+
+def test_backward_then_forward_covers_every_line(log):
+    index, _, lines = log
+    pages = _page_backward(index, limit=7)
+    assert _texts(reversed(pages)) == lines
+    assert pages[0]['newer'] is None
+
+    # From the oldest page, page forward to the newest again
+    forward, cursor = [pages[-1]], pages[-1]['newer']
+    while cursor is not None:
+        page = index.search(cursor=cursor, limit=7)
+        forward.append(page)
+        cursor = page['newer']
+    assert _texts(forward) == lines
+
+
+def test_scan_budget_limits_bytes_per_page(log):
+    index, path, lines = log
+    pages = _page_backward(index, limit=1000, query='no such text')
+    assert len(pages) > 1
+    longest = max(len(line.encode()) + 1 for line in lines)
+    # A page stops at the first line that crosses the budget
+    assert all(page['scanned_bytes'] <= index.scan_budget + longest for page in pages)
+    assert sum(page['scanned_bytes'] for page in pages) == path.stat().st_size
+
+
+@pytest.mark.parametrize('start, end', [(0, 299), (10, 20), (57, 57), (100.5, 250), (None, 42), (200, None), (400, 500)])
+def test_time_window_matches_a_full_scan(log, start, end):
+    index, _, lines = log
+    kwargs = {'start': None if start is None else _epoch(start), 'end': None if end is None else _epoch(end)}
+    got = [line for line in _texts(reversed(_page_backward(index, limit=5, **kwargs))) if not line.startswith('Traceback')]
+    want = [line for i, line in enumerate(l for l in lines if not l.startswith('Traceback'))
+            if (start is None or i >= start) and (end is None or i <= end)]
+    assert got == want
+
+
+def test_region_bounds_bracket_the_window(log):
+    index, path, _ = log
+    index.search(limit=1)  # builds the checkpoints
+    assert len(index.offsets) > 10
+    assert list(index.times) == sorted(index.times)
+    data = path.read_bytes()
+    assert all(o == 0 or data[o - 1:o] == b'\n' for o in index.offsets)
+    for minutes in (0, 33, 150, 299):
+        lo, hi = index._region(_epoch(minutes), _epoch(minutes))
+        line_start = data.index((BASE + timedelta(minutes=minutes)).strftime('%Y-%m-%d %H:%M:%S').encode())
+        assert lo <= line_start < hi
+        assert hi - lo < 3 * index.checkpoint_bytes
+
+
+def test_filters_by_level_and_text(log):
+    index, _, lines = log
+    pages = _page_backward(index, limit=500, levels=['ERROR'], query='route 2')
+    assert _texts(reversed(pages)) == [l for l in lines if ' - ERROR - ' in l and 'route 2' in l]
+    assert all(line['level'] == 'ERROR' and line['timestamp'] for page in pages for line in page['lines'])
+
+
+@pytest.mark.parametrize('query, city', [('ZÜRICH', 'Zürich'), ('örebro', 'ÖREBRO'), ('MÜNCHEN', 'München'), ('lyon', 'Lyon')])
+def test_non_ascii_queries_are_case_insensitive(log, query, city):
+    index, _, lines = log
+    pages = _page_backward(index, limit=500, query=query)
+    assert _texts(reversed(pages)) == [l for l in lines if l.endswith(city)]
+
+
+def test_partial_last_line_waits_until_complete(tmp_path):
+    path = tmp_path / 'bot.log'
+    lines = _lines(50)
+    tail = _lines(52)[-1]
+    path.write_text('\n'.join(lines) + '\n' + tail[:30])
+    index = LogIndex(path, checkpoint_bytes=256)
+    assert index.search(limit=1)['lines'][0]['text'] == lines[-1]
+    assert index._end == path.stat().st_size - 30
+    checkpoints = list(index.offsets)
+
+    with open(path, 'a') as f:
+        f.write(tail[30:] + '\n')
+    assert index.search(limit=1)['lines'][0]['text'] == tail
+    assert list(index.offsets[:len(checkpoints)]) == checkpoints  # extended, not rebuilt
+    assert index._end == path.stat().st_size
+
+
+def test_cursors_go_stale_after_rotation(log):
+    index, path, lines = log
+    older = index.search(limit=5)['older']
+    os.replace(path, path.with_suffix('.log.1'))
+    path.write_text('\n'.join(lines[:10]) + '\n')
+    with pytest.raises(LookupError):
+        index.search(cursor=older)
+    assert _texts([index.search(limit=100)]) == lines[:10]
+
+
+@pytest.mark.parametrize('cursor', ['garbage', 'x-c10', 'x-b-5', '-b'])
+def test_invalid_cursor(log, cursor):
+    index, _, _ = log
+    with pytest.raises(ValueError):
+        index.search(cursor=cursor)
+
+
+def test_missing_and_empty_log(tmp_path):
+    index = LogIndex(tmp_path / 'bot.log')
+    assert index.search()['lines'] == []
+    (tmp_path / 'bot.log').write_bytes(b'')
+    assert index.search()['lines'] == []
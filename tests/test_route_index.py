@@ -0,0 +1,179 @@
+import json
+import os
+import random
+from datetime import date
+
+import pytest
+
+import server
+from route_index import RouteIndex, normalize, parse_day, parse_duration, project, sort_routes
+
+
+def _day(d):
+    return date(2026, 6, 1).toordinal() + d - 1
+
+
+def _range(start, end, duration=''):
+    return {'startDate': f'{start:02d}/06/2026', 'endDate': f'{end:02d}/06/2026', 'duration': duration}
+
+
+ROUTES = [
+    {'origin': 'Zürich', 'returns': [
+        {'destination': 'Paris', 'model_name': 'Active Long', 'available_dates': [_range(10, 20, '5+3 nights')]},
+        {'destination': 'Köln', 'model_name': 'Comfort', 'available_dates': [_range(1, 30)]},
+    ]},
+    {'origin': 'Madrid', 'returns': [
+        {'destination': 'Lisboa', 'model_name': 'Comfort Standard', 'available_dates': [_range(3, 4, '1 night'), _range(22, 25)]},
+    ]},
+    {'origin': 'São Paulo', 'returns': [
+        {'destination': 'Zaragoza', 'model_name': 'Beach Hostel', 'available_dates': [_range(12, 12, '9')]},
+    ]},
+]
+
+
+def _dests(routes):
+    return [ret['destination'] for route in routes for ret in route['returns']]
+
+
+@pytest.fixture
+def index():
+    return RouteIndex(ROUTES)
+
+
+def test_parsing():
+    assert parse_day('05/06/2026') == parse_day('2026-06-05') == _day(5)
+    with pytest.raises(ValueError):
+        parse_day('June 5th')
+    assert parse_duration({'duration': '5+3 nights'}) == 8
+    assert parse_duration({'duration': '3 nights max'}) == 3
+    assert parse_duration(_range(3, 7)) == 4
+    assert normalize(' São Paulo ') == 'sao paulo' and normalize('ZÜRICH') == 'zurich'
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (20, 21, ['Paris', 'Köln']),            # touches the end day of 10-20
+    (21, 21, ['Köln']),                     # just after it
+    (5, 10, ['Paris', 'Köln']),             # touches the start day
+    (5, 9, ['Köln']),                       # between 3-4 and 10-20
+    (4, 4, ['Köln', 'Lisboa']),
+    (12, 12, ['Paris', 'Köln', 'Zaragoza']),
+    (26, None, ['Köln']),
+    (None, 2, ['Köln']),
+    (31, None, []),
+])
+def test_overlap_boundaries(index, start, end, expected):
+    routes = index.query(start=None if start is None else _day(start), end=None if end is None else _day(end))
+    assert _dests(routes) == expected
+
+
+def test_overlap_matches_brute_force():
+    rng = random.Random(7)
+    routes = [{'origin': f'o{i}', 'returns': [
+        {'destination': f'd{i}.{j}', 'model_name': 'm', 'available_dates': [
+            _range(a, a + rng.randint(0, 12)) for a in rng.sample(range(1, 18), 3)]}
+        for j in range(3)]} for i in range(20)]
+    index = RouteIndex(routes)
+    for _ in range(200):
+        start = rng.randint(-5, 35)
+        end = start + rng.randint(0, 10)
+        want = {}
+        for route in routes:
+            for ret in route['returns']:
+                dates = [dr for dr in ret['available_dates']
+                         if parse_day(dr['startDate']) <= _day(end) and parse_day(dr['endDate']) >= _day(start)]
+                if dates:
+                    want[ret['destination']] = dates
+        got = index.query(start=_day(start), end=_day(end))
+        assert {ret['destination']: ret['available_dates'] for r in got for ret in r['returns']} == want
+
+
+def test_dates_are_narrowed_to_the_window(index):
+    routes = index.query(destinations=['lisboa'], start=_day(20))
+    assert routes[0]['returns'][0]['available_dates'] == [_range(22, 25)]
+    assert ROUTES[1]['returns'][0]['available_dates'][0] == _range(3, 4, '1 night')  # source untouched
+
+
+@pytest.mark.parametrize('kwargs, expected', [
+    ({'origins': ['zurich']}, ['Paris', 'Köln']),
+    ({'origins': ['ZÜRICH']}, ['Paris', 'Köln']),
+    ({'origins': ['sao']}, ['Zaragoza']),                 # substring, accents ignored
+    ({'destinations': ['koln', 'lisboa']}, ['Köln', 'Lisboa']),
+    ({'models': ['comfort']}, ['Köln', 'Lisboa']),
+    ({'origins': ['madrid'], 'models': ['active']}, []),
+])
+def test_accent_insensitive_filters(index, kwargs, expected):
+    assert _dests(index.query(**kwargs)) == expected
+
+
+@pytest.mark.parametrize('key, descending, origins', [
+    ('earliest', False, ['Zürich', 'Madrid', 'São Paulo']),
+    ('earliest', True, ['São Paulo', 'Madrid', 'Zürich']),
+    ('duration', False, ['Madrid', 'São Paulo', 'Zürich']),
+    ('duration', True, ['Zürich', 'São Paulo', 'Madrid']),
+    ('origin', False, ['Madrid', 'São Paulo', 'Zürich']),
+])
+def test_sort_routes(index, key, descending, origins):
+    routes = sort_routes(index.query(), key, descending)
+    assert [r['origin'] for r in routes] == origins
+
+
+def test_sort_orders_returns_within_a_route(index):
+    routes = sort_routes(index.query(origins=['zurich']), 'earliest')
+    assert _dests(routes) == ['Köln', 'Paris']
+    with pytest.raises(ValueError):
+        sort_routes(index.query(), 'price')
+
+
+def test_project(index):
+    route = index.query(origins=['madrid'])[0]
+    assert project(route, {'origin', 'count'}) == {'origin': 'Madrid', 'count': 1}
+    assert project(route, {'origin', 'destination'}) == {'origin': 'Madrid', 'returns': [{'destination': 'Lisboa'}]}
+
+
+# ---- /api/rally-bot/routes ----
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    routes_file = tmp_path / 'station_routes.json'
+    routes_file.write_text(json.dumps(ROUTES))
+    monkeypatch.setattr(server, 'ROUTES_FILE', routes_file)
+    monkeypatch.setattr(server, '_routes_cache', {'data': None, 'mtime': 0.0, 'filter_options': None, 'index': None})
+    monkeypatch.setattr(server.geocoder, 'prefetch', lambda cities: 0)
+    return server.app.test_client(), routes_file
+
+
+def test_endpoint_pages_with_cursors(client):
+    client, _ = client
+    seen, cursor = [], ''
+    while True:
+        d = client.get(f'/api/rally-bot/routes?sort=origin&limit=2&cursor={cursor}&fields=origin,count').get_json()
+        assert d['success'] and d['total_routes'] == 3 and d['total_returns'] == 4
+        seen += d['routes']
+        cursor = d['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [{'origin': 'Madrid', 'count': 1}, {'origin': 'São Paulo', 'count': 1},
+                    {'origin': 'Zürich', 'count': 2}]
+
+
+def test_endpoint_filters_and_validates(client):
+    client, _ = client
+    d = client.get('/api/rally-bot/routes?origin=ZURICH&start_date=2026-06-21&fields=destination').get_json()
+    assert d['routes'] == [{'returns': [{'destination': 'Köln'}]}]
+    assert client.get('/api/rally-bot/routes?start_date=tomorrow').status_code == 400
+    assert client.get('/api/rally-bot/routes?sort=price').status_code == 400
+    assert client.get('/api/rally-bot/routes?cursor=garbage').status_code == 400
+
+
+def test_stale_cursor_is_a_conflict(client):
+    client, routes_file = client
+    cursor = client.get('/api/rally-bot/routes?limit=1').get_json()['next_cursor']
+    assert client.get(f'/api/rally-bot/routes?limit=1&cursor={cursor}').status_code == 200
+
+    routes_file.write_text(json.dumps(ROUTES[:2]))
+    st = routes_file.stat()
+    os.utime(routes_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    server._load_routes_if_changed()
+    r = client.get(f'/api/rally-bot/routes?limit=1&cursor={cursor}')
+    assert r.status_code == 409
+    assert 'restart' in r.get_json()['error']
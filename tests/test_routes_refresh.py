@@ -0,0 +1,90 @@
+import socket
+import sys
+import threading
+import time
+import types
+
+import pytest
+import requests
+
+import server
+
+
+@pytest.fixture
+def silent_server():
+    """A server that accepts connections and never answers."""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(8)
+    conns = []
+    threading.Thread(target=lambda: [conns.append(sock.accept()) for _ in range(8)],
+                     daemon=True).start()
+    yield f'http://127.0.0.1:{sock.getsockname()[1]}/'
+    sock.close()
+
+
+class _Fetcher:
+    url = None
+
+    def __init__(self, logger):
+        self.session = requests.Session()
+        self.output_data = []
+
+    def sync_full_update(self):
+        # The request is made from a thread the fetcher starts itself
+        errors = []
+        thread = threading.Thread(target=self._get, args=(errors,))
+        thread.start()
+        thread.join()
+        raise errors[0]
+
+    def _get(self, errors):
+        try:
+            self.session.get(self.url)
+        except Exception as e:
+            errors.append(e)
+
+
+def test_provider_requests_time_out(silent_server, monkeypatch):
+    monkeypatch.setattr(server, 'ROUTES_REQUEST_TIMEOUT', (1, 0.5))
+    monkeypatch.setattr(_Fetcher, 'url', silent_server)
+    started = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        server._fetch_provider(_Fetcher, None)
+    assert time.monotonic() - started < 5
+    # Only the fetch path is affected
+    assert type(requests.Session().get_adapter(silent_server)) is requests.adapters.HTTPAdapter
+
+
+def test_abandoned_providers_are_published_with_the_stats(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    class Quick(_Fetcher):
+        def sync_full_update(self):
+            return [{'origin': 'A', 'returns': []}]
+
+        def save_output_to_json(self, path):
+            path.write_text('[]')
+
+    class Stuck(_Fetcher):
+        def sync_full_update(self):
+            release.wait(10)
+            return []
+
+    module = types.ModuleType('rally_bot.data_fetcher')
+    module.ImoovaDataFetcher, module.IndieCampersDataFetcher, module.StationDataFetcher = Quick, Quick, Stuck
+    monkeypatch.setitem(sys.modules, 'rally_bot', types.ModuleType('rally_bot'))
+    monkeypatch.setitem(sys.modules, 'rally_bot.data_fetcher', module)
+    monkeypatch.setattr(server, 'ROUTES_FILE', tmp_path / 'station_routes.json')
+    monkeypatch.setattr(server, 'ROUTES_PROVIDER_TIMEOUT', 0.2)
+    monkeypatch.setattr(server, 'ROUTES_ABANDON_GRACE', 0.2)
+    monkeypatch.setattr(server, '_routes_fetch_stats', {})
+    try:
+        server._fetch_routes_from_apis()
+    finally:
+        release.set()
+
+    providers = server._routes_fetch_stats['providers']
+    assert providers['imoova']['ok'] and providers['indiecampers']['ok']
+    assert providers['roadsurfer'] == {'ok': False, 'error': 'timed out after 0.2s', 'abandoned': True}
+    assert not server._routes_updating.is_set()
@@ -0,0 +1,15 @@
+import pytest
+
+import server
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('', None),
+    ('?max_age=abc', None),
+    ('?max_age=0', server.METRICS_INTERVAL),
+    ('?max_age=-3', server.METRICS_INTERVAL),
+    ('?max_age=60', 60.0),
+])
+def test_requested_staleness_is_floored_at_one_interval(query, expected):
+    with server.app.test_request_context('/api/status' + query):
+        assert server._requested_staleness() == expected
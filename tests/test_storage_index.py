@@ -0,0 +1,154 @@
+import io
+import os
+import shutil
+
+import pytest
+
+import server
+from chunked_upload import UploadManager
+from storage_index import StorageIndex
+from storage_listing import DirectoryLister
+
+FIELDS = ('path', 'parent', 'name', 'type', 'size', 'total_size', 'files')
+
+
+def _rows(index):
+    """Index contents, minus mtimes (folders the index creates get the current time)."""
+    with index._lock:
+        return sorted(tuple(row[f] for f in FIELDS) for row in index._db.execute('SELECT * FROM entries'))
+
+
+def _fresh(tmp_path, root):
+    """An index built from scratch by a full scan, for comparison."""
+    db = tmp_path / f'fresh{len(list(tmp_path.glob("fresh*.db")))}.db'
+    index = StorageIndex(db, root)
+    index.rescan()
+    return _rows(index)
+
+
+def _disk_totals(root):
+    totals = {}
+    for dirpath, _, filenames in os.walk(root):
+        size = sum(os.path.getsize(os.path.join(dirpath, f)) for f in filenames)
+        rel = os.path.relpath(dirpath, root).replace(os.sep, '/')
+        for key in _ancestors_and_self('' if rel == '.' else rel):
+            total = totals.setdefault(key, {'total_size': 0, 'files': 0})
+            total['total_size'] += size
+            total['files'] += len(filenames)
+    return totals
+
+
+def _ancestors_and_self(path):
+    out = [path]
+    while path:
+        path = path.rpartition('/')[0]
+        out.append(path)
+    return out
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / 'storage'
+    (root / 'photos' / '2025').mkdir(parents=True)
+    (root / 'docs').mkdir()
+    (root / 'photos' / '2025' / 'IMG_001.jpg').write_bytes(b'x' * 100)
+    (root / 'photos' / '2025' / 'img_002.JPG').write_bytes(b'x' * 50)
+    (root / 'photos' / 'cover.png').write_bytes(b'x' * 7)
+    (root / 'docs' / '100%_done.txt').write_bytes(b'x' * 3)
+    (root / 'docs' / 'notes_v1.md').write_bytes(b'x' * 11)
+    return root
+
+
+@pytest.fixture
+def index(tmp_path, root):
+    index = StorageIndex(tmp_path / 'index.db', root, image_exts={'.jpg', '.png'})
+    index.rescan()
+    return index
+
+
+def test_scan_matches_disk_totals(index, root):
+    folders = [r[0] for r in _rows(index) if r[3] == 'dir']
+    assert index.folder_totals(folders) == _disk_totals(root)
+    assert index.stats()['files'] == 5 and index.stats()['folders'] == 3
+    assert index.rescan() == 0
+
+
+def test_incremental_updates_match_a_rebuild(tmp_path, index, root):
+    (root / 'a' / 'b' / 'c').mkdir(parents=True)
+    index.added('a/b/c')
+    (root / 'a' / 'b' / 'c' / 'f.bin').write_bytes(b'x' * 1000)
+    index.added('a/b/c/f.bin')
+    (root / 'docs' / 'notes_v1.md').write_bytes(b'x' * 5)  # overwritten, smaller
+    index.added('docs/notes_v1.md')
+    (root / 'photos' / 'cover.png').unlink()
+    index.removed('photos/cover.png')
+    assert _rows(index) == _fresh(tmp_path, root)
+
+    shutil.rmtree(root / 'photos')
+    index.removed('photos')
+    (root / 'docs' / 'notes_v1.md').unlink()
+    (root / 'docs' / 'notes_v1.md').mkdir()  # a file replaced by a folder
+    index.added('docs/notes_v1.md')
+    assert _rows(index) == _fresh(tmp_path, root)
+    assert index.folder_totals(['', 'a', 'docs']) == {
+        k: v for k, v in _disk_totals(root).items() if k in ('', 'a', 'docs')}
+
+
+def test_rescan_fixes_changes_made_behind_its_back(tmp_path, index, root):
+    shutil.rmtree(root / 'photos' / '2025')
+    (root / 'docs' / 'new').mkdir()
+    (root / 'docs' / 'new' / 'x.txt').write_bytes(b'12345')
+    assert index.rescan() > 0
+    assert _rows(index) == _fresh(tmp_path, root)
+    assert index.rescan() == 0
+
+
+def test_index_survives_a_reopen(tmp_path, index, root):
+    rows = _rows(index)
+    assert _rows(StorageIndex(tmp_path / 'index.db', root)) == rows
+
+
+def test_search(index):
+    names = lambda items: [i['name'] for i in items]
+    assert names(index.search('img')) == ['IMG_001.jpg', 'img_002.JPG']
+    assert names(index.search('2025')) == ['2025']
+    assert names(index.search('o')) == ['docs', 'photos', '100%_done.txt', 'cover.png', 'notes_v1.md']
+    assert names(index.search('%')) == ['100%_done.txt']  # LIKE wildcards are literal
+    assert names(index.search('_v')) == ['notes_v1.md']
+    assert names(index.search('o', under='photos')) == ['cover.png']
+    assert names(index.search('o', limit=2)) == ['docs', 'photos']
+    item = index.search('cover')[0]
+    assert item['path'] == 'photos/cover.png' and item['is_image'] and item['size'] == 7
+    folder = index.search('2025')[0]
+    assert folder['size'] is None and folder['files'] == 2 and folder['total_size'] == 150
+
+
+# ---- through the storage endpoints ----
+
+@pytest.fixture
+def client(tmp_path, root, index, monkeypatch):
+    monkeypatch.setattr(server, 'STORAGE_ROOT', root)
+    monkeypatch.setattr(server, 'storage_index', index)
+    monkeypatch.setattr(server, 'storage_lister', DirectoryLister())
+    monkeypatch.setattr(server, 'storage_uploads', UploadManager(tmp_path / 'parts', 1 << 20))
+    return server.app.test_client()
+
+
+def test_endpoints_keep_the_index_consistent(tmp_path, client, index, root):
+    assert client.post('/api/storage/mkdir', json={'path': 'new/deep'}).get_json()['success']
+    r = client.post('/api/storage/upload', data={
+        'path': 'new', 'files': [(io.BytesIO(b'a' * 40), 'one.txt'), (io.BytesIO(b'b' * 2), 'one.txt')]})
+    assert r.get_json()['saved'] == ['one.txt', 'one_1.txt']
+
+    upload = client.post('/api/storage/uploads', json={'path': 'new/deep', 'filename': 'big.bin', 'size': 6}).get_json()
+    client.put(f'/api/storage/uploads/{upload["id"]}?offset=0', data=b'123456')
+    assert client.post(f'/api/storage/uploads/{upload["id"]}/finalize').get_json()['path'] == 'new/deep/big.bin'
+    assert _rows(index) == _fresh(tmp_path, root)
+
+    assert client.post('/api/storage/delete', json={'path': 'new/one.txt'}).get_json()['success']
+    assert client.post('/api/storage/delete', json={'path': 'photos'}).get_json()['success']
+    assert _rows(index) == _fresh(tmp_path, root)
+
+    listing = client.get('/api/storage/list?path=new').get_json()
+    assert listing['folder'] == {'total_size': 8, 'files': 2}
+    assert [i['name'] for i in client.get('/api/storage/search?q=big').get_json()['items']] == ['big.bin']
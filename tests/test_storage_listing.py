@@ -0,0 +1,141 @@
+import os
+
+import pytest
+
+from storage_listing import SORT_FIELDS, DirectoryLister
+
+BASE_NS = 1_700_000_000 * 10**9
+
+# name -> (size, mtime offset in seconds); None size = folder
+TREE = {
+    'beta': None, 'Alpha': None, 'gamma': None,
+    'a.txt': (30, 5), 'B.jpg': (10, 1), 'c.bin': (30, 3), 'd.log': (0, 9), 'E.md': (20, 3),
+}
+
+
+def _bump(path):
+    """Move a directory's mtime on, so a change is seen even on coarse clocks."""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def folder(tmp_path):
+    for name, spec in TREE.items():
+        path = tmp_path / name
+        if spec is None:
+            path.mkdir()
+        else:
+            path.write_bytes(b'x' * spec[0])
+            os.utime(path, ns=(BASE_NS, BASE_NS + spec[1] * 10**9))
+    return tmp_path
+
+
+def _expected(folder, sort, descending):
+    def key(name):
+        path = folder / name
+        st = os.stat(path)
+        value = {'name': (), 'size': (0 if path.is_dir() else st.st_size,),
+                 'mtime': (st.st_mtime_ns,)}[sort]
+        return value + (name.lower(), name)
+    names = [e.name for e in os.scandir(folder)]
+    dirs = sorted((n for n in names if (folder / n).is_dir()), key=key, reverse=descending)
+    files = sorted((n for n in names if not (folder / n).is_dir()), key=key, reverse=descending)
+    return dirs + files
+
+
+def _all_pages(lister, folder, limit, **kwargs):
+    names, cursor = [], None
+    while True:
+        page = lister.page(folder, cursor=cursor, limit=limit, **kwargs)
+        assert len(page['items']) <= limit
+        names += [item['name'] for item in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            return names, page['total']
+
+
+@pytest.mark.parametrize('sort', SORT_FIELDS)
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('limit', [1, 3, 100])
+def test_pages_follow_the_sort_with_folders_first(folder, sort, descending, limit):
+    names, total = _all_pages(DirectoryLister(), folder, limit, sort=sort, descending=descending)
+    assert names == _expected(folder, sort, descending)
+    assert total == len(TREE)
+
+
+def test_items(folder):
+    items = {i['name']: i for i in DirectoryLister(image_exts={'.jpg'}).page(folder, rel='docs')['items']}
+    assert items['B.jpg'] == {**items['B.jpg'], 'type': 'file', 'size': 10, 'is_image': True,
+                              'path': 'docs/B.jpg'}
+    assert items['beta']['type'] == 'dir' and items['beta']['size'] is None
+
+
+@pytest.mark.parametrize('sort', SORT_FIELDS)
+def test_folder_changing_between_pages(folder, sort):
+    lister = DirectoryLister()
+    first = lister.page(folder, sort=sort, limit=4)  # the 3 folders and a file
+    seen = [item['name'] for item in first['items']]
+
+    # A new folder sorts before the cursor, a new file after it; an unseen file goes away
+    (folder / 'new').mkdir()
+    (folder / 'zzz.txt').write_bytes(b'x' * 99)
+    os.utime(folder / 'zzz.txt', ns=(BASE_NS, BASE_NS + 99 * 10**9))
+    gone = _expected(folder, sort, False)[6]
+    (folder / gone).unlink()
+    _bump(folder)
+
+    rest, total = _all_pages_from(lister, folder, first['next_cursor'], sort=sort)
+    assert total == len(TREE) + 1
+    assert seen + rest == [n for n in _expected(folder, sort, False) if n != 'new']
+    assert rest[-1] == 'zzz.txt' and gone not in rest
+
+
+def _all_pages_from(lister, folder, cursor, **kwargs):
+    names = []
+    while cursor is not None:
+        page = lister.page(folder, cursor=cursor, limit=2, **kwargs)
+        names += [item['name'] for item in page['items']]
+        cursor, total = page['next_cursor'], page['total']
+    return names, total
+
+
+def test_snapshot_is_reused_until_the_folder_changes(folder):
+    lister = DirectoryLister()
+    snap = lister.snapshot(folder)
+    assert lister.snapshot(folder) is snap
+    (folder / 'new.txt').write_text('x')
+    _bump(folder)
+    assert lister.snapshot(folder) is not snap
+    snap = lister.snapshot(folder)
+    lister.invalidate(folder)
+    assert lister.snapshot(folder) is not snap
+
+
+def test_lru_keeps_max_dirs(folder):
+    lister = DirectoryLister(max_dirs=2)
+    for name in ('Alpha', 'beta', 'gamma'):
+        lister.snapshot(folder / name)
+    assert len(lister._snapshots) == 2
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64 !', 'e30', 'WyJuYW1lIl0',  # garbage, {}, ["name"]
+])
+def test_invalid_cursor(folder, cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        DirectoryLister().page(folder, cursor=cursor)
+
+
+def test_cursor_is_bound_to_its_sort_order(folder):
+    lister = DirectoryLister()
+    cursor = lister.page(folder, sort='size', limit=2)['next_cursor']
+    with pytest.raises(ValueError, match='different sort order'):
+        lister.page(folder, sort='size', descending=True, cursor=cursor)
+    with pytest.raises(ValueError):
+        lister.page(folder, sort='name', cursor=cursor)
+
+
+def test_unknown_sort(folder):
+    with pytest.raises(ValueError, match='sort must be one of'):
+        DirectoryLister().page(folder, sort='owner')
@@ -0,0 +1,100 @@
+import http.client
+import socket
+import threading
+import time
+
+import pytest
+
+from wsgi_server import PooledWSGIServer
+
+WORKERS = 2
+
+
+def app(environ, start_response):
+    if environ['PATH_INFO'] == '/stream':
+        start_response('200 OK', [('Content-Type', 'text/event-stream')])
+
+        def events():
+            yield b'data: hello\n\n'
+            while True:
+                time.sleep(0.05)
+                yield b': keepalive\n\n'
+
+        return events()
+    start_response('200 OK', [('Content-Type', 'text/plain'), ('Content-Length', '4')])
+    return [b'pong']
+
+
+@pytest.fixture
+def server():
+    srv = PooledWSGIServer('127.0.0.1', 0, app, workers=WORKERS, backlog=8, keepalive=30,
+                           max_streams=WORKERS + 1)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    if not srv.draining:
+        srv.stop(grace=1)
+
+
+def ping(srv, timeout=2):
+    conn = http.client.HTTPConnection('127.0.0.1', srv.server_port, timeout=timeout)
+    conn.request('GET', '/ping')
+    response = conn.getresponse()
+    assert response.read() == b'pong'
+    return conn
+
+
+def open_stream(srv):
+    sock = socket.create_connection(('127.0.0.1', srv.server_port), timeout=2)
+    sock.sendall(b'GET /stream HTTP/1.1\r\nHost: test\r\n\r\n')
+    received = b''
+    while b'data: hello' not in received:
+        chunk = sock.recv(4096)
+        assert chunk, 'stream closed early'
+        received += chunk
+    assert received.startswith(b'HTTP/1.1 200')
+    return sock
+
+
+def test_idle_keepalive_connections_do_not_hold_workers(server):
+    idle = [ping(server) for _ in range(WORKERS)]  # kept open, not reused yet
+    started = time.monotonic()
+    ping(server).close()
+    assert time.monotonic() - started < 1
+    # The parked connections still work
+    for conn in idle:
+        conn.request('GET', '/ping')
+        assert conn.getresponse().read() == b'pong'
+        conn.close()
+
+
+def test_streams_do_not_hold_workers(server):
+    streams = [open_stream(server) for _ in range(WORKERS)]
+    started = time.monotonic()
+    ping(server).close()
+    assert time.monotonic() - started < 1
+    assert server.streams == WORKERS
+    for sock in streams:
+        sock.close()
+
+
+def test_streams_beyond_the_cap_are_refused(server):
+    streams = [open_stream(server) for _ in range(server.max_streams)]
+    sock = socket.create_connection(('127.0.0.1', server.server_port), timeout=2)
+    sock.sendall(b'GET /stream HTTP/1.1\r\nHost: test\r\n\r\n')
+    assert sock.recv(4096).startswith(b'HTTP/1.1 503')
+    for s in streams + [sock]:
+        s.close()
+
+
+def test_stop_does_not_wait_for_streams_or_idle_connections(server):
+    streams = [open_stream(server) for _ in range(WORKERS)]
+    idle = ping(server)
+    started = time.monotonic()
+    server.stop(grace=5)
+    assert time.monotonic() - started < 1
+    for sock in streams:
+        sock.settimeout(2)
+        while sock.recv(4096):  # ends once the server shut the stream
+            pass
+    idle.close()
@@ -0,0 +1,165 @@
+"""Compact multi-resolution metrics history.
+
+Every series lives in preallocated ``array('d')`` ring buffers, so recording a
+sample is a handful of index writes with no per-sample allocation.  Alongside
+the raw ring, min/avg/max rollups are kept at 1-minute and 1-hour resolution,
+which lets a day (or a month) of trends fit in a few hundred KB.
+"""
+import math
+import threading
+from array import array
+from datetime import datetime
+
+NAN = float('nan')
+
+# Rollup resolutions: name -> bucket length in seconds
+ROLLUPS = {'1m': 60, '1h': 3600}
+RESOLUTIONS = ('raw',) + tuple(ROLLUPS)
+
+
+class Ring:
+    """Fixed-capacity circular buffer of float columns sharing a timestamp column."""
+
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self.times = array('d', [0.0]) * capacity
+        self.columns = {name: array('d', [NAN]) * capacity for name in columns}
+        self.head = 0  # next slot to write
+        self.size = 0
+
+    def append(self, ts, values):
+        i = self.head
+        self.times[i] = ts
+        for name, column in self.columns.items():
+            column[i] = values.get(name, NAN)
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _slot(self, logical):
+        """Physical index of the logical-th oldest entry."""
+        return (self.head - self.size + logical) % self.capacity
+
+    def _bisect(self, ts):
+        """First logical index whose timestamp is >= ts (timestamps are ascending)."""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[self._slot(mid)] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def slots(self, start=None, end=None, limit=None):
+        """Physical indices of entries in [start, end], oldest first, newest `limit` kept."""
+        lo = self._bisect(start) if start is not None else 0
+        hi = self._bisect(math.nextafter(end, math.inf)) if end is not None else self.size
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return [self._slot(i) for i in range(lo, hi)]
+
+
+class _Bucket:
+    """Running min/sum/max/count per series for one rollup interval."""
+
+    __slots__ = ('start', 'mins', 'maxs', 'sums', 'counts')
+
+    def __init__(self, start, series):
+        self.start = start
+        self.mins = dict.fromkeys(series, math.inf)
+        self.maxs = dict.fromkeys(series, -math.inf)
+        self.sums = dict.fromkeys(series, 0.0)
+        self.counts = dict.fromkeys(series, 0)
+
+    def add(self, values):
+        for name in self.sums:
+            v = values.get(name, NAN)
+            if v != v:  # NaN: missing reading
+                continue
+            self.sums[name] += v
+            self.counts[name] += 1
+            if v < self.mins[name]:
+                self.mins[name] = v
+            if v > self.maxs[name]:
+                self.maxs[name] = v
+
+    def columns(self):
+        out = {}
+        for name, n in self.counts.items():
+            out[f'{name}_min'] = self.mins[name] if n else NAN
+            out[f'{name}_avg'] = self.sums[name] / n if n else NAN
+            out[f'{name}_max'] = self.maxs[name] if n else NAN
+        return out
+
+
+def _num(v):
+    return None if v != v else round(v, 2)
+
+
+class MetricsHistory:
+    """Raw samples plus 1-minute and 1-hour min/avg/max rollups for a set of series."""
+
+    def __init__(self, series, raw_points=720, minute_points=1440, hour_points=720):
+        self.series = tuple(series)
+        self.raw = Ring(raw_points, self.series)
+        rollup_columns = [f'{name}_{agg}' for name in self.series for agg in ('min', 'avg', 'max')]
+        self.rollups = {
+            '1m': Ring(minute_points, rollup_columns),
+            '1h': Ring(hour_points, rollup_columns),
+        }
+        self._buckets = dict.fromkeys(ROLLUPS)
+        self._lock = threading.Lock()
+
+    def add(self, ts, values):
+        """Record one sample (values: series name -> float, NaN for missing)."""
+        with self._lock:
+            self.raw.append(ts, values)
+            for resolution, step in ROLLUPS.items():
+                start = ts - ts % step
+                bucket = self._buckets[resolution]
+                if bucket is None or bucket.start != start:
+                    if bucket is not None:
+                        self.rollups[resolution].append(bucket.start, bucket.columns())
+                    bucket = self._buckets[resolution] = _Bucket(start, self.series)
+                bucket.add(values)
+
+    def query(self, resolution='raw', start=None, end=None, limit=None):
+        """Return {'resolution', 'timestamps', <series>...} for the requested window.
+
+        Raw series are plain lists; rollup series are {'min', 'avg', 'max'} lists.
+        The in-progress rollup bucket is included as the last point.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f'resolution must be one of {", ".join(RESOLUTIONS)}')
+        with self._lock:
+            if resolution == 'raw':
+                ring = self.raw
+                slots = ring.slots(start, end, limit)
+                result = {
+                    'resolution': resolution,
+                    'timestamps': [datetime.fromtimestamp(ring.times[i]).isoformat() for i in slots],
+                }
+                for name in self.series:
+                    column = ring.columns[name]
+                    result[name] = [_num(column[i]) for i in slots]
+                return result
+
+            ring = self.rollups[resolution]
+            slots = ring.slots(start, end)
+            times = [ring.times[i] for i in slots]
+            rows = [{c: column[i] for c, column in ring.columns.items()} for i in slots]
+            bucket = self._buckets[resolution]
+            if bucket is not None and (start is None or bucket.start + ROLLUPS[resolution] > start) \
+                    and (end is None or bucket.start <= end):
+                times.append(bucket.start)
+                rows.append(bucket.columns())
+            if limit is not None:
+                times, rows = times[-limit:], rows[-limit:]
+        result = {
+            'resolution': resolution,
+            'timestamps': [datetime.fromtimestamp(t).isoformat() for t in times],
+        }
+        for name in self.series:
+            result[name] = {agg: [_num(row[f'{name}_{agg}']) for row in rows]
+                            for agg in ('min', 'avg', 'max')}
+        return result
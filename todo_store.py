@@ -0,0 +1,192 @@
+"""In-memory todo list with an id index and versioned change tracking.
+
+Todos are kept in an id -> dict map (insertion order is creation order,
+as in todos.json), with open and completed ids partitioned so counts are
+O(1).  Every mutation bumps ``version`` and moves the touched id to the end
+of a change log, so ``changes(since)`` walks only what changed after
+``since`` instead of the whole list.  Deleted ids are remembered as
+tombstones (a bounded number); a client older than the oldest dropped
+tombstone is told to resync.
+"""
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+EDITABLE_FIELDS = ('title', 'description', 'notes', 'due_date')
+
+
+class TodoStore:
+    """Todos by id, split into open/completed, with a monotonically increasing version."""
+
+    def __init__(self, max_tombstones=1000):
+        self.max_tombstones = max_tombstones
+        self.version = 0
+        self._items = {}
+        self._open = set()
+        self._completed = set()
+        self._changes = OrderedDict()  # id -> version of its last change, oldest first
+        self._tombstones = set()       # deleted ids still in _changes
+        self._resync_before = 0        # clients older than this need a full list
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def open_count(self):
+        return len(self._open)
+
+    # ---- bookkeeping ----
+
+    def _touch(self, todo_id):
+        self.version += 1
+        self._changes[todo_id] = self.version
+        self._changes.move_to_end(todo_id)
+
+    def _place(self, todo):
+        if todo.get('completed', False):
+            self._open.discard(todo['id'])
+            self._completed.add(todo['id'])
+        else:
+            self._completed.discard(todo['id'])
+            self._open.add(todo['id'])
+
+    def _prune_tombstones(self):
+        while len(self._tombstones) > self.max_tombstones:
+            for todo_id, version in self._changes.items():
+                if todo_id in self._tombstones:
+                    del self._changes[todo_id]
+                    self._tombstones.discard(todo_id)
+                    self._resync_before = max(self._resync_before, version)
+                    break
+
+    # ---- persistence ----
+
+    def load(self, items):
+        """Replace the contents (e.g. from todos.json); existing clients must resync."""
+        with self._lock:
+            self._items = {t['id']: t for t in items}
+            self._open, self._completed = set(), set()
+            for todo in self._items.values():
+                self._place(todo)
+            self._changes.clear()
+            self._tombstones.clear()
+            self.version += 1
+            self._resync_before = self.version
+
+    def snapshot(self):
+        """All todos as a list (copies), in creation order."""
+        with self._lock:
+            return [dict(t) for t in self._items.values()]
+
+    # ---- mutations ----
+
+    def get(self, todo_id):
+        with self._lock:
+            todo = self._items.get(todo_id)
+            return dict(todo) if todo is not None else None
+
+    def create(self, data):
+        with self._lock:
+            todo_id = secrets.token_hex(8)
+            todo = {
+                'id': todo_id,
+                'title': (data.get('title') or 'Untitled').strip(),
+                'description': data.get('description', ''),
+                'notes': data.get('notes', ''),
+                'due_date': data.get('due_date', ''),
+                'completed': False,
+                'created_at': datetime.now().isoformat(),
+                'completed_at': None,
+                'order': len(self._open),
+            }
+            self._items[todo_id] = todo
+            self._place(todo)
+            self._touch(todo_id)
+            return dict(todo)
+
+    def update(self, todo_id, data):
+        """Apply the editable fields in data; None if there is no such todo."""
+        with self._lock:
+            todo = self._items.get(todo_id)
+            if todo is None:
+                return None
+            for field in EDITABLE_FIELDS:
+                if field in data:
+                    todo[field] = data[field]
+            self._touch(todo_id)
+            return dict(todo)
+
+    def complete(self, todo_id):
+        with self._lock:
+            todo = self._items.get(todo_id)
+            if todo is None:
+                return None
+            todo['completed'] = True
+            todo['completed_at'] = datetime.now().isoformat()
+            self._place(todo)
+            self._touch(todo_id)
+            return dict(todo)
+
+    def reopen(self, todo_id):
+        """Move an archived todo back to the end of the open list."""
+        with self._lock:
+            todo = self._items.get(todo_id)
+            if todo is None:
+                return None
+            if todo.get('completed', False):
+                todo['order'] = len(self._open)
+            todo['completed'] = False
+            todo['completed_at'] = None
+            self._place(todo)
+            self._touch(todo_id)
+            return dict(todo)
+
+    def delete(self, todo_id):
+        with self._lock:
+            if self._items.pop(todo_id, None) is None:
+                return False
+            self._open.discard(todo_id)
+            self._completed.discard(todo_id)
+            self._touch(todo_id)
+            self._tombstones.add(todo_id)
+            self._prune_tombstones()
+            return True
+
+    def reorder(self, ids):
+        """Set 'order' of the given todos to their position in ids (unknown ids are ignored).
+        Returns the number of todos that moved."""
+        moved = 0
+        with self._lock:
+            for position, todo_id in enumerate(ids):
+                todo = self._items.get(todo_id)
+                if todo is not None and todo.get('order') != position:
+                    todo['order'] = position
+                    self._touch(todo_id)
+                    moved += 1
+        return moved
+
+    # ---- sync ----
+
+    def changes(self, since):
+        """Todos changed and ids deleted after version `since`.
+
+        'reset' is True (and 'changed' holds every todo) when `since` is too
+        old to answer from the change log, e.g. after a reload.
+        """
+        with self._lock:
+            if since < self._resync_before or since > self.version:
+                return {'version': self.version, 'reset': True,
+                        'changed': self.snapshot(), 'deleted': []}
+            changed, deleted = [], []
+            for todo_id in reversed(self._changes):
+                if self._changes[todo_id] <= since:
+                    break
+                if todo_id in self._tombstones:
+                    deleted.append(todo_id)
+                else:
+                    changed.append(dict(self._items[todo_id]))
+            changed.reverse()
+            deleted.reverse()
+            return {'version': self.version, 'reset': False, 'changed': changed, 'deleted': deleted}
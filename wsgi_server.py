@@ -0,0 +1,499 @@
+"""Bounded-pool WSGI server for ``server.py --serve``.
+
+Werkzeug's development server starts a thread per connection with no cap
+and closes every connection after one response.  This server keeps
+Werkzeug's request parsing, environ and TLS setup, but writes responses
+itself (Content-Length or chunked, so connections can be kept alive) and
+hands connections to a fixed pool of worker threads through a bounded
+queue:
+
+- a worker only holds a connection while a request is being served: new
+  and idle keep-alive connections wait in a selector (one thread) until
+  their next request arrives, and are closed after ``keepalive`` seconds
+  of silence;
+- when the queue is full, the connection gets an immediate 503 with
+  ``Retry-After`` instead of piling up threads;
+- long-lived streams (``text/event-stream``) are handed to a thread of
+  their own, at most ``max_streams`` of them, so they never pin a worker;
+- TLS handshakes run in the workers, so a slow client can't stall accept();
+- file bodies (``file_response.FileRange``) go out with ``socket.sendfile``;
+- :meth:`PooledWSGIServer.stop` stops accepting, ends open streams, lets
+  queued and in-flight requests finish (up to a grace period) and then
+  returns.
+"""
+import queue
+import selectors
+import signal
+import socket
+import ssl
+import threading
+import time
+import traceback
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, load_ssl_context
+
+MAX_DRAIN_BYTES = 64 * 1024  # unread request body discarded to keep a connection
+STREAM_TYPES = ('text/event-stream',)  # responses served outside the worker pool
+
+_BUSY_BODY = b'{"error": "Server busy, retry shortly"}'
+_BUSY_RESPONSE = (
+    b'HTTP/1.1 503 Service Unavailable\r\n'
+    b'Content-Type: application/json\r\n'
+    b'Retry-After: 1\r\n'
+    b'Connection: close\r\n'
+    b'Content-Length: ' + str(len(_BUSY_BODY)).encode() + b'\r\n\r\n' + _BUSY_BODY
+)
+
+
+class _RequestBody:
+    """wsgi.input limited to Content-Length, so the next request can be found after it."""
+
+    def __init__(self, stream, length):
+        self._stream = stream
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._stream.read(size) if size else b''
+        self.remaining = self.remaining - len(data) if data else 0
+        return data
+
+    def readline(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._stream.readline(size) if size else b''
+        self.remaining = self.remaining - len(data) if data else 0
+        return data
+
+    def readlines(self, hint=-1):
+        return list(iter(self.readline, b''))
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+    def drain(self, limit):
+        """Discard what the app left unread; False if more than `limit` bytes remain."""
+        if self.remaining > limit:
+            return False
+        while self.read(16 * 1024):
+            pass
+        return True
+
+
+def _file_range(app_iter):
+    """The body if it is a byte range of a real file (file_response.FileRange), else None."""
+    file = getattr(app_iter, 'file', None)
+    if file is None or not hasattr(app_iter, 'offset') or not hasattr(app_iter, 'length'):
+        return None
+    try:
+        file.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+    return app_iter
+
+
+def _is_stream(headers):
+    content_type = next((v for k, v in headers if k.lower() == 'content-type'), '')
+    return content_type.split(';')[0].strip().lower() in STREAM_TYPES
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    detached = False  # the response went to a stream thread, which now owns the socket
+
+    def setup(self):
+        self.timeout = self.server.keepalive  # a request that has started must keep coming
+        super().setup()
+
+    def handle(self):
+        """Serve the request(s) that have arrived, then give the worker back.
+
+        Instead of waiting here for the next request on a keep-alive
+        connection, the worker returns and the server parks the connection
+        in its idle selector (unless close_connection is set).
+        """
+        self.close_connection = True
+        try:
+            self.handle_one_request()
+            while not self.close_connection and not self.detached and self._request_waiting():
+                self.handle_one_request()  # pipelined: already read into rfile
+        except (ConnectionError, socket.timeout) as e:
+            self.close_connection = True
+            self.connection_dropped(e)
+        except ssl.SSLError as e:
+            self.close_connection = True
+            self.log_error('SSL error occurred: %s', e)
+
+    def _request_waiting(self):
+        """Whether the next request has already arrived, checked without blocking.
+
+        Parking is only safe with nothing buffered in rfile, which is
+        discarded with this handler.
+        """
+        sock = self.connection
+        if isinstance(sock, ssl.SSLSocket) and sock.pending():
+            return True
+        sock.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))  # b'' when nothing is buffered or readable
+        except (ssl.SSLWantReadError, BlockingIOError):
+            return False
+        except OSError:
+            self.close_connection = True
+            return False
+        finally:
+            sock.settimeout(self.timeout)
+
+    def finish(self):
+        if not self.detached:
+            super().finish()
+
+    def _detach(self, app_iter, write):
+        """Send a streaming response from its own thread, freeing the worker."""
+        self.close_connection = True
+        if not self.server.stream_started(self.request):
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+            self.send_error(503, 'Too many open streams')
+            return
+        self.detached = True
+        try:
+            write(b'')  # headers, while we know the client is there
+        except Exception:
+            self._end_stream(app_iter)
+            return
+        threading.Thread(target=self._pump, args=(app_iter, write), daemon=True,
+                         name='wsgi-stream').start()
+
+    def _pump(self, app_iter, write):
+        try:
+            for data in app_iter:
+                write(data)
+        except (OSError, ValueError):
+            pass  # client went away, or stop() shut the socket
+        except Exception:
+            self.server.log('error', f'Error in stream:\n{traceback.format_exc()}')
+        finally:
+            self._end_stream(app_iter)
+
+    def _end_stream(self, app_iter):
+        try:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+            super().finish()
+        except Exception:
+            pass
+        finally:
+            self.server.stream_finished(self.request)
+
+    def run_wsgi(self):
+        if self.headers.get('Expect', '').lower().strip(' \t') == '100-continue':
+            self.wfile.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+        self.environ = environ = self.make_environ()
+        body = None
+        if environ.get('wsgi.input_terminated'):
+            self.close_connection = True  # chunked request: can't tell where it ends
+        else:
+            try:
+                length = max(0, int(environ.get('CONTENT_LENGTH') or 0))
+            except ValueError:
+                length, self.close_connection = 0, True
+            body = environ['wsgi.input'] = _RequestBody(self.rfile, length)
+
+        state = {'status': None, 'headers': None, 'sent': False, 'chunked': False}
+
+        def send_headers():
+            code, _, reason = state['status'].partition(' ')
+            code = int(code)
+            self.send_response(code, reason)
+            keys = set()
+            for key, value in state['headers']:
+                keys.add(key.lower())
+                self.send_header(key, value)
+            bodyless = self.command == 'HEAD' or code < 200 or code in (204, 304)
+            if not bodyless and 'content-length' not in keys:
+                if self.request_version == 'HTTP/1.1':
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    state['chunked'] = True
+                else:
+                    self.close_connection = True
+            if self.server.draining:
+                self.close_connection = True
+            if self.close_connection:
+                self.send_header('Connection', 'close')
+            self.end_headers()
+            state['sent'] = True
+
+        def write(data):
+            if not state['sent']:
+                send_headers()
+            if data and state['chunked']:
+                self.wfile.write(b'%x\r\n%b\r\n' % (len(data), data))
+            elif data:
+                self.wfile.write(data)
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info:
+                try:
+                    if state['sent']:
+                        raise exc_info[1].with_traceback(exc_info[2])
+                finally:
+                    exc_info = None
+            elif state['status'] is not None:
+                raise AssertionError('Headers already set')
+            state['status'], state['headers'] = status, headers
+            return write
+
+        try:
+            app_iter = self.server.app(environ, start_response)
+            if state['status'] is not None and _is_stream(state['headers']):
+                self._detach(app_iter, write)
+                return
+            try:
+                file_range = _file_range(app_iter)
+                if file_range is not None and state['status'] is not None:
+                    write(b'')  # headers out; Content-Length means not chunked
+                if file_range is not None and state['sent'] and not state['chunked']:
+                    # Zero-copy from the page cache (plain send() under TLS)
+                    sent = self.connection.sendfile(file_range.file, file_range.offset,
+                                                    file_range.length)
+                    if sent < file_range.length:
+                        self.close_connection = True  # file shrank: body is short
+                else:
+                    for data in app_iter:
+                        write(data)
+                    if not state['sent']:
+                        write(b'')
+                    if state['chunked']:
+                        self.wfile.write(b'0\r\n\r\n')
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        except (ConnectionError, socket.timeout, ssl.SSLError):
+            self.close_connection = True
+            return
+        except Exception:
+            self.close_connection = True
+            self.server.log('error', f'Error on request:\n{traceback.format_exc()}')
+            if not state['sent']:
+                self.send_error(500)
+            return
+
+        if body is not None and body.remaining and not body.drain(MAX_DRAIN_BYTES):
+            self.close_connection = True
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """WSGI server with a fixed worker pool and a bounded connection queue."""
+
+    multithread = True
+
+    def __init__(self, host, port, app, workers=8, backlog=32, keepalive=15,
+                 max_streams=32, max_idle=256, ssl_context=None):
+        self.request_queue_size = backlog  # listen() backlog
+        self.keepalive = keepalive
+        self.max_streams = max_streams
+        self.max_idle = max_idle
+        self.draining = False
+        self.pending = queue.Queue(maxsize=backlog)
+        self.busy = 0  # workers currently serving a connection
+        self.rejected = 0
+        super().__init__(host, port, app, handler=PooledRequestHandler)
+        if ssl_context is not None:
+            if isinstance(ssl_context, tuple):
+                ssl_context = load_ssl_context(*ssl_context)
+            # Handshake lazily, on the worker's first read
+            self.socket = ssl_context.wrap_socket(self.socket, server_side=True,
+                                                  do_handshake_on_connect=False)
+            self.ssl_context = ssl_context
+        self._busy_lock = threading.Lock()
+        self._streams = set()  # sockets owned by stream threads
+        self._parked = queue.SimpleQueue()  # (socket, address) for the idle thread to watch
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._idle_closed = False
+        self._idle_thread = threading.Thread(target=self._watch_idle, daemon=True,
+                                             name='wsgi-idle')
+        self._idle_thread.start()
+        self._workers = [
+            threading.Thread(target=self._work, daemon=True, name=f'wsgi-worker-{i}')
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def streams(self):
+        return len(self._streams)
+
+    # ---- accept side ----
+
+    def process_request(self, request, client_address):
+        # Wait for the first request in the idle selector, not in a worker
+        self.park(request, client_address)
+
+    def _enqueue(self, request, client_address):
+        try:
+            self.pending.put_nowait((request, client_address))
+        except queue.Full:
+            self.rejected += 1
+            self._reject(request)
+
+    def _reject(self, request):
+        try:
+            request.settimeout(0.5)
+            request.sendall(_BUSY_RESPONSE)
+        except (OSError, ssl.SSLError):
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    # ---- idle connections ----
+
+    def park(self, request, client_address):
+        """Watch a connection until its next request arrives (or keepalive expires)."""
+        if self.draining:
+            self.shutdown_request(request)
+            return
+        self._parked.put((request, client_address))
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass
+
+    def _watch_idle(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._wake_r, selectors.EVENT_READ, None)
+        watched = {}  # socket -> (address, deadline)
+        try:
+            while not self._idle_closed:
+                while True:
+                    try:
+                        request, client_address = self._parked.get_nowait()
+                    except queue.Empty:
+                        break
+                    try:
+                        selector.register(request, selectors.EVENT_READ)
+                    except (ValueError, OSError):
+                        self.shutdown_request(request)  # already closed
+                        continue
+                    watched[request] = (client_address, time.monotonic() + self.keepalive)
+                    if len(watched) > self.max_idle:
+                        oldest = min(watched, key=lambda r: watched[r][1])
+                        selector.unregister(oldest)
+                        del watched[oldest]
+                        self.shutdown_request(oldest)
+                now = time.monotonic()
+                timeout = min((d for _, d in watched.values()), default=now + 1) - now
+                for key, _ in selector.select(max(0.0, timeout)):
+                    if key.fileobj is self._wake_r:
+                        self._wake_r.recv(4096)
+                        continue
+                    request = key.fileobj
+                    selector.unregister(request)
+                    client_address, _ = watched.pop(request)
+                    self._enqueue(request, client_address)
+                now = time.monotonic()
+                for request in [r for r, (_, d) in watched.items() if d <= now]:
+                    selector.unregister(request)
+                    del watched[request]
+                    self.shutdown_request(request)
+        finally:
+            for request in watched:
+                self.shutdown_request(request)
+            while True:
+                try:
+                    self.shutdown_request(self._parked.get_nowait()[0])
+                except queue.Empty:
+                    break
+            selector.close()
+
+    # ---- streams ----
+
+    def stream_started(self, request):
+        """Claim a stream slot for `request`; False when max_streams are open."""
+        with self._busy_lock:
+            if self.draining or len(self._streams) >= self.max_streams:
+                return False
+            self._streams.add(request)
+            return True
+
+    def stream_finished(self, request):
+        with self._busy_lock:
+            self._streams.discard(request)
+        self.shutdown_request(request)
+
+    # ---- workers ----
+
+    def finish_request(self, request, client_address):
+        return self.RequestHandlerClass(request, client_address, self)
+
+    def _work(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            request, client_address = item
+            with self._busy_lock:
+                self.busy += 1
+            handler = None
+            try:
+                handler = self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                if handler is not None and handler.detached:
+                    pass  # a stream thread owns the socket now
+                elif handler is not None and not handler.close_connection:
+                    self.park(request, client_address)
+                else:
+                    self.shutdown_request(request)
+                with self._busy_lock:
+                    self.busy -= 1
+
+    # ---- lifecycle ----
+
+    def stop(self, grace=10):
+        """Stop accepting, end streams, drain queued/in-flight requests for up to `grace` seconds."""
+        self.draining = True
+        self.shutdown()  # returns once serve_forever() has left its loop (it closes the socket)
+        # Idle connections and open streams have no request in flight: close them now
+        self._idle_closed = True
+        self._wake()
+        with self._busy_lock:
+            streams = list(self._streams)
+        for request in streams:
+            try:
+                request.shutdown(socket.SHUT_RDWR)  # the stream's next write fails
+            except OSError:
+                pass
+        deadline = time.monotonic() + grace
+        while (self.busy or not self.pending.empty()) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        for _ in self._workers:
+            try:
+                self.pending.put_nowait(None)
+            except queue.Full:
+                break  # grace period over with work still queued: workers are daemons
+
+    def serve_until_signalled(self, grace=10, signals=(signal.SIGTERM, signal.SIGINT)):
+        """serve_forever() until one of `signals` arrives, then stop() gracefully."""
+        stopper = []
+
+        def on_signal(signum, frame):
+            if not stopper:
+                # stop() waits for serve_forever(), which runs in this thread
+                stopper.append(threading.Thread(target=self.stop, args=(grace,), name='wsgi-stop'))
+                stopper[0].start()
+
+        previous = {sig: signal.signal(sig, on_signal) for sig in signals}
+        try:
+            self.serve_forever()
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        if stopper:
+            stopper[0].join()
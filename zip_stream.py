@@ -0,0 +1,90 @@
+"""ZIP archives of storage folders, produced while they are sent.
+
+:func:`stream_zip` is a generator of archive bytes: each file is read in
+blocks, compressed and handed on straight away, so memory use is bounded
+by the block size whatever the folder holds, and nothing is written to
+disk.  zipfile writes data descriptors when its output can't seek, so no
+entry has to be revisited.  Formats that are already compressed (photos,
+video, audio, archives) are stored rather than deflated: deflating them
+costs CPU and gains next to nothing.
+"""
+import os
+import zipfile
+
+READ_BLOCK = 256 * 1024
+
+STORED_EXTS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif', '.avif',
+    '.mp4', '.m4v', '.mov', '.mkv', '.webm', '.avi', '.3gp',
+    '.mp3', '.m4a', '.aac', '.ogg', '.opus', '.flac',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar', '.apk',
+    '.docx', '.xlsx', '.pptx', '.odt', '.epub', '.pdf',
+}
+
+
+class _Pipe:
+    """Write-only file object collecting zipfile's output until it is yielded."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _entries(folder):
+    """(path, archive name) for every folder and regular file below `folder`,
+    in a stable order; symlinks are skipped (they could lead outside storage)."""
+    for dirpath, dirnames, filenames in os.walk(folder):
+        dirnames[:] = sorted(d for d in dirnames if not os.path.islink(os.path.join(dirpath, d)))
+        rel = os.path.relpath(dirpath, folder)
+        prefix = '' if rel == '.' else rel.replace(os.sep, '/') + '/'
+        if prefix:
+            yield dirpath, prefix
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            if not os.path.islink(path):
+                yield path, prefix + name
+
+
+def stream_zip(folder):
+    """Yield a ZIP of everything below `folder`, a block at a time."""
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', allowZip64=True) as zf:
+        for path, arcname in _entries(folder):
+            try:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+            except OSError:
+                continue  # removed while we were walking
+            if info.is_dir():
+                zf.writestr(info, b'')
+                continue
+            stored = os.path.splitext(arcname)[1].lower() in STORED_EXTS
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            try:
+                src = open(path, 'rb')
+            except OSError:
+                continue
+            with src, zf.open(info, 'w') as dest:
+                # Copy exactly the size recorded in the header, even if the file grows
+                remaining = info.file_size
+                while remaining > 0:
+                    block = src.read(min(READ_BLOCK, remaining))
+                    if not block:
+                        break
+                    remaining -= len(block)
+                    dest.write(block)
+                    if pipe.chunks:
+                        yield pipe.drain()
+            if pipe.chunks:
+                yield pipe.drain()  # rest of the entry and its data descriptor
+    yield pipe.drain()  # central directory